@@ -16,68 +16,45 @@ function Calendar() {
     const calendarRef = useRef(null);
     const navigate = useNavigate();
 
-    useEffect(() => {
-        fetch('/api/mood-ratings')
-            .then(response => {
+    const handleDatesSet = ({ view }) => {
+        // One /api/calendar request per month in view (twelve in the year view)
+        const months = [];
+        const month = new Date(view.currentStart.getFullYear(), view.currentStart.getMonth(), 1);
+        while (month < view.currentEnd) {
+            months.push(`${month.getFullYear()}-${String(month.getMonth() + 1).padStart(2, '0')}`);
+            month.setMonth(month.getMonth() + 1);
+        }
+        Promise.all(months.map(m =>
+            fetch(`/api/calendar?month=${m}`).then(response => {
                 if (!response.ok) {
-                    throw new Error('Failed to fetch mood ratings');
+                    throw new Error('Failed to fetch calendar summary');
                 }
                 return response.json();
             })
-            .then(data => {
-                const eventsData = data.reduce((acc, entry) => {
-                    const date = new Date(entry.created_at).toISOString().split('T')[0];
-                    acc[date] = entry.mood;
-                    return acc;
-                }, {});
+        ))
+            .then(pages => {
+                const eventsData = {};
+                const journalEntriesData = {};
+                const medicationsData = {};
+                pages.forEach(page => page.days.forEach(summary => {
+                    if (summary.mood_rating) {
+                        eventsData[summary.day] = summary.mood_rating;
+                    }
+                    if (summary.journal_count > 0) {
+                        journalEntriesData[summary.day] = true;
+                    }
+                    if (summary.medications_due > 0) {
+                        medicationsData[summary.day] = true;
+                    }
+                }));
                 setEvents(eventsData);
-            })
-            .catch(error => {
-                console.error('Error fetching mood ratings:', error);
-            });
-    }, []);
-
-    useEffect(() => {
-        fetch('/api/journals')
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Failed to fetch journal entries');
-                }
-                return response.json();
-            })
-            .then(data => {
-                const journalEntriesData = data.reduce((acc, entry) => {
-                    const date = new Date(entry.created_at).toISOString().split('T')[0];
-                    acc[date] = true;
-                    return acc;
-                }, {});
                 setJournalEntries(journalEntriesData);
-            })
-            .catch(error => {
-                console.error('Error fetching journal entries:', error);
-            });
-    }, []);
-
-    useEffect(() => {
-        fetch('/api/medications')
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Failed to fetch medications');
-                }
-                return response.json();
-            })
-            .then(data => {
-                const medicationsData = data.reduce((acc, entry) => {
-                    const date = new Date(entry.renew_date).toISOString().split('T')[0];
-                    acc[date] = true;
-                    return acc;
-                }, {});
                 setMedications(medicationsData);
             })
             .catch(error => {
-                console.error('Error fetching medications:', error);
+                console.error('Error fetching calendar summary:', error);
             });
-    }, []);
+    };
 
     useEffect(() => {
         if (calendarRef.current) {
@@ -188,6 +165,7 @@ function Calendar() {
                 height="auto"
                 eventContent={renderEventContent}
                 dateClick={handleDateClick}
+                datesSet={handleDatesSet}
             />
             <div>
                 <br></br>
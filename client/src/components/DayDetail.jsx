@@ -26,34 +26,17 @@ function DayDetail() {
     const [visibleTasks, setVisibleTasks] = useState(false);
 
     useEffect(() => {
-        fetchTodos();
-        const fetchJournalEntries = async () => {
-            const response = await fetch('/api/journals');
+        const fetchDay = async () => {
+            const response = await fetch(`/api/days/${date}`);
             if (response.ok) {
                 const data = await response.json();
-                const timezoneOffset = new Date().getTimezoneOffset() * 60000;
-                const filteredEntries = data.filter(entry => {
-                    const entryDate = new Date(new Date(entry.created_at).getTime() - timezoneOffset).toISOString().split('T')[0];
-                    return entryDate === date;
-                });
-                setJournalEntries(filteredEntries);
+                setJournalEntries(data.journals);
+                setMoodRating(data.mood);
+                setTodos(data.todos);
             }
         };
 
-        const fetchMoodRating = async () => {
-            const response = await fetch('/api/mood-ratings');
-            if (response.ok) {
-                const data = await response.json();
-                const mood = data.filter(entry => {
-                    const entryDate = new Date(entry.created_at.replace(/-/g, '\/')).toISOString().split('T')[0];
-                    return entryDate === date;
-                });
-                setMoodRating(mood.length ? mood[mood.length - 1].mood : null);
-            }
-        };
-
-        fetchJournalEntries();
-        fetchMoodRating();
+        fetchDay();
     }, [date]);
 
     const getMoodEmoji = (rating) => {
@@ -293,29 +276,6 @@ function DayDetail() {
         navigate(`/day/${today}`);
     };
 
-    const fetchTodos = () => {
-        fetch('/api/todos')
-            .then(response => {
-                if (response.ok) {
-                    return response.json();
-                } else {
-                    throw new Error('Failed to fetch todos');
-                }
-            })
-            .then(data => {
-                const filteredTodos = data.filter(todo => {
-                    const todoDate = new Date(todo.created_at.replace(/-/g, '\/')).toLocaleDateString('en-US');
-                    const selectedDate = new Date(date.replace(/-/g, '\/')).toLocaleDateString('en-US');
-                    return todoDate === selectedDate;
-                });
-                setTodos(filteredTodos);
-            })
-            .catch(error => {
-                console.error('Error fetching todos:', error);
-            });
-    };    
-    
-
     const handleTaskSubmit = async () => {
         if (newTask.trim() === '') return;
         try {
@@ -17,6 +17,9 @@ function Diary() {
 
     const [visibleEntries, setVisibleEntries] = useState({});
 
+    const [searchQuery, setSearchQuery] = useState('');
+    const [searchResults, setSearchResults] = useState(null);
+
     useEffect(() => {
         fetch('/api/journals')
             .then(response => {
@@ -256,6 +259,30 @@ function Diary() {
         setShowMonthViewButton(false); // Hide "Month View" button
     };
 
+    const handleSearch = (e) => {
+        e.preventDefault();
+        if (!searchQuery.trim()) {
+            setSearchResults(null);
+            return;
+        }
+        fetch(`/api/journals/search?q=${encodeURIComponent(searchQuery)}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Failed to search journal entries');
+                }
+                return response.json();
+            })
+            .then(data => setSearchResults(data.items))
+            .catch(error => {
+                console.error('Error searching journal entries:', error);
+            });
+    };
+
+    const handleClearSearch = () => {
+        setSearchQuery('');
+        setSearchResults(null);
+    };
+
     const handleToggleEntryVisibility = (entryId) => {
         setVisibleEntries(prevState => ({
             ...prevState,
@@ -281,10 +308,29 @@ function Diary() {
             <br />
             <label style={{marginLeft:'1.5em'}} htmlFor="datePicker">Select Date: </label>
             <input type="date" id="datePicker" value={selectedDate || ''} onChange={handleDateChange} />
-            <br />
+            <form style={{marginLeft:'1.5em', marginTop:'0.5em'}} onSubmit={handleSearch}>
+                <input type="search" placeholder="Search entries" value={searchQuery} onChange={e => setSearchQuery(e.target.value)} />
+                <button type="submit">Search</button>
+                {searchResults && <button type="button" onClick={handleClearSearch}>Clear</button>}
+            </form>
             <br />
             <div className='diary-container'>
-                {filteredEntries.length > 0 ? (
+                {searchResults ? (
+                    searchResults.length > 0 ? (
+                        searchResults.map(result => (
+                            <div className="diary-content" key={result.id}>
+                                {/* header and snippet are HTML-escaped by the server, with matches in <mark> */}
+                                <h3 style={{marginTop:'1.5em'}} dangerouslySetInnerHTML={{ __html: result.journal_header }} />
+                                <p dangerouslySetInnerHTML={{ __html: result.snippet }} />
+                                <Link to={`/day/${new Date(result.created_at).toISOString().split('T')[0]}`}>
+                                    <p>{formatDateTime(result.created_at)}</p>
+                                </Link>
+                            </div>
+                        ))
+                    ) : (
+                        <p>No entries match your search.</p>
+                    )
+                ) : filteredEntries.length > 0 ? (
                     filteredEntries.map(entry => (
                         <div className="diary-content" key={entry.id}>
                             <button 
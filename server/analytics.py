@@ -0,0 +1,166 @@
+import math
+from array import array
+from datetime import date
+from itertools import accumulate, repeat
+from operator import mul, sub
+
+from flask import current_app
+from sqlalchemy import select
+
+from etags import current_versions
+from models import db, DailySummary
+from sessions import cache_store
+
+ROLLING_WINDOWS = (7, 30)
+ROLLING_DAYS = 90  # length of the rolling mean series in the response
+# the collections whose writes change the daily_summary columns analyze() reads
+SOURCE_COLLECTIONS = ('mood-ratings', 'todos')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# julianday() of 0001-01-01 at midnight, so julianday(day) - JULIAN_EPOCH == day.toordinal()
+JULIAN_EPOCH = 1721424.5
+
+
+def load_series(user_id):
+    """(ordinal, mood_rating, todos_total, todos_completed) per day from daily_summary, oldest first.
+
+    Days come back as plain integers so no per-row date parsing is needed.
+    """
+    ordinal = db.cast(db.func.julianday(DailySummary.day) - JULIAN_EPOCH, db.Integer)
+    return db.session.execute(
+        select(ordinal, DailySummary.mood_rating, DailySummary.todos_total, DailySummary.todos_completed)
+        .where(DailySummary.user_id == user_id)
+        .order_by(DailySummary.day)
+    ).all()
+
+
+def _round(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+def _rolling_means(sums, counts, window, start, stop):
+    # prefix sums shifted by `window` give each day's trailing window total
+    totals = map(sub, sums[start + 1:stop + 1], sums[start + 1 - window:stop + 1 - window])
+    logged = map(sub, counts[start + 1:stop + 1], counts[start + 1 - window:stop + 1 - window])
+    return [total / n if n else None for total, n in zip(totals, logged)]
+
+
+def _streaks(ordinals, today):
+    # runs of consecutive days are split wherever the gap to the previous rating isn't 1
+    breaks = [index for index, gap in enumerate(map(sub, ordinals[1:], ordinals[:-1]), 1) if gap != 1]
+    bounds = [0, *breaks, len(ordinals)]
+    runs = list(zip(bounds, bounds[1:]))
+    first, stop = max(runs, key=lambda run: run[1] - run[0])
+    # a streak is still current until a whole day passes without a rating
+    last_first, last_stop = runs[-1]
+    current = last_stop - last_first if ordinals[-1] >= today - 1 else 0
+    return {
+        'days': stop - first,
+        'start': date.fromordinal(ordinals[first]).isoformat(),
+        'end': date.fromordinal(ordinals[stop - 1]).isoformat(),
+    }, current
+
+
+def _correlation(xs, ys):
+    n = len(xs)
+    if n < 3:
+        return None
+    sum_x, sum_y = math.fsum(xs), math.fsum(ys)
+    cov = math.fsum(map(mul, xs, ys)) - sum_x * sum_y / n
+    var_x = math.fsum(map(mul, xs, xs)) - sum_x * sum_x / n
+    var_y = math.fsum(map(mul, ys, ys)) - sum_y * sum_y / n
+    # a constant series has no correlation; allow for rounding in the sums
+    if var_x < 1e-9 or var_y < 1e-9:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+
+def analyze(rows, today=None):
+    """Mood trends for one user's load_series() rows.
+
+    Ratings are spread over a dense per-day array so rolling means and
+    weekday averages come from prefix sums and strided slices rather than
+    per-day Python loops.
+    """
+    today = (today or date.today()).toordinal()
+    result = {
+        'as_of': date.fromordinal(today).isoformat(),
+        'days_logged': 0,
+        'average': None,
+        'longest_streak': None,
+        'current_streak': 0,
+        'weekday_averages': dict.fromkeys(WEEKDAYS),
+        'mood_todo_correlation': None,
+        'rolling': [],
+    }
+    rated = [row for row in rows if row[1] is not None]
+    if not rated:
+        return result
+
+    first = rated[0][0]
+    size = max(rated[-1][0], today) - first + 1
+    mood = array('d', repeat(0.0, size))
+    logged = array('d', repeat(0.0, size))
+    completion_x, completion_y = [], []
+    for ordinal, rating, todos_total, todos_completed in rated:
+        mood[ordinal - first] = rating
+        logged[ordinal - first] = 1.0
+        if todos_total:
+            completion_x.append(rating)
+            completion_y.append(todos_completed / todos_total)
+
+    days_logged = len(rated)
+    result['days_logged'] = days_logged
+    result['average'] = _round(math.fsum(mood) / days_logged)
+    result['longest_streak'], result['current_streak'] = _streaks([row[0] for row in rated], today)
+
+    # index i is ordinal first + i, and date.fromordinal(1) was a Monday
+    for weekday, name in enumerate(WEEKDAYS):
+        offset = (weekday - (first - 1)) % 7
+        count = math.fsum(logged[offset::7])
+        result['weekday_averages'][name] = _round(math.fsum(mood[offset::7]) / count) if count else None
+
+    result['mood_todo_correlation'] = _round(_correlation(completion_x, completion_y), 3)
+
+    # left-pad the prefix sums so a window reaching before the first rating starts at zero
+    pad = max(ROLLING_WINDOWS)
+    sums = array('d', repeat(0.0, pad))
+    sums.extend(accumulate(mood, initial=0.0))
+    counts = array('d', repeat(0.0, pad))
+    counts.extend(accumulate(logged, initial=0.0))
+    start = max(0, size - ROLLING_DAYS)
+    means = {window: _rolling_means(sums, counts, window, start + pad, size + pad) for window in ROLLING_WINDOWS}
+    result['rolling'] = [
+        {
+            'day': date.fromordinal(first + index).isoformat(),
+            'mood': int(mood[index]) if logged[index] else None,
+            **{f'mean_{window}': _round(means[window][index - start]) for window in ROLLING_WINDOWS},
+        }
+        for index in range(start, size)
+    ]
+    return result
+
+
+def mood_analytics(user_id):
+    """analyze() for one user, cached until they next write a mood or todo, or the day rolls over.
+
+    The key holds the mood and todo collection versions, which every write
+    bumps in its own transaction, and they are read in the same snapshot as
+    the series. So a result is only ever found under the versions it was
+    computed from, and workers never serve each other stale entries.
+    """
+    today = date.today()
+    versions = current_versions(user_id, SOURCE_COLLECTIONS)
+    key = f"analytics:{user_id}:{today.isoformat()}:" + ':'.join(str(versions[name]) for name in SOURCE_COLLECTIONS)
+    cache = current_app.extensions['analytics_cache']
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    result = analyze(load_series(user_id), today)
+    cache.set(key, result, current_app.config.get('ANALYTICS_CACHE_TTL', 3600))
+    return result
+
+
+def init_analytics(app):
+    """Keep mood_analytics() results in a store of their own, limited to ANALYTICS_CACHE_SIZE entries."""
+    app.extensions['analytics_cache'] = cache_store(app, 'analytics_cache', app.config.get('ANALYTICS_CACHE_SIZE', 1000))
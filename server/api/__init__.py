@@ -0,0 +1,18 @@
+from .users import users
+from .moods import moods
+from .journals import journals
+from .medications import medications
+from .todos import todos
+from .days import days
+from .calendar import calendar
+from .transfer import transfer
+from .reminders import reminders
+from .sync import sync
+from .metrics import metrics
+
+blueprints = (users, moods, journals, medications, todos, days, calendar, transfer, reminders, sync, metrics)
+
+
+def register_blueprints(app):
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
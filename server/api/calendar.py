@@ -0,0 +1,27 @@
+from datetime import date, datetime
+
+from flask import Blueprint, request, session, jsonify
+
+from models import DailySummary
+from serializers import daily_summary_serializer
+
+calendar = Blueprint('calendar', __name__)
+
+@calendar.get('/api/calendar')
+def get_calendar_month():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            month = datetime.strptime(request.args['month'], '%Y-%m').date() if request.args.get('month') else date.today().replace(day=1)
+        except ValueError:
+            return jsonify({'error': "'month' must be in YYYY-MM format"}), 400
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        summaries = daily_summary_serializer.select(DailySummary.query.filter(
+            DailySummary.user_id == user_id, DailySummary.day >= month, DailySummary.day < next_month,
+        )).order_by(DailySummary.day)
+        return jsonify({
+            'month': month.strftime('%Y-%m'),
+            'days': daily_summary_serializer.rows(summaries),
+        }), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from flask import Blueprint, session, jsonify
+
+from models import db, Mood, Journal, Todos
+from pagination import filter_date_range, PaginationError
+from serializers import journal_serializer, todo_serializer
+
+days = Blueprint('days', __name__)
+
+@days.get('/api/days/<day>')
+def get_day(day):
+    user_id = session.get('user_id')
+    if user_id:
+        # strptime also takes e.g. 2024-1-1, so everything below uses the canonical form
+        try:
+            day = datetime.strptime(day, '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            return jsonify({'error': 'The date must be in YYYY-MM-DD format'}), 400
+        day_range = {'from': day, 'to': day}
+        try:
+            journals = filter_date_range(journal_serializer.select(Journal.query.filter_by(user_id=user_id)), Journal.created_at, day_range)
+            todos = filter_date_range(todo_serializer.select(Todos.query.filter_by(user_id=user_id)), Todos.created_at, day_range)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        mood = db.session.scalar(
+            db.select(Mood.mood_rating).where(Mood.user_id == user_id, db.func.date(Mood.created_at) == day)
+        )
+        return jsonify({
+            'date': day,
+            'mood': mood,
+            'journals': journal_serializer.rows(journals.order_by(Journal.created_at, Journal.id)),
+            'todos': todo_serializer.rows(todos.order_by(Todos.created_at, Todos.id)),
+        }), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
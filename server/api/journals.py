@@ -0,0 +1,121 @@
+from datetime import datetime
+
+from flask import Blueprint, request, session, jsonify
+
+from database import retry_on_busy
+from etags import conditional_get
+from models import db, Journal
+from pagination import decode_offset_cursor, encode_offset_cursor, paginate, page_response, parse_limit, PaginationError
+from search import SEARCH_PAGE_SIZE, search_journals
+from serializers import journal_serializer
+
+journals = Blueprint('journals', __name__)
+
+@journals.get('/api/journals')
+@conditional_get('journals')
+def get_journals():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            query = journal_serializer.select(Journal.query.filter_by(user_id=user_id))
+            journals, next_cursor, paginated = paginate(query, Journal.created_at, Journal.id, request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_response(journal_serializer.rows(journals), next_cursor, paginated)), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@journals.get('/api/journals/search')
+def search_journal_entries():
+    user_id = session.get('user_id')
+    if user_id:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': "'q' is required"}), 400
+        try:
+            limit = parse_limit(request.args, default=SEARCH_PAGE_SIZE)
+            offset = decode_offset_cursor(request.args['cursor']) if request.args.get('cursor') else 0
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        items, has_more = search_journals(user_id, q, limit, offset)
+        next_cursor = encode_offset_cursor(offset + limit) if has_more else None
+        return jsonify(page_response(items, next_cursor, True)), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@journals.post('/api/journals')
+@retry_on_busy
+def create_journal():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            new_journal = Journal(
+                journal_header=request.json['journal_header'],
+                journal_text=request.json['journal_text'],
+                user_id=user_id
+            )
+            db.session.add(new_journal)
+            db.session.commit()
+            return jsonify(journal_serializer.instance(new_journal)), 201
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@journals.post('/api/journal-entries')
+@retry_on_busy
+def submit_journal_entry():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            journal_header = request.json.get('journal_header', 'Journal Entry')
+            journal_text = request.json.get('journal_text', '')
+            created_at = request.json.get('created_at', datetime.now())  # Default to current date if not provided
+            created_at = datetime.strptime(created_at, '%Y-%m-%d')  # Ensure it's in the correct format
+            new_journal = Journal(journal_header=journal_header, journal_text=journal_text, user_id=user_id, created_at=created_at)
+            db.session.add(new_journal)
+            db.session.commit()
+            return jsonify({'message': 'Journal entry submitted successfully'}), 201
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+
+@journals.put('/api/journals/<int:id>')
+@retry_on_busy
+def edit_journal_entry(id):
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            journal_entry = Journal.query.filter_by(id=id, user_id=user_id).first()
+            if journal_entry:
+                journal_entry.journal_header = request.json.get('journal_header', journal_entry.journal_header)
+                journal_entry.journal_text = request.json.get('journal_text', journal_entry.journal_text)
+                db.session.commit()
+                return jsonify({'message': 'Journal entry updated successfully'}), 200
+            else:
+                return jsonify({'error': 'Journal entry not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@journals.delete('/api/journals/<int:id>')
+@retry_on_busy
+def delete_journal_entry(id):
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            journal_entry = Journal.query.filter_by(id=id, user_id=user_id).first()
+            if journal_entry:
+                db.session.delete(journal_entry)
+                db.session.commit()
+                return jsonify({'message': 'Journal entry deleted successfully'}), 200
+            else:
+                return jsonify({'error': 'Journal entry not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+    
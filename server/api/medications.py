@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, session, jsonify
+
+from database import retry_on_busy
+from etags import conditional_get
+from models import db, Medications
+from pagination import paginate, page_response, PaginationError
+from serializers import medication_serializer
+
+medications = Blueprint('medications', __name__)
+
+@medications.route('/api/medications')
+@conditional_get('medications')
+def get_medications():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            query = medication_serializer.select(Medications.query.filter_by(user_id=user_id))
+            medications, next_cursor, paginated = paginate(query, Medications.renew_date, Medications.id, request.args)
+            return jsonify(page_response(medication_serializer.rows(medications), next_cursor, paginated)), 200
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            current_app.logger.exception('Error fetching medications')
+            return jsonify({'error': 'Internal Server Error'}), 500
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@medications.post('/api/medications')
+@retry_on_busy
+def add_medication():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            renew_date_str = request.json['renew_date']
+            renew_date = datetime.strptime(renew_date_str, '%Y-%m-%d').date()
+
+            new_medication = Medications(
+                drug_name=request.json['drug_name'],
+                dosage=request.json['dosage'],
+                prescriber=request.json['prescriber'],
+                renew_date=renew_date,
+                user_id=user_id
+            )
+            db.session.add(new_medication)
+            db.session.commit()
+            return jsonify(medication_serializer.instance(new_medication)), 201
+        except Exception as e:
+            return jsonify({'error': 'Failed to add medication', 'details': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+
+@medications.delete('/api/medications/<int:id>')
+@retry_on_busy
+def delete_medication(id):
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            medication = Medications.query.filter_by(id=id, user_id=user_id).first()
+            if medication:
+                db.session.delete(medication)
+                db.session.commit()
+                return jsonify({'message': 'Medication deleted successfully'}), 200
+            else:
+                return jsonify({'error': 'Medication not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@medications.put('/api/medications/<int:id>')
+@retry_on_busy
+def update_medication(id):
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            medication = Medications.query.filter_by(id=id, user_id=user_id).first()
+            if medication:
+                medication.drug_name = request.json.get('drug_name', medication.drug_name)
+                medication.dosage = request.json.get('dosage', medication.dosage)
+                medication.prescriber = request.json.get('prescriber', medication.prescriber)
+                medication.renew_date = datetime.strptime(request.json.get('renew_date', medication.renew_date), '%Y-%m-%d').date()  # Convert string to date
+                
+                db.session.commit()
+                return jsonify({'message': 'Medication updated successfully'}), 200
+            else:
+                return jsonify({'error': 'Medication not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
@@ -0,0 +1,15 @@
+import hmac
+
+from flask import Blueprint, current_app, abort, jsonify, request
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.get('/metrics')
+def get_metrics():
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Invalid metrics token'}), 401
+    return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
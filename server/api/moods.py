@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from flask import Blueprint, request, session, jsonify
+
+from analytics import mood_analytics
+from batch import apply_mood_batch, BatchError
+from database import retry_on_busy
+from etags import conditional_get
+from models import db, Mood
+from pagination import paginate, page_response, PaginationError
+
+moods = Blueprint('moods', __name__)
+
+@moods.get('/api/mood-ratings')
+@conditional_get('mood-ratings')
+def get_mood_ratings():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            moods, next_cursor, paginated = paginate(Mood.query.filter_by(user_id=user_id), Mood.created_at, Mood.id, request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        mood_ratings = [{'created_at': mood.created_at, 'mood': mood.mood_rating} for mood in moods]
+        return jsonify(page_response(mood_ratings, next_cursor, paginated)), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@moods.get('/api/mood-ratings/analytics')
+def get_mood_analytics():
+    user_id = session.get('user_id')
+    if user_id:
+        return jsonify(mood_analytics(user_id)), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@moods.post('/api/mood-ratings')
+@retry_on_busy
+def submit_mood_rating():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            # Get the date for which the mood rating is being submitted
+            created_at_str = request.json.get('created_at')
+            created_at = datetime.strptime(created_at_str, '%Y-%m-%d').date() if created_at_str else datetime.now().date()
+            
+            # Check if a mood rating for the specified date already exists for the user
+            existing_rating = Mood.query.filter(Mood.user_id == user_id, db.func.date(Mood.created_at) == created_at.isoformat()).first()
+            if existing_rating:
+                # Update the existing mood rating
+                existing_rating.mood_rating = request.json['mood']
+                db.session.commit()
+                return jsonify({'message': 'Mood rating updated successfully'}), 200
+            else:
+                # Create a new mood rating
+                new_mood = request.json['mood']
+                if new_mood not in range(1, 6):
+                    return jsonify({'error': 'Invalid mood rating'}), 400
+                new_mood = Mood(mood_rating=new_mood, user_id=user_id, created_at=created_at)
+                db.session.add(new_mood)
+                db.session.commit()
+                return jsonify({'message': 'Mood rating submitted successfully'}), 201
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+
+@moods.put('/api/mood-ratings/batch')
+@retry_on_busy
+def submit_mood_ratings_batch():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            return jsonify({'results': apply_mood_batch(user_id, request.json)}), 200
+        except BatchError as e:
+            return jsonify({'error': str(e), 'errors': e.errors}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from flask import Blueprint, session, jsonify
+from sqlalchemy_serializer import SerializerMixin
+
+from database import retry_on_busy
+from models import db, Reminder
+from reminders import pending_reminders
+
+reminders = Blueprint('reminders', __name__)
+
+@reminders.get('/api/reminders')
+def get_reminders():
+    user_id = session.get('user_id')
+    if user_id:
+        return jsonify([
+            {
+                'id': reminder.id,
+                'medication_id': reminder.medication_id,
+                'drug_name': reminder.drug_name,
+                'dosage': reminder.dosage,
+                'due_date': reminder.due_date.strftime(SerializerMixin.date_format),
+            }
+            for reminder in pending_reminders(user_id)
+        ]), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@reminders.delete('/api/reminders/<int:id>')
+@retry_on_busy
+def dismiss_reminder(id):
+    user_id = session.get('user_id')
+    if user_id:
+        reminder = Reminder.query.filter_by(id=id, user_id=user_id).first()
+        if reminder is None:
+            return jsonify({'error': 'Reminder not found'}), 404
+        # kept as dismissed so the next run doesn't create it again
+        reminder.dismissed_at = datetime.now()
+        db.session.commit()
+        return jsonify({'message': 'Reminder dismissed'}), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
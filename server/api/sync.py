@@ -0,0 +1,24 @@
+from flask import Blueprint, request, session, jsonify
+
+from database import retry_on_busy
+from sync import sync_changes
+
+sync = Blueprint('sync', __name__)
+
+# Writes too: the call acknowledges `since` for this session's sync client
+@sync.get('/api/sync')
+@retry_on_busy
+def get_changes():
+    user_id = session.get('user_id')
+    if user_id:
+        since = request.args.get('since')
+        if since is not None:
+            if not since.isdigit():
+                return jsonify({'error': "'since' must be a non-negative integer"}), 400
+            since = int(since)
+        response, client_id = sync_changes(user_id, session.get('sync_client'), since)
+        if session.get('sync_client') != client_id:
+            session['sync_client'] = client_id
+        return jsonify(response), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
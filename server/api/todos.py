@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from flask import Blueprint, request, session, jsonify
+
+from batch import apply_todo_batch, BatchError
+from database import retry_on_busy
+from etags import conditional_get
+from models import db, Todos
+from pagination import paginate, page_response, PaginationError
+from serializers import todo_serializer
+
+todos = Blueprint('todos', __name__)
+
+@todos.get('/api/todos')
+@conditional_get('todos')
+def get_todos():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            query = todo_serializer.select(Todos.query.filter_by(user_id=user_id))
+            todos, next_cursor, paginated = paginate(query, Todos.created_at, Todos.id, request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_response(todo_serializer.rows(todos), next_cursor, paginated)), 200
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@todos.post('/api/todos')
+@retry_on_busy
+def create_todo():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            created_at_str = request.json.get('created_at')
+            created_at = datetime.strptime(created_at_str, '%Y-%m-%dT%H:%M:%S.%fZ') if created_at_str else datetime.now()
+
+            new_todo = Todos(
+                task_text=request.json['task_text'],
+                user_id=user_id,
+                created_at=created_at
+            )
+            db.session.add(new_todo)
+            db.session.commit()
+            return jsonify(todo_serializer.instance(new_todo)), 201
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@todos.put('/api/todos/<int:id>')
+@retry_on_busy
+def update_todo(id):
+    user_id = session.get('user_id')
+    if user_id:
+        todo = Todos.query.filter_by(id=id, user_id=user_id).first()
+        if not todo:
+            return jsonify({'error': 'Todo not found'}), 404
+        try:
+            todo.task_text = request.json.get('task_text', todo.task_text)
+            todo.completed = request.json.get('completed', todo.completed)
+            created_at_str = request.json.get('created_at')
+            if created_at_str:
+                created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
+                todo.created_at = created_at
+            db.session.commit()
+            return jsonify(todo_serializer.instance(todo)), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+
+@todos.delete('/api/todos/<int:id>')
+@retry_on_busy
+def delete_todo(id):
+    user_id = session.get('user_id')
+    if user_id:
+        todo = Todos.query.filter_by(id=id, user_id=user_id).first()
+        if not todo:
+            return jsonify({'error': 'Todo not found'}), 404
+        try:
+            db.session.delete(todo)
+            db.session.commit()
+            return jsonify({'message': 'Todo deleted successfully'}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@todos.post('/api/todos/batch')
+@retry_on_busy
+def todos_batch():
+    user_id = session.get('user_id')
+    if user_id:
+        try:
+            return jsonify({'results': apply_todo_batch(user_id, request.json)}), 200
+        except BatchError as e:
+            return jsonify({'error': str(e), 'errors': e.errors}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
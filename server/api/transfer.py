@@ -0,0 +1,65 @@
+import shutil
+from datetime import date
+from tempfile import SpooledTemporaryFile
+
+from flask import Blueprint, Response, request, session, jsonify, stream_with_context
+
+from batch import BatchError
+from database import retry_on_busy
+from models import db
+from transfer import EXPORT_FORMATS, IMPORT_SPOOL_SIZE, check_records, export_csv, export_ndjson, import_records
+
+transfer = Blueprint('transfer', __name__)
+
+@transfer.get('/api/export')
+def export_data():
+    user_id = session.get('user_id')
+    if user_id:
+        format = request.args.get('format', 'ndjson')
+        if format not in EXPORT_FORMATS:
+            return jsonify({'error': "'format' must be ndjson or csv"}), 400
+        rows = export_ndjson(user_id) if format == 'ndjson' else export_csv(user_id)
+        filename = f'mood-tracker-{date.today().isoformat()}.{format}'
+        return Response(stream_with_context(rows), mimetype=EXPORT_FORMATS[format],
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@transfer.post('/api/import')
+def import_data():
+    user_id = session.get('user_id')
+    if user_id:
+        upload = request.files.get('file')
+        format = request.args.get('format')
+        if format is None:
+            mimetype = upload.mimetype if upload else request.mimetype
+            name = upload.filename if upload else ''
+            format = 'csv' if mimetype == 'text/csv' or (name or '').endswith('.csv') else 'ndjson'
+        if format not in EXPORT_FORMATS:
+            return jsonify({'error': "'format' must be ndjson or csv"}), 400
+        # The whole upload is read and checked before the write transaction
+        # starts, so a slow client never holds the database write lock.
+        # Multipart uploads are already spooled by Werkzeug; a raw body is spooled here.
+        with SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as spool:
+            if upload:
+                stream = upload.stream
+            else:
+                shutil.copyfileobj(request.stream, spool, 64 * 1024)
+                stream = spool
+            stream.seek(0)
+            try:
+                check_records(stream, format)
+            except BatchError as e:
+                return jsonify({'error': str(e), 'errors': e.errors}), 400
+            return _import(user_id, stream, format)
+    else:
+        return jsonify({'error': 'User not logged in'}), 401
+
+@retry_on_busy
+def _import(user_id, stream, format):
+    # import_records() rereads the stream from the start, so a retry imports the same records
+    try:
+        return jsonify({'imported': import_records(user_id, stream, format)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
@@ -0,0 +1,102 @@
+from flask import Blueprint, current_app, request, session
+from sqlalchemy import update
+from sqlalchemy.orm import selectinload
+
+from database import retry_on_busy
+from extensions import password_hasher
+from passwords import HasherBusy
+from models import db, User, Journal
+from serializers import user_serializer
+from sessions import cache_profile, cached_profile
+from shards import select_shard
+
+users = Blueprint('users', __name__)
+
+@users.get('/api/users')
+def index():
+    return user_serializer.rows(user_serializer.select(User.query.order_by(User.id))), 200
+
+@users.get('/api/users/<int:id>')
+def users_by_id(id):
+    select_shard(id)  # the journals are on this user's shard, not the caller's
+    user = User.query.options(selectinload(User.journals).selectinload(Journal.mood)).where(User.id == id).first()
+    if user:
+        return user.to_dict(rules=('-_hashed_password', '-journals.mood.journal')), 200
+    else:
+        return {'error': 'Not found'}, 404
+
+@users.post('/api/users')
+@retry_on_busy
+def create_user():
+    try:
+        new_user = User(username=request.json['username'], first_name=request.json['first_name'], last_name=request.json['last_name'])
+        # using the bcrypt library to hash the password
+        new_user._hashed_password = password_hasher.hash(request.json['_hashed_password'])
+        db.session.add(new_user)
+        db.session.commit()
+        session.regenerate()
+        session['user_id'] = new_user.id  # Store the user ID in the session
+        profile = user_serializer.instance(new_user)
+        cache_profile(new_user.id, profile)
+        return profile, 201
+    except HasherBusy as e:
+        return {'error': str(e)}, 503
+    except Exception as e:
+        return { 'error': str(e) }, 406
+    
+@users.get('/api/get-session')
+def get_session():
+    user_id = session.get('user_id')  # Retrieve the user ID from the session
+    if user_id:
+        profile = cached_profile(user_id)
+        if profile is None:
+            user = user_serializer.select(User.query.filter_by(id=user_id)).first()
+            if user:
+                profile = user_serializer.row(user)
+                cache_profile(user_id, profile)
+        if profile:
+            return profile, 200
+    return {}, 204
+
+@users.post('/api/login')
+def login():
+    username = request.json.get('user')
+    password = request.json.get('password')
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        return {'error': 'Username or password was invalid'}, 401
+    profile = user_serializer.instance(user)
+    hashed_password = user._hashed_password
+    # end the read transaction before the slow hash check
+    db.session.rollback()
+    try:
+        if not password_hasher.check(hashed_password, password):
+            return {'error': 'Username or password was invalid'}, 401
+        if password_hasher.needs_rehash(hashed_password):
+            rehash_password(profile['id'], hashed_password, password)
+    except HasherBusy as e:
+        return {'error': str(e)}, 503
+    session.regenerate()
+    session['user_id'] = profile['id']
+    cache_profile(profile['id'], profile)
+    return profile, 201
+
+def rehash_password(user_id, old_hash, password):
+    # Upgrade the hash to the configured BCRYPT_LOG_ROUNDS; a failure here must not fail the login
+    try:
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id, User._hashed_password == old_hash)
+            .values(_hashed_password=password_hasher.hash(password))
+        )
+        db.session.commit()
+    except HasherBusy:
+        raise
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Failed to rehash password for user %s', user_id)
+
+@users.delete('/api/logout')
+def logout():
+    session.pop('user_id')
+    return {}, 204
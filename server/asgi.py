@@ -0,0 +1,159 @@
+"""Serve the API from an ASGI server:
+
+    uvicorn asgi:create_asgi_app --factory --port 5555
+
+The routes, hooks and database code are the same as under WSGI; only the
+connection handling changes. The server's event loop accepts connections,
+parses HTTP and moves bytes, so idle keep-alive connections and clients
+still sending or reading a body cost no thread. Handlers run on a pool of
+ASGI_THREADS threads, and requests beyond that wait in a queue instead of
+each getting a thread of their own.
+"""
+import asyncio
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from app import create_app
+
+BODY_SPOOL_SIZE = 1024 * 1024  # request bodies above this many bytes are buffered on disk
+
+
+class WsgiToAsgi:
+    """Run a WSGI app under an ASGI server, handlers on a bounded thread pool.
+
+    asgiref's adapter of the same name runs every request on one shared
+    thread, and never closes the response iterable, which is where Flask
+    tears down the app context, so it isn't used here.
+    """
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        with SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            response = _Response()
+            step = None
+
+            def run(fn, *args):
+                nonlocal step
+                step = self.executor.submit(response.context.run, fn, *args)
+                return asyncio.wrap_future(step)
+
+            try:
+                # usually the whole body comes back from the first call; streamed ones are pulled a chunk at a time
+                chunk = await run(response.start, self.wsgi_app, environ(scope, body))
+                await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+                while chunk is not None:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    chunk = await run(response.next_chunk)
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                # if the client went away mid-step, the generator is still running on a pool thread
+                if step is not None and not step.done():
+                    await asyncio.wait([asyncio.wrap_future(step)])
+                await run(response.close)
+
+
+class _Response:
+    """One WSGI call's status, headers and body iterator, driven from the pool threads.
+
+    Each step may run on a different thread, so they all run in one copy of
+    the contextvars: Flask keeps the request context there, and a
+    stream_with_context generator such as /api/export's needs it on every chunk.
+    """
+
+    def __init__(self):
+        self.context = contextvars.copy_context()
+        self.status = None
+        self.headers = None
+        self.iterator = None
+        self.close = lambda: None
+
+    def _start_response(self, status, headers, exc_info=None):
+        if exc_info and self.iterator is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+    def start(self, wsgi_app, environ):
+        result = wsgi_app(environ, self._start_response)
+        self.close = getattr(result, 'close', self.close)
+        self.iterator = iter(result)
+        chunk = self.next_chunk()
+        if self.status is None:
+            raise RuntimeError('WSGI app returned without calling start_response')
+        return chunk
+
+    def next_chunk(self):
+        return next(self.iterator, None)
+
+
+def environ(scope, body):
+    """The WSGI environ for an ASGI HTTP scope."""
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # the whole body has been read, so it can be consumed without a Content-Length
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def create_asgi_app(config=None):
+    """create_app() behind WsgiToAsgi, with ASGI_THREADS handler threads."""
+    flask_app = create_app(config)
+    return WsgiToAsgi(flask_app, flask_app.config['ASGI_THREADS'])
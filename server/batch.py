@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from daily_summary import refresh_days
+from etags import bump_versions
+from models import db, Mood, Todos
+from sync import log_changes
+
+MAX_BATCH_SIZE = 1000
+
+
+class BatchError(ValueError):
+    """Raised when a batch fails validation; nothing has been written."""
+
+    def __init__(self, errors):
+        super().__init__('Invalid batch')
+        self.errors = errors
+
+
+def _parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _check_items(items):
+    if not isinstance(items, list):
+        raise BatchError([{'error': 'Expected a JSON array'}])
+    if len(items) > MAX_BATCH_SIZE:
+        raise BatchError([{'error': f'At most {MAX_BATCH_SIZE} items per batch'}])
+
+
+def _validate_todo(item):
+    if not isinstance(item, dict):
+        raise ValueError('Expected an object')
+    op = item.get('op')
+    if op == 'create':
+        if not isinstance(item.get('task_text'), str) or not item['task_text']:
+            raise ValueError("'task_text' is required")
+        created_at = _parse_timestamp(item['created_at']) if item.get('created_at') else datetime.now()
+        return {'op': op, 'values': {'task_text': item['task_text'], 'completed': bool(item.get('completed', False)), 'created_at': created_at}}
+    if op in ('update', 'delete'):
+        if not isinstance(item.get('id'), int):
+            raise ValueError("'id' must be an integer")
+        if op == 'delete':
+            return {'op': op, 'id': item['id']}
+        values = {}
+        if 'task_text' in item:
+            if not isinstance(item['task_text'], str) or not item['task_text']:
+                raise ValueError("'task_text' must be a non-empty string")
+            values['task_text'] = item['task_text']
+        if 'completed' in item:
+            values['completed'] = bool(item['completed'])
+        if item.get('created_at'):
+            values['created_at'] = _parse_timestamp(item['created_at'])
+        return {'op': op, 'id': item['id'], 'values': values}
+    raise ValueError("'op' must be one of create, update, delete")
+
+
+def apply_todo_batch(user_id, items):
+    """Validate every operation, then apply them all in one transaction.
+
+    Returns one result per item, in order: {'index', 'status', 'id'} or
+    {'index', 'status': 404, 'error'} for ids the user does not own.
+    """
+    _check_items(items)
+    operations, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            operations.append(_validate_todo(item))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        raise BatchError(errors)
+
+    referenced = {op['id'] for op in operations if op['op'] != 'create'}
+    owned = dict(db.session.execute(
+        select(Todos.id, Todos.created_at).where(Todos.user_id == user_id, Todos.id.in_(referenced))
+    ).all()) if referenced else {}
+
+    creates = [dict(op['values'], user_id=user_id) for op in operations if op['op'] == 'create']
+    created_ids = db.session.scalars(
+        insert(Todos).returning(Todos.id, sort_by_parameter_order=True), creates
+    ).all() if creates else []
+
+    # Bulk UPDATE by primary key groups rows by their set of keys
+    updates = [dict(op['values'], id=op['id']) for op in operations
+               if op['op'] == 'update' and op['id'] in owned and op['values']]
+    if updates:
+        db.session.execute(update(Todos), updates)
+
+    deletes = {op['id'] for op in operations if op['op'] == 'delete' and op['id'] in owned}
+    if deletes:
+        db.session.execute(delete(Todos).where(Todos.user_id == user_id, Todos.id.in_(deletes)))
+
+    # Core and bulk statements skip the ORM flush, so refresh the rollup here
+    days = {created['created_at'] for created in creates} | set(owned.values())
+    days |= {op['values']['created_at'] for op in operations
+             if op['op'] == 'update' and op['id'] in owned and 'created_at' in op['values']}
+    refresh_days(db.session.connection(), user_id, {day.date() for day in days if day is not None})
+    if creates or updates or deletes:
+        bump_versions(db.session.connection(), {(user_id, 'todos')})
+    log_changes(db.session.connection(), user_id,
+                [('todos', id, 'create') for id in created_ids]
+                + [('todos', update['id'], 'update') for update in updates]
+                + [('todos', id, 'delete') for id in sorted(deletes)])
+    db.session.commit()
+
+    created_ids = iter(created_ids)
+    results = []
+    for index, op in enumerate(operations):
+        if op['op'] == 'create':
+            results.append({'index': index, 'status': 201, 'id': next(created_ids)})
+        elif op['id'] in owned:
+            results.append({'index': index, 'status': 200, 'id': op['id']})
+        else:
+            results.append({'index': index, 'status': 404, 'id': op['id'], 'error': 'Todo not found'})
+    return results
+
+
+def _validate_mood(item):
+    if not isinstance(item, dict):
+        raise ValueError('Expected an object')
+    mood = item.get('mood')
+    if type(mood) is not int or mood not in range(1, 6):
+        raise ValueError('Invalid mood rating')
+    if not isinstance(item.get('created_at'), str):
+        raise ValueError("'created_at' is required")
+    return datetime.strptime(item['created_at'], '%Y-%m-%d'), mood
+
+
+def apply_mood_batch(user_id, items):
+    """Upsert one mood rating per day in a single statement.
+
+    Later items win when a batch repeats a day. Returns one result per item
+    with status 201 for a new day and 200 for a replaced rating.
+    """
+    _check_items(items)
+    ratings, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            ratings.append(_validate_mood(item))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    if errors:
+        raise BatchError(errors)
+    if not ratings:
+        return []
+
+    days = {day: mood for day, mood in ratings}
+    existing = set(db.session.scalars(
+        select(db.func.date(Mood.created_at)).where(
+            Mood.user_id == user_id,
+            Mood.created_at >= min(days),
+            Mood.created_at < max(days) + timedelta(days=1),
+        )
+    ))
+    upsert = sqlite_insert(Mood)
+    statement = upsert.on_conflict_do_update(
+        index_elements=[Mood.user_id, db.func.date(Mood.created_at)],
+        set_={'mood_rating': upsert.excluded.mood_rating},
+    )
+    upserted = db.session.scalars(statement.returning(Mood.id, sort_by_parameter_order=True), [
+        {'user_id': user_id, 'created_at': day, 'mood_rating': mood} for day, mood in days.items()
+    ]).all()
+    refresh_days(db.session.connection(), user_id, {day.date() for day in days})
+    bump_versions(db.session.connection(), {(user_id, 'mood-ratings')})
+    log_changes(db.session.connection(), user_id, [
+        ('mood-ratings', id, 'update' if day.date().isoformat() in existing else 'create')
+        for day, id in zip(days, upserted)
+    ])
+    db.session.commit()
+
+    results = []
+    for index, (day, _) in enumerate(ratings):
+        iso_day = day.date().isoformat()
+        results.append({'index': index, 'status': 200 if iso_day in existing else 201, 'created_at': iso_day})
+        existing.add(iso_day)
+    return results
@@ -0,0 +1,1322 @@
+#!/usr/bin/env python3
+"""Ad-hoc performance benchmarks for the API.
+
+Runs against a throwaway SQLite database, never app.db:
+
+    python bench.py pagination
+    python bench.py suite --save-baseline   # then `python bench.py suite` to check for regressions
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from statistics import median
+
+from sqlalchemy import delete, event, insert, select, text
+
+from analytics import analyze, load_series
+from app import create_app
+from compression import brotli
+from daily_summary import rebuild
+from etags import bump_versions
+from extensions import password_hasher
+from models import db, User, Journal, Medications, Mood, Reminder, Todos
+from seed import seed_history
+from query_counter import QueryCounter
+from reminders import schedule_reminders
+from serializers import OrjsonProvider, journal_serializer, orjson
+from transfer import EXPORT_FORMATS
+
+app = create_app({
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+    'SECRET_KEY': 'bench',
+    # the benchmarks time the views themselves; `response-cache` builds cached apps of its own
+    'RESPONSE_CACHE_BACKEND': 'off',
+})
+
+
+def use_temp_database():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+
+def login_client(user_id, app=app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return client
+
+
+def time_request(client, url, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return median(timings), len(response.data)
+
+
+def bench_pagination(args):
+    """Per-page latency for the list endpoints as a user's history grows."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = login_client(user_id)
+    end = date.today()
+    # History is grown backwards so the most recent month stays the same
+    seeded_from = end + timedelta(days=1)
+    print(f"{'years':>5} {'endpoint':<20} {'page ms':>8} {'month ms':>9} {'bytes':>8}")
+    for years in args.years:
+        start = end - timedelta(days=365 * years)
+        with app.app_context():
+            seed_history(user_id, start, seeded_from - timedelta(days=1))
+            # renew_date is optional, and a page can start or end on a NULL sort key
+            db.session.add_all([Medications(drug_name='Undated', dosage=5, prescriber='Dr', user_id=user_id) for _ in range(3)])
+            db.session.commit()
+        seeded_from = start
+        month_from = (end - timedelta(days=30)).isoformat()
+        for endpoint in ('/api/mood-ratings', '/api/journals', '/api/todos', '/api/medications'):
+            page_ms, size = time_request(client, f'{endpoint}?limit=50')
+            month_ms, _ = time_request(client, f'{endpoint}?from={month_from}&to={end.isoformat()}')
+            print(f"{years:>5} {endpoint:<20} {page_ms:>8.2f} {month_ms:>9.2f} {size:>8}")
+
+
+def bench_serialize(args):
+    """Rows/second for serializing journals: ORM to_dict() versus the column-only serializer."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        start = datetime(2000, 1, 1)
+        db.session.execute(Journal.__table__.insert(), [
+            {'journal_header': f'Entry {i}', 'journal_text': 'Lorem ipsum dolor sit amet. ' * 8,
+             'created_at': start + timedelta(hours=i), 'user_id': user_id}
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+
+        def to_dict_path():
+            return [j.to_dict() for j in Journal.query.filter_by(user_id=user_id).all()]
+
+        def serializer_path():
+            return journal_serializer.rows(journal_serializer.select(Journal.query.filter_by(user_id=user_id)))
+
+        print(f"{'path':<24} {'rows/s':>12} {'seconds':>8}")
+        results = {}
+        for name, build in (('to_dict', to_dict_path), ('RowSerializer', serializer_path)):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            results[name] = build()
+            elapsed = time.perf_counter() - started
+            print(f"{name:<24} {len(results[name]) / elapsed:>12,.0f} {elapsed:>8.2f}")
+
+        encoders = [('json', lambda rows: json.dumps(rows, sort_keys=True))]
+        if orjson is not None:
+            provider = OrjsonProvider(app)
+            encoders.append(('orjson', provider.dumps))
+        for name, dumps in encoders:
+            started = time.perf_counter()
+            dumps(results['RowSerializer'])
+            elapsed = time.perf_counter() - started
+            print(f"{'encode ' + name:<24} {args.rows / elapsed:>12,.0f} {elapsed:>8.2f}")
+
+
+def bench_batch(args):
+    """Commits and wall time for creating todos and backfilling moods one request at a time versus in one batch."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        engine = db.engine
+
+    commits = []
+    event.listen(engine, 'commit', lambda conn: commits.append(1))
+    client = login_client(user_id)
+    days = [(date(2000, 1, 1) + timedelta(days=i)).isoformat() for i in range(args.items)]
+
+    def single_todos():
+        for i in range(args.items):
+            client.post('/api/todos', json={'task_text': f'Task {i}'})
+
+    def batch_todos():
+        client.post('/api/todos/batch', json=[{'op': 'create', 'task_text': f'Task {i}'} for i in range(args.items)])
+
+    def single_moods():
+        for day in days:
+            client.post('/api/mood-ratings', json={'mood': 3, 'created_at': day})
+
+    def batch_moods():
+        client.put('/api/mood-ratings/batch', json=[{'mood': 4, 'created_at': day} for day in days])
+
+    print(f"{'flow':<20} {'items':>6} {'commits':>8} {'seconds':>8}")
+    for name, flow in (('todos single', single_todos), ('todos batch', batch_todos),
+                       ('moods single', single_moods), ('moods batch', batch_moods)):
+        commits.clear()
+        started = time.perf_counter()
+        flow()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20} {args.items:>6} {len(commits):>8} {elapsed:>8.2f}")
+
+
+def bench_concurrency(args):
+    """Mixed reads and writes from several threads; reports any non-2xx responses such as 'database is locked'."""
+    use_temp_database()
+    with app.app_context():
+        users = [User(username=f'bench{i}', first_name='Bench', last_name='User') for i in range(args.threads)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+
+    statuses = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+
+    def worker(user_id):
+        client = login_client(user_id)
+        for i in range(args.requests):
+            day = (date(2000, 1, 1) + timedelta(days=i)).isoformat()
+            for method, url, body in (
+                ('POST', '/api/todos', {'task_text': f'Task {i}'}),
+                ('POST', '/api/mood-ratings', {'mood': 3, 'created_at': day}),
+                ('POST', '/api/journal-entries', {'journal_text': 'Text', 'created_at': day}),
+                ('GET', '/api/todos?limit=20', None),
+                ('GET', '/api/journals?limit=20', None),
+            ):
+                response = client.open(url, method=method, json=body)
+                with lock:
+                    statuses[response.status_code] += 1
+                    if response.status_code >= 400:
+                        errors[response.get_json().get('error', '')] += 1
+
+    threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    print(f"journal_mode={journal_mode} threads={args.threads} requests={total} "
+          f"seconds={elapsed:.2f} req/s={total / elapsed:,.0f}")
+    print('statuses:', dict(sorted(statuses.items())))
+    for error, count in errors.most_common():
+        print(f"  {count:>5} x {error}")
+
+
+def _shard_writer(config, user_id, requests, ready, results):
+    # a process per writer, as with several gunicorn workers, so the GIL isn't what they queue on
+    client = login_client(user_id, create_app(config))
+    statuses = Counter()
+    ready.wait()
+    for i in range(requests):
+        day = (date(2000, 1, 1) + timedelta(days=i)).isoformat()
+        for url, body in (
+            ('/api/todos', {'task_text': f'Task {i}'}),
+            ('/api/mood-ratings', {'mood': 3, 'created_at': day}),
+            ('/api/journal-entries', {'journal_text': 'Text', 'created_at': day}),
+        ):
+            statuses[client.post(url, json=body).status_code] += 1
+    results.put(statuses)
+
+
+def bench_shards(args):
+    """Write throughput of --threads processes, one user each, with all data in one file versus spread over --shard-counts shards."""
+    import multiprocessing
+    from shards import shard_for
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'shards':>6} {'writers':>7} {'requests':>8} {'seconds':>8} {'req/s':>8}  statuses")
+    for count in args.shard_counts:
+        config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}",
+                  'SHARD_COUNT': count, 'SECRET_KEY': 'bench'}
+        sharded_app = create_app(config)
+        # users picked to land on the shards in turn, as a large population would
+        user_ids, candidate = [], 1
+        while len(user_ids) < args.threads:
+            if not count or shard_for(candidate, count) == len(user_ids) % count:
+                user_ids.append(candidate)
+            candidate += 1
+        with sharded_app.app_context():
+            for engine in sharded_app.extensions['sqlalchemy'].engines.values():
+                db.metadata.create_all(engine)
+            db.session.add_all(User(id=user_id, username=f'bench{user_id}', first_name='Bench', last_name='User') for user_id in user_ids)
+            db.session.commit()
+
+        ready, results = context.Barrier(args.threads + 1), context.Queue()
+        writers = [context.Process(target=_shard_writer, args=(config, user_id, args.requests, ready, results)) for user_id in user_ids]
+        for writer in writers:
+            writer.start()
+        ready.wait()
+        started = time.perf_counter()
+        statuses = sum((results.get() for _ in writers), Counter())
+        elapsed = time.perf_counter() - started
+        for writer in writers:
+            writer.join()
+        total = sum(statuses.values())
+        print(f"{count or 'off':>6} {args.threads:>7} {total:>8} {elapsed:>8.2f} {total / elapsed:>8,.0f}  {dict(sorted(statuses.items()))}")
+    print(f"{os.cpu_count()} CPU(s); throughput can only scale with shards while there are cores to run the writers on")
+
+
+# what each load test client cycles through: four list reads and a write
+SERVING_MIX = [
+    ('GET', '/api/todos?limit=50', None),
+    ('GET', '/api/journals?limit=50', None),
+    ('POST', '/api/todos', {'task_text': 'Load {n}'}),
+    ('GET', '/api/days/{today}', None),
+    ('GET', '/api/mood-ratings?limit=50', None),
+]
+
+
+def _serve(kind, config, port):
+    # its own process, so the load generator doesn't compete with it for the GIL
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if kind == 'wsgi':
+        from werkzeug.serving import make_server
+        # what `python app.py` runs, minus the debugger and reloader
+        make_server('127.0.0.1', port, create_app(config), threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(config), host='127.0.0.1', port=port, log_level='warning', backlog=2048)
+
+
+async def _serving_client(port, cookie, index, requests, latencies, statuses):
+    reader = writer = None
+    for n in range(requests):
+        method, url, body = SERVING_MIX[(index + n) % len(SERVING_MIX)]
+        fields = {'today': date.today().isoformat(), 'n': f'{index}-{n}'}
+        payload = json.dumps(_fill(body, fields)).encode() if body else b''
+        request = (f'{method} {_fill(url, fields)} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n'
+                   f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n').encode() + payload
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            status = int((await asyncio.wait_for(reader.readline(), 60)).split()[1])
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers.get('content-length', 0)))
+        except (OSError, IndexError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            status, headers = type(e).__name__, {'connection': 'close'}
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[status] += 1
+        if headers.get('connection', '').lower() == 'close' and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _streamed_exports(port, cookies, expected_lines):
+    """GET /api/export from every cookie's client at once; the ones whose download came back short or failed."""
+    import http.client
+
+    def download(cookie):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        try:
+            connection.request('GET', '/api/export?format=ndjson', headers={'Cookie': cookie})
+            response = connection.getresponse()
+            lines = response.read().count(b'\n')
+            return response.status, lines
+        except (OSError, http.client.HTTPException) as e:
+            return type(e).__name__, 0
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(len(cookies)) as pool:
+        results = list(pool.map(download, cookies))
+    return [(status, lines, expected) for (status, lines), expected in zip(results, expected_lines)
+            if status != 200 or lines != expected]
+
+
+async def _serving_load(port, cookies, requests):
+    latencies, statuses = [], Counter()
+    started = time.perf_counter()
+    await asyncio.gather(*(_serving_client(port, cookie, index, requests, latencies, statuses)
+                           for index, cookie in enumerate(cookies)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def bench_serving(args):
+    """Requests/second and tail latency of the threaded WSGI server versus asgi.py under uvicorn, at --clients concurrent keep-alive clients."""
+    import multiprocessing
+    import socket
+    from sessions import SqliteStore
+
+    use_temp_database()
+    users = 20
+    with app.app_context():
+        user_ids = []
+        for n in range(users):
+            user = User(username=f'bench{n}', first_name='Bench', last_name='User')
+            db.session.add(user)
+            db.session.commit()
+            user_ids.append(user.id)
+            seed_history(user.id, date.today() - timedelta(days=365 * args.years[0]), date.today())
+    # sessions in a shared file, so the bench can log clients in to a server in another process
+    session_path = os.path.join(tempfile.mkdtemp(), 'sessions.db')
+    config = {'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'SECRET_KEY': 'bench',
+              'SESSION_BACKEND': 'sqlite', 'SESSION_SQLITE_PATH': session_path}
+    store = SqliteStore(session_path)
+    cookies = []
+    for index in range(max(*args.clients, args.exports)):
+        sid = secrets.token_urlsafe(32)
+        store.set(f'session:{sid}', {'user_id': user_ids[index % users]}, 3600)
+        cookies.append(f"{app.config['SESSION_COOKIE_NAME']}={sid}")
+
+    try:
+        import uvicorn  # noqa: F401
+        kinds = ['wsgi', 'asgi']
+    except ImportError:
+        kinds = ['wsgi']
+        print('uvicorn is not installed (pip install uvicorn), so only the WSGI server is measured')
+    context = multiprocessing.get_context('spawn')
+    print(f"history={args.years[0]} years, {users} users, {args.client_requests} requests per client, "
+          f"ASGI_THREADS={app.config['ASGI_THREADS']}, {os.cpu_count()} CPU(s)")
+    print(f"{'server':<6} {'clients':>7} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>9}  statuses")
+    for kind in kinds:
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = context.Process(target=_serve, args=(kind, config, port), daemon=True)
+        server.start()
+        try:
+            for _ in range(300):
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            # the export is streamed in chunks, each pulled from the app separately, while other downloads are in flight
+            with app.app_context():
+                # one NDJSON line per journal, mood, todo and medication; the load below adds todos, so counted each time
+                rows = Counter()
+                for model in (Journal, Mood, Todos, Medications):
+                    rows.update(dict(db.session.execute(db.select(model.user_id, db.func.count()).group_by(model.user_id)).all()))
+            export_lines = [rows[user_ids[index % users]] for index in range(args.exports)]
+            started = time.perf_counter()
+            broken = _streamed_exports(port, cookies[:args.exports], export_lines)
+            print(f"{kind:<6} {args.exports:>7} exports streamed at once in {time.perf_counter() - started:.1f} s: "
+                  f"{'ok' if not broken else f'{len(broken)} broken (status, lines, expected): {broken}'}")
+            for clients in args.clients:
+                latencies, statuses, elapsed = asyncio.run(_serving_load(port, cookies[:clients], args.client_requests))
+                print(f"{kind:<6} {clients:>7} {len(latencies):>8} {len(latencies) / elapsed:>8,.0f} {percentile(latencies, 50):>8.1f} "
+                      f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>9.1f}  {dict(sorted(statuses.items(), key=str))}")
+        finally:
+            server.terminate()
+            server.join()
+
+
+STARTUP_SCRIPT = """
+import time
+import tracemalloc
+started = time.perf_counter()
+from analytics import analyze, load_series
+from app import create_app
+from compression import brotli
+from daily_summary import find_drift, rebuild
+create_app()
+print(f'{(time.perf_counter() - started) * 1000:.1f}')
+"""
+
+
+def bench_startup(args):
+    """Cold-start cost of importing the app and calling create_app(), from `python -X importtime`."""
+    server_dir = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+                                cwd=server_dir, capture_output=True, text=True, check=True)
+        runs.append((float(result.stdout.strip()), result.stderr))
+    wall_ms, importtime = sorted(runs)[len(runs) // 2]
+
+    # Lines look like "import time: <self us> | <cumulative us> | <two spaces per nesting level><module>"
+    total_us, direct = 0, []
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total_us += int(cumulative_us)
+        elif depth == 1:
+            direct.append((int(cumulative_us), name.strip()))
+    print(f"create_app() cold start: {wall_ms:.1f} ms, imports {total_us / 1000:.1f} ms (median of {args.repeat})")
+    print(f"{'cumulative ms':>14}  import")
+    for cumulative_us, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {name}")
+    if args.max_ms and wall_ms > args.max_ms:
+        print(f"FAIL: cold start above {args.max_ms} ms")
+        sys.exit(1)
+
+
+def bench_day_view(args):
+    """Opening one day: the old three full-collection calls versus GET /api/days/<date>."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[-1]), date.today())
+
+    client = login_client(user_id)
+    day = (date.today() - timedelta(days=3)).isoformat()
+
+    def three_calls():
+        return sum(len(client.get(url).data) for url in ('/api/journals', '/api/mood-ratings', '/api/todos'))
+
+    def day_call():
+        return len(client.get(f'/api/days/{day}').data)
+
+    print(f"history={args.years[-1]} years, day={day}")
+    print(f"{'flow':<14} {'requests':>8} {'bytes':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, requests, flow in (('three calls', 3, three_calls), ('day endpoint', 1, day_call)):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            size = flow()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<14} {requests:>8} {size:>10,} {percentile(timings, 50):>8.2f} {percentile(timings, 95):>8.2f}")
+
+
+def bench_analytics(args):
+    """Cold and cached GET /api/mood-ratings/analytics latency with --users users of daily ratings over --years years."""
+    use_temp_database()
+    years = args.years[-1]
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    with app.app_context():
+        engine = db.engine
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'id': n, 'username': f'bench{n}', 'first_name': 'Bench', 'last_name': 'User'}
+            for n in range(1, args.users + 1)
+        ])
+        # written straight into the rollup; the analytics only ever read daily_summary
+        days = [(start + timedelta(days=n)).isoformat() for n in range((end - start).days + 1)]
+        for user_id in range(1, args.users + 1):
+            rng = random.Random(user_id)
+            conn.exec_driver_sql(
+                'INSERT INTO daily_summary (user_id, day, mood_rating, journal_count, todos_total, todos_completed, medications_due) '
+                'VALUES (?, ?, ?, 0, 3, ?, 0)',
+                [(user_id, day, rng.randint(1, 5), rng.randint(0, 3)) for day in days if rng.random() < 0.9],
+            )
+    print(f"users={args.users:,} years={years} rows={args.users * len(days) * 0.9:,.0f} seeded in {time.perf_counter() - started:.0f} s")
+
+    sample = random.Random(0).sample(range(1, args.users + 1), min(args.users, 200))
+    with app.app_context():
+        load_ms, analyze_ms = [], []
+        for user_id in sample[:50]:
+            started = time.perf_counter()
+            rows = load_series(user_id)
+            loaded = time.perf_counter()
+            analyze(rows)
+            load_ms.append((loaded - started) * 1000)
+            analyze_ms.append((time.perf_counter() - loaded) * 1000)
+            db.session.rollback()
+    print(f"{'step':<14} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'load_series':<14} {percentile(load_ms, 50):>8.2f} {percentile(load_ms, 95):>8.2f}")
+    print(f"{'analyze':<14} {percentile(analyze_ms, 50):>8.2f} {percentile(analyze_ms, 95):>8.2f}")
+
+    for label in ('cold request', 'cached request'):
+        timings = []
+        for user_id in sample:
+            client = login_client(user_id)
+            started = time.perf_counter()
+            client.get('/api/mood-ratings/analytics')
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{label:<14} {percentile(timings, 50):>8.2f} {percentile(timings, 95):>8.2f}")
+
+
+ETAG_COLLECTIONS = ('/api/journals', '/api/mood-ratings', '/api/todos', '/api/medications')
+
+
+def bench_etags(args):
+    """Conditional GET latency and queries: a full 200 versus a 304 for each list endpoint."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[-1]), date.today())
+        engine = db.engine
+    client = login_client(user_id)
+
+    print(f"{'endpoint':<20} {'200 ms':>8} {'304 ms':>8} {'304 queries':>11}")
+    for url in ETAG_COLLECTIONS:
+        etag = client.get(url).headers['ETag']
+        full_ms, _ = time_request(client, url, args.repeat)
+        timings = []
+        for _ in range(args.repeat):
+            with QueryCounter(engine) as counter:
+                started = time.perf_counter()
+                response = client.get(url, headers={'If-None-Match': etag})
+                timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 304, response.status_code
+        print(f"{url:<20} {full_ms:>8.2f} {median(timings):>8.2f} {counter.count:>11}")
+
+
+def bench_search(args):
+    """GET /api/journals/search (FTS5) versus a LIKE '%q%' scan over --rows journal entries spread across 100 users."""
+    use_temp_database()
+    rng = random.Random(0)
+    # Zipf-like vocabulary so there are very common and very rare words
+    vocabulary = [''.join(rng.choice('bcdfghjklmnprstvwz') + rng.choice('aeiou') for _ in range(rng.randint(2, 4)))
+                  for _ in range(5000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    users = 100
+    with app.app_context():
+        engine = db.engine
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': n, 'username': f'bench{n}', 'first_name': 'Bench', 'last_name': 'User'}
+                                    for n in range(1, users + 1)])
+        now = datetime.now()
+        for chunk in range(0, args.rows, 10_000):
+            conn.execute(insert(Journal), [
+                {
+                    'user_id': 1 + n % users,
+                    'journal_header': ' '.join(rng.choices(vocabulary, weights, k=3)).capitalize(),
+                    'journal_text': ' '.join(rng.choices(vocabulary, weights, k=rng.randint(30, 80))),
+                    'created_at': now - timedelta(minutes=n),
+                }
+                for n in range(chunk, min(chunk + 10_000, args.rows))
+            ])
+    print(f"rows={args.rows:,} users={users} seeded with FTS triggers in {time.perf_counter() - started:.0f} s")
+
+    client = login_client(1)
+    queries = [
+        ('common word', vocabulary[0]),
+        ('mid word', vocabulary[100]),
+        ('rare word', vocabulary[4000]),
+        ('two words', f'{vocabulary[10]} {vocabulary[50]}'),
+        ('prefix', f'{vocabulary[20][:3]}*'),
+    ]
+    like_all = text('SELECT id FROM journal_table WHERE user_id = :user_id '
+                    'AND (journal_header LIKE :pattern OR journal_text LIKE :pattern) ORDER BY created_at DESC')
+    like_page = text(like_all.text + ' LIMIT 20')
+    print(f"{'query':<12} {'q':<14} {'fts ms':>8} {'like all ms':>12} {'like 20 ms':>11} {'matches':>8}")
+    for label, q in queries:
+        fts_ms, _ = time_request(client, f'/api/journals/search?q={q}', args.repeat)
+        with app.app_context():
+            timings = {}
+            for name, statement in (('all', like_all), ('page', like_page)):
+                samples = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    rows = db.session.execute(statement, {'user_id': 1, 'pattern': f"%{q.rstrip('*')}%"}).all()
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[name] = median(samples)
+                matches = len(rows) if name == 'all' else matches
+        print(f"{label:<12} {q:<14} {fts_ms:>8.2f} {timings['all']:>12.2f} {timings['page']:>11.2f} {matches:>8,}")
+
+
+def bench_calendar(args):
+    """Month view from the daily_summary rollup versus the old three full-collection calls."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        started = time.perf_counter()
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[-1]), date.today())
+        seed_ms = (time.perf_counter() - started) * 1000
+
+    client = login_client(user_id)
+    month = date.today().strftime('%Y-%m')
+
+    def three_calls():
+        return sum(len(client.get(url).data) for url in ('/api/mood-ratings', '/api/journals', '/api/medications'))
+
+    def calendar_call():
+        return len(client.get(f'/api/calendar?month={month}').data)
+
+    print(f"history={args.years[-1]} years, month={month}, seeding with rollup={seed_ms:.0f} ms")
+    print(f"{'flow':<14} {'requests':>8} {'bytes':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, requests, flow in (('three calls', 3, three_calls), ('calendar', 1, calendar_call)):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            size = flow()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{name:<14} {requests:>8} {size:>10,} {percentile(timings, 50):>8.2f} {percentile(timings, 95):>8.2f}")
+
+
+def seed_export_history(rows):
+    """Users 1 and 2, with about `rows` rows of every type for user 1: a mood a day and the rest journals, todos and medications."""
+    use_temp_database()
+    with app.app_context():
+        engine = db.engine
+    moods = min(rows // 4, 3650)
+    medications = rows // 100
+    entries = (rows - moods - medications) // 2
+    start = datetime.combine(date.today() - timedelta(days=moods), datetime.min.time())
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': n, 'username': f'bench{n}', 'first_name': 'Bench', 'last_name': 'User'} for n in (1, 2)])
+        conn.execute(insert(Mood), [{'user_id': 1, 'mood_rating': 1 + n % 5, 'created_at': start + timedelta(days=n)} for n in range(moods)])
+        conn.execute(insert(Medications), [{'user_id': 1, 'drug_name': f'Drug {n}', 'dosage': 10, 'prescriber': 'Dr Bench',
+                                            'renew_date': start + timedelta(days=n % moods)} for n in range(medications)])
+        for chunk in range(0, entries, 10_000):
+            batch = range(chunk, min(chunk + 10_000, entries))
+            # spread over the same days as the moods
+            when = [start + timedelta(minutes=n * moods * 1440 // entries) for n in batch]
+            conn.execute(insert(Journal), [{'user_id': 1, 'journal_header': f'Entry {n}', 'journal_text': 'Some words about the day, "quoted", with a comma.',
+                                            'created_at': at} for n, at in zip(batch, when)])
+            conn.execute(insert(Todos), [{'user_id': 1, 'task_text': f'Task {n}', 'completed': n % 2 == 0, 'created_at': at}
+                                         for n, at in zip(batch, when)])
+        rebuild(conn)
+    return moods + medications + 2 * entries
+
+
+def traced(function):
+    """Run function() and return (its result, seconds, peak MB of Python allocations while it ran)."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = function()
+        return result, time.perf_counter() - started, tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_export(args):
+    """Export user 1 and import the file into user 2 at a tenth of --rows and at --rows: time and peak memory of each."""
+    print(f"{'step':<18} {'rows':>9} {'MB out':>8} {'s':>7} {'peak MB':>8}")
+    for rows in (args.rows // 10, args.rows):
+        total = seed_export_history(rows)
+        for format in ('ndjson', 'csv'):
+            path = os.path.join(tempfile.mkdtemp(), f'export.{format}')
+
+            def export():
+                response = login_client(1).get(f'/api/export?format={format}', buffered=False)
+                with open(path, 'wb') as f:
+                    for chunk in response.iter_encoded():
+                        f.write(chunk)
+                response.close()
+                return response.status_code
+
+            def import_():
+                with open(path, 'rb') as f:
+                    return login_client(2).post(f'/api/import?format={format}', input_stream=f, content_length=os.path.getsize(path),
+                                                content_type=EXPORT_FORMATS[format])
+
+            status, seconds, peak = traced(export)
+            assert status == 200, status
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{'export ' + format:<18} {total:>9,} {size:>8.1f} {seconds:>7.1f} {peak:>8.1f}")
+
+            response, seconds, peak = traced(import_)
+            assert response.status_code == 201, response.get_json()
+            imported = sum(response.get_json()['imported'].values())
+            assert imported == total, (imported, total)
+            print(f"{'import ' + format:<18} {imported:>9,} {size:>8.1f} {seconds:>7.1f} {peak:>8.1f}")
+            with app.app_context():
+                for model in (Journal, Mood, Todos, Medications):
+                    db.session.execute(delete(model).where(model.user_id == 2))
+                db.session.commit()
+            os.remove(path)
+
+        # the unpaginated list endpoint for comparison: the whole collection in memory at once
+        response, seconds, peak = traced(lambda: login_client(1).get('/api/journals'))
+        print(f"{'GET /api/journals':<18} {len(response.get_json()):>9,} {len(response.data) / 2 ** 20:>8.1f} {seconds:>7.1f} {peak:>8.1f}")
+
+    print(f"process max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+def bench_compression(args):
+    """Bytes on the wire and CPU per response for the list endpoints: pretty vs compact JSON, identity vs gzip and br."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[-1]), date.today())
+    client = login_client(user_id)
+    variants = [('pretty', False, 'identity'), ('compact', None, 'identity'), ('compact+gzip', None, 'gzip')]
+    if brotli is not None:
+        variants.append(('compact+br', None, 'br'))
+    print(f"history={args.years[-1]} years, min size={app.config['COMPRESS_MIN_SIZE']} bytes, brotli={'yes' if brotli else 'not installed'}")
+    print(f"{'url':<20} {'variant':<14} {'bytes':>10} {'ratio':>6} {'cpu ms':>8}")
+    compact = app.json.compact
+    try:
+        for url in ETAG_COLLECTIONS:
+            baseline = None
+            for name, pretty, encoding in variants:
+                app.json.compact = pretty
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.process_time()
+                    response = client.get(url, headers={'Accept-Encoding': encoding})
+                    timings.append((time.process_time() - started) * 1000)
+                assert response.headers.get('Content-Encoding', 'identity') == encoding, response.headers
+                size = len(response.data)
+                baseline = baseline or size
+                print(f"{url:<20} {name:<14} {size:>10,} {size / baseline:>6.2f} {median(timings):>8.2f}")
+    finally:
+        app.json.compact = compact
+
+def bench_metrics(args):
+    """Per-request cost of the metrics hooks and the sampling profiler."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[0]), date.today())
+
+    profile_dir = tempfile.mkdtemp()
+    base = {'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'SECRET_KEY': 'bench', 'RESPONSE_CACHE_BACKEND': 'off'}
+    variants = {
+        'metrics off': create_app({**base, 'METRICS_ENABLED': False}),
+        'metrics on': create_app(base),
+        'profile 1/100': create_app({**base, 'PROFILE_EVERY': 100, 'PROFILE_DIR': profile_dir}),
+        'profile 1/1': create_app({**base, 'PROFILE_EVERY': 1, 'PROFILE_DIR': profile_dir}),
+    }
+    clients = {name: login_client(user_id, variant) for name, variant in variants.items()}
+    urls = ('/api/todos?limit=20', '/api/journals')
+    timings = {(name, url): [] for name in variants for url in urls}
+    # interleaved, so drift in machine load hits every variant alike
+    for _ in range(args.samples):
+        for name, client in clients.items():
+            for url in urls:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings[name, url].append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.status_code
+
+    print(f"history={args.years[0]} years, {args.samples} requests per variant and url")
+    print(f"{'variant':<14} {'url':<20} {'p50 ms':>8} {'p95 ms':>8} {'overhead':>9}")
+    for url in urls:
+        baseline = percentile(timings['metrics off', url], 50)
+        for name in variants:
+            p50 = percentile(timings[name, url], 50)
+            print(f"{name:<14} {url:<20} {p50:>8.3f} {percentile(timings[name, url], 95):>8.3f} {p50 - baseline:>+8.3f}")
+
+def bench_reminders(args):
+    """The reminder job over --rows medications spread across --users users: per-run timing, peak memory and the due-date plan."""
+    use_temp_database()
+    with app.app_context():
+        engine = db.engine
+    rng = random.Random(0)
+    today = datetime.combine(date.today(), datetime.min.time())
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': n, 'username': f'bench{n}', 'first_name': 'Bench', 'last_name': 'User'}
+                                    for n in range(1, args.users + 1)])
+        for chunk in range(0, args.rows, 10_000):
+            conn.execute(insert(Medications), [
+                {'user_id': rng.randint(1, args.users), 'drug_name': f'Drug {n}', 'dosage': 10, 'prescriber': 'Dr Bench',
+                 'renew_date': today + timedelta(days=rng.randint(-180, 180))}
+                for n in range(chunk, min(chunk + 10_000, args.rows))
+            ])
+        days_ahead = app.config['REMINDER_DAYS_AHEAD']
+        expected = conn.scalar(select(db.func.count()).where(
+            Medications.renew_date >= today, Medications.renew_date < today + timedelta(days=days_ahead + 1)))
+        plan = ' | '.join(row[3] for row in conn.exec_driver_sql(
+            'EXPLAIN QUERY PLAN SELECT id, user_id, renew_date FROM medications_table '
+            'WHERE renew_date >= ? AND renew_date < ? ORDER BY renew_date, id LIMIT 1000', (today, today)))
+
+    print(f"medications={args.rows:,} users={args.users:,} due in {days_ahead} days={expected:,}")
+    print(f"due query plan: {plan}")
+    print(f"{'run':<8} {'batch':>6} {'due':>8} {'created':>8} {'batches':>8} {'ms':>9} {'peak MB':>8}")
+    for label, batch_size in (('first', app.config['REMINDER_BATCH_SIZE']), ('rerun', app.config['REMINDER_BATCH_SIZE']),
+                              ('rerun', 100), ('rerun', 10_000)):
+        stats = schedule_reminders(engine, days_ahead, batch_size)
+        if label == 'first':
+            with engine.begin() as conn:
+                conn.execute(delete(Reminder))
+        # measured on a second, identical run: tracemalloc slows the job down several times
+        _, _, peak = traced(lambda: schedule_reminders(engine, days_ahead, batch_size))
+        print(f"{label:<8} {batch_size:>6} {stats['due']:>8,} {stats['created']:>8,} {stats['batches']:>8} {stats['ms']:>9.1f} {peak:>8.2f}")
+
+    with engine.connect() as conn:
+        user_id = conn.scalar(select(Reminder.user_id).group_by(Reminder.user_id).order_by(db.func.count().desc()).limit(1))
+    ms, size = time_request(login_client(user_id), '/api/reminders', args.repeat)
+    print(f"GET /api/reminders for the busiest user: {ms:.2f} ms, {size:,} bytes")
+
+# (method, url, body) for every route. {journal_id}, {todo_id}, {medication_id} and
+# {reminder_id} are rows created just before each timed request, so updates and
+# deletes always find one; {n} is a counter for values that must be unique.
+def bench_sync(args):
+    """A returning client catching up after --edits changes: /api/sync versus refetching every list, for about --rows rows."""
+    total = seed_export_history(args.rows)
+    with app.app_context():
+        engine = db.engine
+        journal_ids = db.session.scalars(select(Journal.id).where(Journal.user_id == 1).limit(args.edits)).all()
+        todo_ids = db.session.scalars(select(Todos.id).where(Todos.user_id == 1).limit(args.edits)).all()
+    client = login_client(1)
+
+    def write_cost():
+        timings, counter = [], QueryCounter(engine)
+        for n in range(20):
+            started = time.perf_counter()
+            with counter:
+                response = client.post('/api/todos', json={'task_text': f'Timed {n}'})
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 201, response.status_code
+            client.delete(f"/api/todos/{response.get_json()['id']}")
+        return median(timings), counter.count // 20
+
+    print(f"{'write':<28} {'p50 ms':>8} {'queries':>8}")
+    for label in ('POST /api/todos', 'POST /api/todos, syncing'):
+        if label.endswith('syncing'):
+            since = client.get('/api/sync').get_json()['seq']  # registers the client; the change log starts here
+        ms, queries = write_cost()
+        print(f"{label:<28} {ms:>8.2f} {queries:>8}")
+    since = client.get(f'/api/sync?since={since}').get_json()['seq']
+
+    for n in range(args.edits):
+        kind = n % 4
+        if kind == 0:
+            response = client.put(f'/api/journals/{journal_ids[n]}', json={'journal_text': f'Edited {n}'})
+        elif kind == 1:
+            response = client.put(f'/api/todos/{todo_ids[n]}', json={'task_text': f'Edited {n}'})
+        elif kind == 2:
+            response = client.delete(f'/api/todos/{todo_ids[n]}')
+        else:
+            response = client.post('/api/journals', json={'journal_header': f'New {n}', 'journal_text': 'Text'})
+        assert response.status_code in (200, 201), response.status_code
+
+    flows = {
+        'sync': [f'/api/sync?since={since}'],
+        'full refetch': ['/api/journals', '/api/mood-ratings', '/api/todos', '/api/medications'],
+    }
+    print(f"\n{total:,} rows, {args.edits} edits since the last sync")
+    print(f"{'flow':<14} {'requests':>8} {'bytes':>10} {'queries':>8} {'p50 ms':>8}")
+    for flow, urls in flows.items():
+        timings, counter = [], QueryCounter(engine)
+        for repeat in range(5):
+            started = time.perf_counter()
+            with counter:
+                responses = [client.get(url) for url in urls]
+            timings.append((time.perf_counter() - started) * 1000)
+        assert all(response.status_code == 200 for response in responses)
+        size = sum(len(response.data) for response in responses)
+        print(f"{flow:<14} {len(urls):>8} {size:>10,} {counter.count // 5:>8} {median(timings):>8.1f}")
+
+SUITE_ENDPOINTS = [
+    ('POST', '/api/login', {'user': 'bench', 'password': 'bench'}),
+    ('POST', '/api/users', {'username': 'suite{n}', 'first_name': 'Bench', 'last_name': 'User', '_hashed_password': 'bench'}),
+    ('DELETE', '/api/logout', None),
+    ('GET', '/api/get-session', None),
+    ('GET', '/api/users', None),
+    ('GET', '/api/users/{user_id}', None),
+    ('GET', '/api/journals', None),
+    ('GET', '/api/journals?limit=50', None),
+    ('GET', '/api/journals/search?q=today', None),
+    ('GET', '/api/mood-ratings', None),
+    ('GET', '/api/mood-ratings?limit=50', None),
+    ('GET', '/api/mood-ratings/analytics', None),
+    ('GET', '/api/todos', None),
+    ('GET', '/api/todos?limit=50', None),
+    ('GET', '/api/medications', None),
+    ('GET', '/api/days/{today}', None),
+    ('GET', '/api/calendar', None),
+    ('GET', '/api/reminders', None),
+    ('GET', '/api/sync', None),
+    ('GET', '/api/export', None),
+    ('GET', '/metrics', None),
+    ('POST', '/api/journals', {'journal_header': 'Header', 'journal_text': 'Text'}),
+    ('POST', '/api/journal-entries', {'journal_text': 'Text', 'created_at': '{today}'}),
+    ('PUT', '/api/journals/{journal_id}', {'journal_header': 'Updated', 'journal_text': 'Updated'}),
+    ('DELETE', '/api/journals/{journal_id}', None),
+    ('POST', '/api/mood-ratings', {'mood': 4}),
+    ('PUT', '/api/mood-ratings/batch', [{'mood': 3, 'created_at': '2030-01-01'}, {'mood': 4, 'created_at': '2030-01-02'}]),
+    ('POST', '/api/todos', {'task_text': 'Task'}),
+    ('PUT', '/api/todos/{todo_id}', {'completed': True}),
+    ('DELETE', '/api/todos/{todo_id}', None),
+    ('POST', '/api/todos/batch', [{'op': 'create', 'task_text': 'Batch'}, {'op': 'update', 'id': '{todo_id}', 'completed': True}]),
+    ('POST', '/api/medications', {'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr', 'renew_date': '2030-01-01'}),
+    ('PUT', '/api/medications/{medication_id}', {'dosage': 20, 'renew_date': '2030-02-01'}),
+    ('DELETE', '/api/medications/{medication_id}', None),
+    ('DELETE', '/api/reminders/{reminder_id}', None),
+    ('POST', '/api/import', b'{"type": "todo", "task_text": "Imported"}\n'),
+]
+# read-only user routes the HTTP load generator mixes together; /api/sync writes the client's acknowledgement
+HTTP_ENDPOINTS = [url for method, url, body in SUITE_ENDPOINTS
+                  if method == 'GET' and url not in ('/api/export', '/api/sync', '/metrics')]
+
+
+CACHED_URLS = [url for collection in ETAG_COLLECTIONS for url in (collection, f'{collection}?limit=50')]
+
+
+def bench_response_cache(args):
+    """Cached list responses: hit versus miss latency with the memory and the shared sqlite backend."""
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        seed_history(user_id, date.today() - timedelta(days=365 * args.years[0]), date.today())
+
+    base = {'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'SECRET_KEY': 'bench'}
+    reference = login_client(user_id)  # the global app, uncached
+    readers = {
+        'memory': login_client(user_id, create_app({**base, 'RESPONSE_CACHE_BACKEND': 'memory'})),
+        'sqlite': login_client(user_id, create_app({**base, 'RESPONSE_CACHE_BACKEND': 'sqlite',
+                                                    'RESPONSE_CACHE_PATH': os.path.join(tempfile.mkdtemp(), 'cache.db')})),
+    }
+
+    print(f"history={args.years[0]} years, {len(CACHED_URLS)} cached urls")
+    print(f"{'backend':<8} {'url':<28} {'off ms':>8} {'miss ms':>8} {'hit ms':>8} {'bytes':>10}")
+    for backend, reader in readers.items():
+        for url in CACHED_URLS:
+            off, miss, hit = [], [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                response = reference.get(url)
+                off.append((time.perf_counter() - started) * 1000)
+                with app.app_context():
+                    # a no-op version bump, so the next read misses
+                    bump_versions(db.session.connection(), {(user_id, url.split('?')[0][len('/api/'):])})
+                    db.session.commit()
+                for timings in (miss, hit):
+                    started = time.perf_counter()
+                    reader.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+            print(f"{backend:<8} {url:<28} {median(off):>8.2f} {median(miss):>8.2f} {median(hit):>8.2f} {len(response.data):>10,}")
+
+    for name, client in readers.items():
+        lines = [line for line in client.get('/metrics').get_data(as_text=True).splitlines() if line.startswith('response_cache_')]
+        print(f"{name}: " + ', '.join(line.split('{')[0][len('response_cache_'):] + '=' + line.split()[-1] for line in lines))
+
+
+def _fill(value, fields):
+    if isinstance(value, str):
+        # a placeholder on its own becomes the (integer) value itself
+        if value.startswith('{') and value.endswith('}') and value[1:-1] in fields:
+            return fields[value[1:-1]]
+        return value.format(**fields)
+    if isinstance(value, list):
+        return [_fill(item, fields) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, fields) for key, item in value.items()}
+    return value
+
+
+def _fresh_rows(client, user_id, url, body):
+    # only create what this request refers to, outside the timed part
+    text = url + json.dumps(body if not isinstance(body, bytes) else None)
+    fields = {}
+    if '{journal_id}' in text:
+        fields['journal_id'] = client.post('/api/journals', json={'journal_header': 'Suite', 'journal_text': 'Suite'}).get_json()['id']
+    if '{todo_id}' in text:
+        fields['todo_id'] = client.post('/api/todos', json={'task_text': 'Suite'}).get_json()['id']
+    if '{medication_id}' in text or '{reminder_id}' in text:
+        client.post('/api/medications', json={'drug_name': 'Suite', 'dosage': 1, 'prescriber': 'Dr', 'renew_date': date.today().isoformat()})
+        with app.app_context():
+            fields['medication_id'] = db.session.scalar(select(db.func.max(Medications.id)).where(Medications.user_id == user_id))
+    if '{reminder_id}' in text:
+        with app.app_context():
+            schedule_reminders(db.engine, 0, 1000)
+            fields['reminder_id'] = db.session.scalar(select(db.func.max(Reminder.id)).where(Reminder.user_id == user_id))
+    return fields
+
+
+def _measure(client, engine, user_id, method, url, body, samples):
+    """(status, queries, timings in ms) for `samples` requests, after one counted warm-up request."""
+    timings, counter = [], QueryCounter(engine)
+    for n in range(samples + 1):
+        fields = {'user_id': user_id, 'today': date.today().isoformat(), 'n': f'{time.time_ns()}{n}'}
+        fields.update(_fresh_rows(client, user_id, url, body))
+        request_url = _fill(url, fields)
+        kwargs = {'data': body, 'content_type': 'application/x-ndjson'} if isinstance(body, bytes) else {'json': _fill(body, fields)}
+        if n == 0:
+            with counter:
+                response = client.open(request_url, method=method, buffered=True, **kwargs)
+        else:
+            started = time.perf_counter()
+            response = client.open(request_url, method=method, buffered=True, **kwargs)
+            timings.append((time.perf_counter() - started) * 1000)
+        if url == '/api/logout':
+            login_session(client, user_id)
+    return response.status_code, counter.count, timings
+
+
+def login_session(client, user_id):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+
+def _summary(timings, elapsed=None):
+    return {
+        'p50': round(percentile(timings, 50), 3),
+        'p95': round(percentile(timings, 95), 3),
+        'p99': round(percentile(timings, 99), 3),
+        'rps': round(len(timings) / (elapsed if elapsed is not None else sum(timings) / 1000), 1),
+    }
+
+
+def _http_load(user_ids, threads, requests):
+    """Mix the read routes from `threads` keep-alive-less HTTP clients against a local threaded server."""
+    import http.client
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no access log line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    interface = app.session_interface
+    latencies = {url: [] for url in HTTP_ENDPOINTS}
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def call(url, cookie):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        connection.request('GET', url, headers={'Cookie': cookie})
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        return response
+
+    def worker(index):
+        # a session put straight into the store stands in for a login, whose bcrypt cost would swamp the reads
+        user_id = user_ids[index % len(user_ids)]
+        sid = secrets.token_urlsafe(32)
+        interface.store.set(f'session:{sid}', {'user_id': user_id}, interface.ttl)
+        cookie = f'{cookie_name}={sid}'
+        fields = {'user_id': user_id, 'today': date.today().isoformat()}
+        ready.wait()
+        for n in range(requests):
+            url = HTTP_ENDPOINTS[(index + n) % len(HTTP_ENDPOINTS)]
+            started = time.perf_counter()
+            response = call(url.format(**fields), cookie)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies[url].append(elapsed)
+                statuses[response.status] += 1
+
+    ready = threading.Barrier(threads + 1)
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    ready.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    every = [latency for timings in latencies.values() for latency in timings]
+    return {
+        'threads': threads,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'total': _summary(every, elapsed),
+        'endpoints': {f'GET {url}': _summary(timings) for url, timings in latencies.items() if timings},
+    }
+
+
+def compare_to_baseline(results, baseline, threshold, min_delta_ms):
+    """Regressions of `results` against `baseline`: slower p50 (by more than the threshold and min_delta_ms), lower throughput, more queries."""
+    failures = []
+    for size, endpoints in results['sizes'].items():
+        for name, current in endpoints.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            if current['queries'] > before['queries']:
+                failures.append(f"{size}y {name}: {current['queries']} queries, baseline {before['queries']}")
+            # the median, since a few dozen samples leave p95 at the mercy of one scheduler hiccup
+            if current['p50'] > before['p50'] * (1 + threshold) and current['p50'] - before['p50'] > min_delta_ms:
+                failures.append(f"{size}y {name}: p50 {current['p50']:.2f} ms, baseline {before['p50']:.2f} ms")
+    for size, current in results.get('http', {}).items():
+        before = baseline.get('http', {}).get(size)
+        if before is None:
+            continue
+        if current['total']['rps'] < before['total']['rps'] / (1 + threshold):
+            failures.append(f"{size}y HTTP: {current['total']['rps']:.0f} req/s, baseline {before['total']['rps']:.0f} req/s")
+        if (current['total']['p95'] > before['total']['p95'] * (1 + threshold)
+                and current['total']['p95'] - before['total']['p95'] > min_delta_ms):
+            failures.append(f"{size}y HTTP: p95 {current['total']['p95']:.2f} ms, baseline {before['total']['p95']:.2f} ms")
+    return failures
+
+
+def bench_suite(args):
+    """Every route through the test client, then mixed reads over HTTP, at each --years history size; compares with --baseline.
+
+    Records p50/p95/p99 latency, requests per second and query counts.
+    With --save-baseline the results are written to --baseline; otherwise
+    the run fails if any route regressed past --threshold.
+    """
+    use_temp_database()
+    with app.app_context():
+        user = User(username='bench', first_name='Bench', last_name='User', _hashed_password=password_hasher.hash('bench'))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        engine = db.engine
+
+    results = {'created': datetime.now().isoformat(timespec='seconds'), 'samples': args.samples, 'sizes': {}, 'http': {}}
+    client = login_client(user_id)
+    end = date.today()
+    seeded_from = end + timedelta(days=1)
+    for years in args.years:
+        # grown backwards so every size includes the previous one
+        start = end - timedelta(days=365 * years)
+        with app.app_context():
+            seed_history(user_id, start, seeded_from - timedelta(days=1))
+            # renew_date is optional, and a page can start or end on a NULL sort key
+            db.session.add_all([Medications(drug_name='Undated', dosage=5, prescriber='Dr', user_id=user_id) for _ in range(3)])
+            db.session.commit()
+        seeded_from = start
+
+        print(f"\nhistory={years} years")
+        print(f"{'route':<40} {'status':>6} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        endpoints = results['sizes'][str(years)] = {}
+        for method, url, body in SUITE_ENDPOINTS:
+            status, queries, timings = _measure(client, engine, user_id, method, url, body, args.samples)
+            name = f'{method} {url}'
+            endpoints[name] = dict(_summary(timings), status=status, queries=queries)
+            row = endpoints[name]
+            print(f"{name:<40} {status:>6} {queries:>7} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} {row['rps']:>8.0f}")
+
+        http = results['http'][str(years)] = _http_load([user_id], args.threads, args.requests)
+        total = http['total']
+        print(f"{'HTTP mixed reads':<40} {'':>6} {'':>7} {total['p50']:>8.2f} {total['p95']:>8.2f} {total['p99']:>8.2f} {total['rps']:>8.0f}"
+              f"  ({args.threads} threads, statuses {http['statuses']})")
+
+    errors = [f"{size}y {name}: status {row['status']}" for size, endpoints in results['sizes'].items()
+              for name, row in endpoints.items() if row['status'] >= 400]
+    errors += [f"{size}y HTTP: status {status} x{count}" for size, http in results['http'].items()
+               for status, count in http['statuses'].items() if int(status) >= 400]
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\nbaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        errors += compare_to_baseline(results, baseline, args.threshold, args.min_delta_ms)
+        print(f"\ncompared with {args.baseline} (created {baseline.get('created')}, threshold {args.threshold:.0%})")
+    else:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+    for error in errors:
+        print(f"FAIL  {error}")
+    print(f"{'FAIL' if errors else 'ok'}    {len(errors)} problem(s)")
+    sys.exit(1 if errors else 0)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_login(args):
+    """Login throughput and latency at several concurrency levels with the offloaded bcrypt pool."""
+    use_temp_database()
+    with app.app_context():
+        db.session.add(User(username='bench', first_name='Bench', last_name='User',
+                            _hashed_password=password_hasher.hash('bench')))
+        db.session.commit()
+
+    print(f"bcrypt rounds={password_hasher.rounds} workers={password_hasher.executor._max_workers}")
+    print(f"{'clients':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'503s':>5}")
+    for clients in args.concurrency:
+        latencies, statuses = [], Counter()
+        lock = threading.Lock()
+
+        def worker():
+            client = app.test_client()
+            for _ in range(args.logins):
+                started = time.perf_counter()
+                response = client.post('/api/login', json={'user': 'bench', 'password': 'bench'})
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    statuses[response.status_code] += 1
+                    if response.status_code == 201:
+                        latencies.append(elapsed)
+
+        threads = [threading.Thread(target=worker) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"{clients:>7} {statuses[201] / elapsed:>9.1f} {percentile(latencies, 50):>8.1f} "
+              f"{percentile(latencies, 95):>8.1f} {statuses[503]:>5}")
+
+
+BENCHMARKS = {
+    'analytics': bench_analytics,
+    'batch': bench_batch,
+    'calendar': bench_calendar,
+    'compression': bench_compression,
+    'concurrency': bench_concurrency,
+    'day-view': bench_day_view,
+    'etags': bench_etags,
+    'export': bench_export,
+    'login': bench_login,
+    'metrics': bench_metrics,
+    'pagination': bench_pagination,
+    'reminders': bench_reminders,
+    'response-cache': bench_response_cache,
+    'search': bench_search,
+    'serialize': bench_serialize,
+    'serving': bench_serving,
+    'shards': bench_shards,
+    'startup': bench_startup,
+    'suite': bench_suite,
+    'sync': bench_sync,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3, 10])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--edits', type=int, default=10, help='sync: changes made since the last sync')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='iterations per thread')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--shard-counts', type=int, nargs='+', default=[0, 1, 2, 4, 8], help='shards: 0 is unsharded')
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100, 250, 500], help='serving: concurrent clients')
+    parser.add_argument('--client-requests', type=int, default=10, help='serving: requests per client')
+    parser.add_argument('--exports', type=int, default=8, help='serving: concurrent streamed exports')
+    parser.add_argument('--logins', type=int, default=10, help='logins per client')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, help='startup: fail above this cold-start time')
+    parser.add_argument('--samples', type=int, default=30, help='suite: timed requests per route')
+    parser.add_argument('--baseline', default='bench_baseline.json', help='suite: baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='suite: write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='suite: allowed slowdown, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='suite: ignore p50 changes smaller than this')
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
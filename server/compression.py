@@ -0,0 +1,78 @@
+import gzip
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/csv', 'text/css', 'text/html', 'text/plain',
+}
+# statuses whose body is empty or must go out byte-for-byte
+UNCOMPRESSED_STATUSES = {204, 206, 304}
+
+
+def choose_encoding(accept_encodings, streamed=False):
+    """Best content coding both sides support: br when brotli is installed, else gzip, else None."""
+    offered = ('br', 'gzip') if brotli is not None and not streamed else ('gzip',)
+    return accept_encodings.best_match(offered)
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def _gzip_chunks(chunks, original, level):
+    # a sync flush after each chunk sends every row the app has produced so far
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        close = getattr(original, 'close', None)
+        if close is not None:
+            close()
+
+
+def _compress_response(response):
+    if (response.status_code < 200 or response.status_code in UNCOMPRESSED_STATUSES
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    config = current_app.config
+
+    if response.is_streamed and response.content_length is None:
+        # streamed bodies (the data export) have no length to compare with the threshold
+        encoding = choose_encoding(request.accept_encodings, streamed=True)
+        if encoding is not None:
+            original = response.response
+            response.response = _gzip_chunks(response.iter_encoded(), original, config['COMPRESS_LEVEL'])
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+        return response
+
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    compressed = compress(data, encoding, config)
+    if len(compressed) < len(data):
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Compress responses of at least COMPRESS_MIN_SIZE bytes with br or gzip, as the client's Accept-Encoding allows."""
+    app.after_request(_compress_response)
@@ -0,0 +1,41 @@
+import os
+
+
+def _optional_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite:///app.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 0))  # 0 keeps every table in DATABASE_URI
+    SHARD_DATABASE_URI = os.environ.get('SHARD_DATABASE_URI')  # e.g. sqlite:///shard-{shard}.db
+    FAST_JSON = bool(os.environ.get('FAST_JSON'))
+    PRETTY_JSON = bool(os.environ.get('PRETTY_JSON'))  # indented even outside debug mode
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip, 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))  # 0-11
+    REQUEST_LOG_LEVEL = os.environ.get('REQUEST_LOG_LEVEL', 'WARNING')
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # required as a bearer token by /metrics when set
+    SLOW_QUERY_MS = _optional_int('SLOW_QUERY_MS')  # log statements at least this slow, with their query plan
+    PROFILE_EVERY = _optional_int('PROFILE_EVERY')  # cProfile one request in this many
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')  # defaults to instance/profiles
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = _optional_int('PASSWORD_HASH_WORKERS')  # defaults to the CPU count
+    PASSWORD_HASH_QUEUE_DEPTH = _optional_int('PASSWORD_HASH_QUEUE_DEPTH')  # defaults to 4 per worker
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')  # or 'sqlite' for multiple workers
+    SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH')  # defaults to instance/sessions.db
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 10000))
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 3600))
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE', 1000))
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 3600))
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')  # 'sqlite' shares it between workers, 'off'
+    RESPONSE_CACHE_MB = int(os.environ.get('RESPONSE_CACHE_MB', 64))
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH')  # defaults to instance/response_cache.db
+    REMINDER_DAYS_AHEAD = int(os.environ.get('REMINDER_DAYS_AHEAD', 7))
+    REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', 1000))
+    REMINDER_INTERVAL = int(os.environ.get('REMINDER_INTERVAL', 3600))  # seconds between `flask reminders worker` runs
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))  # handler threads under asgi.py; each may hold a DB connection
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, insert, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from models import db, DailySummary, Journal, Medications, Mood, Todos
+from shards import data_engines
+
+COLUMNS = ('user_id', 'day', 'mood_rating', 'journal_count', 'todos_total', 'todos_completed', 'medications_due')
+
+# model -> (column that places a row on a day, columns whose changes affect the rollup)
+TRACKED = {
+    Mood: (Mood.created_at, ('user_id', 'created_at', 'mood_rating')),
+    Journal: (Journal.created_at, ('user_id', 'created_at')),
+    Todos: (Todos.created_at, ('user_id', 'created_at', 'completed')),
+    Medications: (Medications.renew_date, ('user_id', 'renew_date')),
+}
+
+
+def _source(model, day_column, user_id, days, **values):
+    day = db.func.date(day_column)
+    measures = {'mood_rating': literal(None), 'journal_count': literal(0), 'todos_total': literal(0),
+                'todos_completed': literal(0), 'medications_due': literal(0), **values}
+    query = select(
+        model.user_id.label('user_id'), day.label('day'),
+        *(expression.label(name) for name, expression in measures.items()),
+    ).where(model.user_id.is_not(None), day_column.is_not(None))
+    if user_id is not None:
+        query = query.where(model.user_id == user_id)
+    if days is not None:
+        # the range lets SQLite use the (user_id, <date column>) indexes
+        query = query.where(
+            day_column >= min(days), day_column < max(days) + timedelta(days=1),
+            day.in_([d.isoformat() for d in days]),
+        )
+    return query
+
+
+def rollup(user_id=None, days=None):
+    """Recompute daily_summary rows from the source tables, optionally for one user and a set of days."""
+    rows = union_all(
+        _source(Mood, Mood.created_at, user_id, days, mood_rating=Mood.mood_rating),
+        _source(Journal, Journal.created_at, user_id, days, journal_count=literal(1)),
+        _source(Todos, Todos.created_at, user_id, days,
+                todos_total=literal(1), todos_completed=db.cast(Todos.completed, db.Integer)),
+        _source(Medications, Medications.renew_date, user_id, days, medications_due=literal(1)),
+    ).subquery()
+    return select(
+        rows.c.user_id, rows.c.day,
+        db.func.max(rows.c.mood_rating),
+        db.func.sum(rows.c.journal_count),
+        db.func.sum(rows.c.todos_total),
+        db.func.sum(rows.c.todos_completed),
+        db.func.sum(rows.c.medications_due),
+    ).group_by(rows.c.user_id, rows.c.day)
+
+
+def refresh_days(connection, user_id, days):
+    """Rewrite one user's summary rows for the given dates from the source tables."""
+    days = sorted(set(days))
+    if not days:
+        return
+    connection.execute(delete(DailySummary).where(DailySummary.user_id == user_id, DailySummary.day.in_(days)))
+    connection.execute(insert(DailySummary).from_select(COLUMNS, rollup(user_id, days)))
+
+
+def rebuild(connection, user_id=None):
+    """Recompute every summary row, or just one user's; returns the number of rows written."""
+    statement = delete(DailySummary)
+    if user_id is not None:
+        statement = statement.where(DailySummary.user_id == user_id)
+    connection.execute(statement)
+    return connection.execute(insert(DailySummary).from_select(COLUMNS, rollup(user_id))).rowcount
+
+
+def find_drift(connection, user_id=None):
+    """Compare stored rows with a from-scratch recomputation.
+
+    Returns a list of (user_id, day, stored, expected) tuples where the two
+    disagree; stored or expected is None when the row is missing on that side.
+    """
+    stored_query = select(*(getattr(DailySummary, column) for column in COLUMNS))
+    if user_id is not None:
+        stored_query = stored_query.where(DailySummary.user_id == user_id)
+    stored = {(row[0], row[1].isoformat()): tuple(row[2:]) for row in connection.execute(stored_query)}
+    expected = {(row[0], row[1]): tuple(row[2:]) for row in connection.execute(rollup(user_id))}
+    return [
+        (key[0], key[1], stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys())
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def _values(state, key):
+    history = state.attrs[key].history
+    values = list(history.deleted)
+    if key in state.dict:
+        values.append(state.dict[key])
+    elif not state.deleted:
+        values.append(getattr(state.obj(), key))
+    return values
+
+
+def touched_days(session):
+    """(user_id -> dates) whose rollup may change because of the pending flush."""
+    touched = defaultdict(set)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tracked = TRACKED.get(type(obj))
+        if tracked is None:
+            continue
+        day_column, keys = tracked
+        state = inspect(obj)
+        if obj in session.dirty and not any(state.attrs[key].history.has_changes() for key in keys):
+            continue
+        days = {_as_date(value) for value in _values(state, day_column.key)} - {None}
+        for user_id in set(_values(state, 'user_id')) - {None}:
+            touched[user_id] |= days
+    return touched
+
+
+def _refresh_after_flush(session, flush_context):
+    for user_id, days in touched_days(session).items():
+        refresh_days(session.connection(), user_id, days)
+
+
+def init_daily_summary(app):
+    """Keep daily_summary in step with ORM writes and register the `flask daily-summary` commands.
+
+    Bulk statements that bypass the unit of work (see batch.py) call
+    refresh_days() themselves.
+    """
+    if not event.contains(Session, 'after_flush', _refresh_after_flush):
+        event.listen(Session, 'after_flush', _refresh_after_flush)
+    app.cli.add_command(daily_summary_cli)
+
+
+daily_summary_cli = AppGroup('daily-summary', help='Maintain the daily_summary rollup table.')
+
+
+@daily_summary_cli.command('rebuild')
+@click.option('--user-id', type=int, help='Only rebuild this user.')
+def rebuild_command(user_id):
+    """Backfill daily_summary from the mood, journal, todo and medication tables."""
+    count = 0
+    for engine in data_engines():
+        with engine.begin() as connection:
+            count += rebuild(connection, user_id)
+    click.echo(f'Wrote {count} daily summary rows')
+
+
+@daily_summary_cli.command('check')
+@click.option('--user-id', type=int, help='Only check this user.')
+def check_command(user_id):
+    """Exit non-zero if daily_summary differs from a recomputation."""
+    drift = []
+    for engine in data_engines():
+        with engine.connect() as connection:
+            drift += find_drift(connection, user_id)
+    for user, day, stored, expected in drift:
+        click.echo(f'user {user} {day}: stored {stored}, expected {expected}')
+    if drift:
+        raise click.ClickException(f'{len(drift)} daily summary rows out of date')
+    click.echo('daily_summary is consistent')
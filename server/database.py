@@ -0,0 +1,102 @@
+import functools
+import os
+import random
+import sqlite3
+import time
+
+from flask import g, has_app_context, jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from models import db
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms
+    'cache_size': -20000,       # negative means KiB, so ~20 MB per connection
+    'mmap_size': 268435456,     # 256 MB
+}
+
+BUSY_RETRIES = 3
+BUSY_BACKOFF = 0.05  # seconds, doubled on every retry
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS built from DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT."""
+    options = {'pool_pre_ping': True}
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # in-memory databases use a single static connection
+        return options
+    options.update(
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    )
+    return options
+
+
+def _is_busy(exc):
+    return isinstance(exc, sqlite3.OperationalError) and 'database is locked' in str(exc)
+
+
+def init_sqlite(app):
+    """Apply SQLITE_PRAGMAS to every new SQLite connection and take over transaction begins.
+
+    pysqlite's own BEGIN is disabled so writes wrapped in retry_on_busy can
+    start with BEGIN IMMEDIATE and wait on busy_timeout for the write lock,
+    instead of failing when a read transaction is upgraded to a write.
+    Applies to every engine, shards included.
+    """
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {})}
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            _listen_sqlite(engine, pragmas)
+
+
+def _listen_sqlite(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin(conn):
+        immediate = has_app_context() and g.get('write_transaction')
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+
+    @event.listens_for(engine, 'handle_error')
+    def flag_busy(context):
+        if has_app_context() and _is_busy(context.original_exception):
+            g.database_busy = True
+
+
+def retry_on_busy(view):
+    """Run a write endpoint in BEGIN IMMEDIATE transactions, retrying it when SQLite reports the database is locked.
+
+    Handlers catch every exception themselves, so a busy error is detected
+    through the flag set by init_sqlite's handle_error listener rather than
+    by catching it here. Gives up with a 503 after BUSY_RETRIES retries.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.write_transaction = True
+        try:
+            for attempt in range(BUSY_RETRIES + 1):
+                g.database_busy = False
+                response = view(*args, **kwargs)
+                if not g.database_busy:
+                    return response
+                db.session.rollback()
+                if attempt < BUSY_RETRIES:
+                    time.sleep(BUSY_BACKOFF * 2 ** attempt * (1 + random.random()))
+            return jsonify({'error': 'Database is busy, please retry'}), 503
+        finally:
+            g.write_transaction = False
+    return wrapper
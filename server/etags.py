@@ -0,0 +1,103 @@
+import functools
+from itertools import chain
+
+from flask import make_response, request, session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, CollectionVersion, Journal, Medications, Mood, Todos
+from response_cache import cached_response
+
+# model -> collection name used in version counters and ETags
+COLLECTIONS = {
+    Journal: 'journals',
+    Mood: 'mood-ratings',
+    Todos: 'todos',
+    Medications: 'medications',
+}
+
+
+def bump_versions(connection, changes):
+    """Increment the version counter of each (user_id, collection) pair."""
+    if not changes:
+        return
+    upsert = sqlite_insert(CollectionVersion)
+    connection.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[CollectionVersion.user_id, CollectionVersion.collection],
+            set_={'version': CollectionVersion.version + 1},
+        ),
+        [{'user_id': user_id, 'collection': collection, 'version': 1} for user_id, collection in sorted(changes)],
+    )
+
+
+def current_version(user_id, collection):
+    return db.session.scalar(
+        select(CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id, CollectionVersion.collection == collection,
+        )
+    ) or 0
+
+
+def current_versions(user_id, collections):
+    """{collection: version} for several of the user's collections in one query."""
+    rows = db.session.execute(
+        select(CollectionVersion.collection, CollectionVersion.version).where(
+            CollectionVersion.user_id == user_id, CollectionVersion.collection.in_(collections),
+        )
+    )
+    return {collection: 0 for collection in collections} | dict(rows.all())
+
+
+def _changed_collections(session):
+    changes = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        collection = COLLECTIONS.get(type(obj))
+        if collection is None or (obj in session.dirty and not session.is_modified(obj, include_collections=False)):
+            continue
+        # a row moved to another user changes both users' collections
+        history = inspect(obj).attrs.user_id.history
+        for user_id in chain(history.added, history.unchanged, history.deleted):
+            if user_id is not None:
+                changes.add((user_id, collection))
+    return changes
+
+
+def _bump_after_flush(session, flush_context):
+    bump_versions(session.connection(), _changed_collections(session))
+
+
+def conditional_get(collection):
+    """Tag a list endpoint's response with a weak ETag built from the user's collection version.
+
+    A matching If-None-Match is answered with 304 after the single version
+    lookup, before the view runs. `no-cache` makes browsers revalidate
+    every time instead of reusing a stale copy. Other requests are served
+    from the response cache when it holds the body for this version.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('user_id')
+            if not user_id:
+                return view(*args, **kwargs)
+            version = current_version(user_id, collection)
+            etag = f'{collection}-{user_id}-{version}'
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = cached_response(user_id, version, view, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def init_etags(app):
+    """Bump collection versions on every ORM write. Bulk statements in batch.py call bump_versions() themselves."""
+    if not event.contains(Session, 'after_flush', _bump_after_flush):
+        event.listen(Session, 'after_flush', _bump_after_flush)
@@ -0,0 +1,6 @@
+from flask_bcrypt import Bcrypt
+
+from passwords import PasswordHasher
+
+bcrypt = Bcrypt()
+password_hasher = PasswordHasher(bcrypt)
@@ -0,0 +1,267 @@
+import cProfile
+import itertools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from query_counter import TRANSACTION_CONTROL
+
+slow_query_logger = logging.getLogger('adhd_companion.slow_queries')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)  # bytes
+
+# name -> (help, buckets) of the per-route histograms
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time from the first before_request hook to the response.', LATENCY_BUCKETS),
+    'http_request_db_seconds': ('Time spent executing SQL per request.', LATENCY_BUCKETS),
+    'http_request_db_queries': ('SQL statements executed per request, not counting BEGIN and COMMIT.', QUERY_BUCKETS),
+    'http_response_size_bytes': ('Response body size as sent, after compression; streamed bodies are left out.', SIZE_BUCKETS),
+}
+UNMATCHED_ROUTE = 'unmatched'  # 404s get one label instead of one per path
+# statements EXPLAIN QUERY PLAN can't describe
+UNPLANNED_STATEMENTS = TRANSACTION_CONTROL + ('PRAGMA', 'EXPLAIN', 'CREATE', 'DROP', 'ALTER')
+
+
+class Histogram:
+    """Prometheus-style histogram; counts are kept per bucket and summed up when rendered."""
+
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Request metrics of one worker process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()    # (method, route, status) -> requests
+        self.exceptions = Counter()  # (method, route, exception type) -> unhandled exceptions
+        self.slow_queries = 0
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.collectors = []  # callables returning more exposition lines, e.g. the response cache's
+
+    def observe_request(self, method, route, status, seconds, db_seconds, queries, size):
+        labels = (method, route)
+        with self.lock:
+            self.requests[method, route, status] += 1
+            for name, value in (('http_request_duration_seconds', seconds), ('http_request_db_seconds', db_seconds),
+                                ('http_request_db_queries', queries), ('http_response_size_bytes', size)):
+                if value is None:
+                    continue
+                histograms = self.histograms[name]
+                histogram = histograms.get(labels)
+                if histogram is None:
+                    histogram = histograms[labels] = Histogram(HISTOGRAMS[name][1])
+                histogram.observe(value)
+
+    def count_exception(self, method, route, name):
+        with self.lock:
+            self.exceptions[method, route, name] += 1
+
+    def count_slow_query(self):
+        with self.lock:
+            self.slow_queries += 1
+
+    def render(self):
+        with self.lock:
+            requests = sorted(self.requests.items())
+            exceptions = sorted(self.exceptions.items())
+            slow_queries = self.slow_queries
+            histograms = {name: sorted((labels, list(h.counts), h.sum) for labels, h in by_labels.items())
+                          for name, by_labels in self.histograms.items()}
+
+        lines = ['# HELP http_requests_total Requests answered, by route and status.',
+                 '# TYPE http_requests_total counter']
+        lines += [f'http_requests_total{_labels(method=m, route=r, status=s)} {n}' for (m, r, s), n in requests]
+        lines += ['# HELP http_request_errors_total Requests answered with a 4xx or 5xx status.',
+                  '# TYPE http_request_errors_total counter']
+        errors = defaultdict(int)
+        for (method, route, status), count in requests:
+            if status >= 400:
+                errors[method, route, f'{status // 100}xx'] += count
+        lines += [f'http_request_errors_total{_labels(method=m, route=r, class_=c)} {n}' for (m, r, c), n in sorted(errors.items())]
+        lines += ['# HELP http_request_exceptions_total Exceptions that escaped a handler.',
+                  '# TYPE http_request_exceptions_total counter']
+        lines += [f'http_request_exceptions_total{_labels(method=m, route=r, exception=e)} {n}' for (m, r, e), n in exceptions]
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for (method, route), counts, total in histograms[name]:
+                cumulative = itertools.accumulate(counts)
+                for bound, count in zip((*buckets, '+Inf'), cumulative):
+                    lines.append(f'{name}_bucket{_labels(method=method, route=route, le=bound)} {count}')
+                lines.append(f'{name}_sum{_labels(method=method, route=route)} {total:g}')
+                lines.append(f'{name}_count{_labels(method=method, route=route)} {sum(counts)}')
+        lines += ['# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS.',
+                  '# TYPE db_slow_queries_total counter',
+                  f'db_slow_queries_total {slow_queries}']
+        for collector in self.collectors:
+            lines += collector()
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    # class_ because class is a keyword
+    return '{' + ','.join(f'{name.rstrip("_")}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class SamplingProfiler:
+    """cProfile every Nth request and write the stats to a .prof file in `directory`.
+
+    Only the request thread is profiled. On Python 3.12+ only one profiler
+    can run at a time, so a sampled request that overlaps another one is
+    skipped rather than profiled.
+    """
+
+    def __init__(self, every, directory):
+        self.every = every
+        self.directory = directory
+        self.requests = itertools.count(1)
+
+    def start(self):
+        if next(self.requests) % self.every:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+
+    def finish(self, profiler, method, route, seconds):
+        profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        name = f"{datetime.now():%Y%m%dT%H%M%S.%f}-{method}-{slug}-{seconds * 1000:.0f}ms-{os.getpid()}.prof"
+        path = os.path.join(self.directory, name)
+        profiler.dump_stats(path)
+        return path
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+
+
+def _start_request():
+    g.metrics = {'start': time.perf_counter(), 'db_seconds': 0.0, 'queries': 0}
+    profiler = current_app.extensions.get('profiler')
+    if profiler is not None:
+        g.metrics['profile'] = profiler.start()
+
+
+def _finish_request(response):
+    entry = g.get('metrics')
+    if entry is None:
+        return response
+    # streamed bodies are still being produced, so they only count up to here
+    seconds = time.perf_counter() - entry['start']
+    size = None if response.is_streamed else response.calculate_content_length()
+    current_app.extensions['metrics'].observe_request(
+        request.method, _route(), response.status_code, seconds, entry['db_seconds'], entry['queries'], size)
+    return response
+
+
+def _teardown_request(exc):
+    entry = g.pop('metrics', None)
+    if entry is None:
+        return
+    if exc is not None:
+        current_app.extensions['metrics'].count_exception(request.method, _route(), type(exc).__name__)
+    profile = entry.get('profile')
+    if profile is not None:
+        path = current_app.extensions['profiler'].finish(profile, request.method, _route(), time.perf_counter() - entry['start'])
+        current_app.logger.info('Profiled %s %s into %s', request.method, request.path, path)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    if has_request_context() and 'metrics' in g:
+        g.metrics['db_seconds'] += seconds
+        if not statement.startswith(TRANSACTION_CONTROL):
+            g.metrics['queries'] += 1
+    threshold = current_app.config.get('SLOW_QUERY_MS') if has_app_context() else None
+    if threshold is not None and seconds * 1000 >= threshold:
+        _log_slow_query(cursor, statement, parameters, executemany, seconds)
+
+
+def _handle_error(context):
+    # the statement failed, so after_cursor_execute won't pop its start time
+    starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def query_plan(cursor, statement, parameters):
+    """EXPLAIN QUERY PLAN of a statement as 'step | step', or None if SQLite can't explain it."""
+    if not isinstance(cursor, sqlite3.Cursor) or statement.lstrip().upper().startswith(UNPLANNED_STATEMENTS):
+        return None
+    explain = cursor.connection.cursor()
+    try:
+        return ' | '.join(row[3] for row in explain.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)) or None
+    except sqlite3.Error:
+        return None
+    finally:
+        explain.close()
+
+
+def _log_slow_query(cursor, statement, parameters, executemany, seconds):
+    if has_app_context() and 'metrics' in current_app.extensions:
+        current_app.extensions['metrics'].count_slow_query()
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    slow_query_logger.warning(
+        'slow query %.1f ms%s: %s params=%r plan=%s',
+        seconds * 1000, f' ({request.method} {request.path})' if has_request_context() else '',
+        ' '.join(statement.split()), parameters, query_plan(cursor, statement, parameters),
+    )
+
+
+def init_metrics(app):
+    """Time every request and its SQL for GET /metrics, log slow queries and sample requests into cProfile.
+
+    Metrics are kept per worker process. Call before init_compression so the
+    response sizes recorded are those sent. SLOW_QUERY_MS applies to every
+    statement run in an app context, CLI jobs included; PROFILE_EVERY=N
+    profiles one request in N into PROFILE_DIR.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.extensions['metrics'] = Registry()
+    if app.config.get('PROFILE_EVERY'):
+        directory = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        app.extensions['profiler'] = SamplingProfiler(app.config['PROFILE_EVERY'], directory)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+from shards import bind_key
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -16,6 +18,10 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    shard = context.get_x_argument(as_dictionary=True).get('shard')
+    if shard is not None:
+        # `flask shards upgrade` runs the same migrations on each shard database
+        return current_app.extensions['migrate'].db.engines[bind_key(int(shard))]
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
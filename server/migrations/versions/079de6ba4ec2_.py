@@ -0,0 +1,55 @@
+"""add change log and sync clients
+
+Revision ID: 079de6ba4ec2
+Revises: 891531fafd2c
+Create Date: 2026-10-18 21:55:39.843041
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '079de6ba4ec2'
+down_revision = '891531fafd2c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('change_log',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('collection', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('op', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_change_log_user_id_users_table')),
+    sa.PrimaryKeyConstraint('user_id', 'seq')
+    )
+    op.create_table('sync_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('acked_seq', sa.Integer(), nullable=False),
+    sa.Column('acked_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_sync_clients_user_id_users_table')),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_clients', schema=None) as batch_op:
+        batch_op.create_index('ix_sync_clients_user_id_acked_at', ['user_id', 'acked_at'], unique=False)
+
+    op.create_table('sync_state',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_seq', sa.Integer(), nullable=False),
+    sa.Column('compacted_seq', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_sync_state_user_id_users_table')),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
+    with op.batch_alter_table('sync_clients', schema=None) as batch_op:
+        batch_op.drop_index('ix_sync_clients_user_id_acked_at')
+
+    op.drop_table('sync_clients')
+    op.drop_table('change_log')
@@ -0,0 +1,46 @@
+"""add reminders for medication renewals
+
+Revision ID: 891531fafd2c
+Revises: a4e7fa2e005d
+Create Date: 2026-10-18 21:20:58.325207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '891531fafd2c'
+down_revision = 'a4e7fa2e005d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('medication_id', sa.Integer(), nullable=False),
+    sa.Column('due_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('dismissed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['medication_id'], ['medications_table.id'], name=op.f('fk_reminders_medication_id_medications_table')),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_reminders_user_id_users_table')),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('medication_id', 'due_date', name='uq_reminders_medication_id_due_date')
+    )
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.create_index('ix_reminders_user_id_dismissed_at_due_date', ['user_id', 'dismissed_at', 'due_date'], unique=False)
+
+    with op.batch_alter_table('medications_table', schema=None) as batch_op:
+        batch_op.create_index('ix_medications_table_renew_date', ['renew_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('medications_table', schema=None) as batch_op:
+        batch_op.drop_index('ix_medications_table_renew_date')
+
+    with op.batch_alter_table('reminders', schema=None) as batch_op:
+        batch_op.drop_index('ix_reminders_user_id_dismissed_at_due_date')
+
+    op.drop_table('reminders')
@@ -0,0 +1,42 @@
+"""add per-user date indexes and one-mood-per-day constraint
+
+Revision ID: 9243faa68c68
+Revises: dfa4937558b9
+Create Date: 2026-10-18 10:12:41.532118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9243faa68c68'
+down_revision = 'dfa4937558b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_mood_table_user_id_created_at', 'mood_table', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_mood_table_journal_id', 'mood_table', ['journal_id'], unique=False)
+    op.create_index('ix_journal_table_user_id_created_at', 'journal_table', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_todos_table_user_id_created_at', 'todos_table', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_medications_table_user_id_renew_date', 'medications_table', ['user_id', 'renew_date'], unique=False)
+
+    # Keep only the latest rating per user per day before enforcing uniqueness
+    op.execute("""
+        DELETE FROM mood_table
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM mood_table GROUP BY user_id, date(created_at)
+        )
+    """)
+    op.create_index('uq_mood_table_user_id_day', 'mood_table', ['user_id', sa.text('date(created_at)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_mood_table_user_id_day', table_name='mood_table')
+    op.drop_index('ix_medications_table_user_id_renew_date', table_name='medications_table')
+    op.drop_index('ix_todos_table_user_id_created_at', table_name='todos_table')
+    op.drop_index('ix_journal_table_user_id_created_at', table_name='journal_table')
+    op.drop_index('ix_mood_table_journal_id', table_name='mood_table')
+    op.drop_index('ix_mood_table_user_id_created_at', table_name='mood_table')
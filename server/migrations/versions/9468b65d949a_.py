@@ -0,0 +1,30 @@
+"""add collection_versions for conditional GETs
+
+Revision ID: 9468b65d949a
+Revises: ffc1933dfdc7
+Create Date: 2026-10-18 21:05:43.118392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9468b65d949a'
+down_revision = 'ffc1933dfdc7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('collection_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('collection', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_collection_versions_user_id_users_table')),
+    sa.PrimaryKeyConstraint('user_id', 'collection')
+    )
+
+
+def downgrade():
+    op.drop_table('collection_versions')
@@ -0,0 +1,49 @@
+"""add journal_fts full-text index
+
+Revision ID: a4e7fa2e005d
+Revises: 9468b65d949a
+Create Date: 2026-10-18 22:31:09.551874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e7fa2e005d'
+down_revision = '9468b65d949a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rowids are user_id * 2**32 + journal id so each user's entries are contiguous
+    op.execute("CREATE VIRTUAL TABLE journal_fts USING fts5(journal_header, journal_text, tokenize='porter unicode61', prefix='2 3')")
+    op.execute(
+        "CREATE TRIGGER journal_fts_insert AFTER INSERT ON journal_table WHEN new.user_id IS NOT NULL BEGIN "
+        "INSERT INTO journal_fts (rowid, journal_header, journal_text) VALUES (new.user_id * 4294967296 + new.id, new.journal_header, new.journal_text); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER journal_fts_delete AFTER DELETE ON journal_table BEGIN "
+        "DELETE FROM journal_fts WHERE rowid = old.user_id * 4294967296 + old.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER journal_fts_update AFTER UPDATE OF journal_header, journal_text, user_id ON journal_table BEGIN "
+        "DELETE FROM journal_fts WHERE rowid = old.user_id * 4294967296 + old.id; "
+        "INSERT INTO journal_fts (rowid, journal_header, journal_text) SELECT new.user_id * 4294967296 + new.id, new.journal_header, new.journal_text WHERE new.user_id IS NOT NULL; "
+        "END"
+    )
+    # Index the existing entries
+    op.execute(
+        "INSERT INTO journal_fts (rowid, journal_header, journal_text) "
+        "SELECT user_id * 4294967296 + id, journal_header, journal_text FROM journal_table WHERE user_id IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS journal_fts_update')
+    op.execute('DROP TRIGGER IF EXISTS journal_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS journal_fts_insert')
+    op.execute('DROP TABLE IF EXISTS journal_fts')
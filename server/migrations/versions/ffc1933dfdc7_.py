@@ -0,0 +1,37 @@
+"""add daily_summary rollup table
+
+Revision ID: ffc1933dfdc7
+Revises: 9243faa68c68
+Create Date: 2026-10-18 14:02:17.406251
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ffc1933dfdc7'
+down_revision = '9243faa68c68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('mood_rating', sa.Integer(), nullable=True),
+    sa.Column('journal_count', sa.Integer(), nullable=False),
+    sa.Column('todos_total', sa.Integer(), nullable=False),
+    sa.Column('todos_completed', sa.Integer(), nullable=False),
+    sa.Column('medications_due', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users_table.id'], name=op.f('fk_daily_summary_user_id_users_table')),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', name='uq_daily_summary_user_id_day')
+    )
+    # Existing rows are backfilled with `flask daily-summary rebuild`
+
+
+def downgrade():
+    op.drop_table('daily_summary')
@@ -5,11 +5,14 @@ from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime, date
 
+from shards import ShardedSession
+
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
 
-db = SQLAlchemy(metadata=metadata)
+# ShardedSession only changes routing when SHARD_COUNT is set
+db = SQLAlchemy(metadata=metadata, session_options={'class_': ShardedSession})
 
 # write your models here!
 class User(db.Model, SerializerMixin):
@@ -36,6 +39,13 @@ class Mood(db.Model, SerializerMixin):
 
     journal = db.relationship('Journal', back_populates='mood')
 
+    __table_args__ = (
+        db.Index('ix_mood_table_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_mood_table_journal_id', 'journal_id'),
+        # one mood rating per user per calendar day
+        db.Index('uq_mood_table_user_id_day', 'user_id', db.func.date(created_at), unique=True),
+    )
+
 class Journal(db.Model, SerializerMixin):
     __tablename__ = 'journal_table'
 
@@ -49,6 +59,10 @@ class Journal(db.Model, SerializerMixin):
     mood = db.relationship('Mood', uselist=False, back_populates='journal')
     serialize_rules = ('-user.journals',)
 
+    __table_args__ = (
+        db.Index('ix_journal_table_user_id_created_at', 'user_id', 'created_at'),
+    )
+
 class Medications(db.Model, SerializerMixin):
     __tablename__ = 'medications_table'
 
@@ -59,6 +73,12 @@ class Medications(db.Model, SerializerMixin):
     renew_date = db.Column(db.DateTime)
     user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'))
 
+    __table_args__ = (
+        db.Index('ix_medications_table_user_id_renew_date', 'user_id', 'renew_date'),
+        # the reminder job looks up renewals due across all users
+        db.Index('ix_medications_table_renew_date', 'renew_date'),
+    )
+
 class Todos(db.Model, SerializerMixin):
     __tablename__ = 'todos_table'
 
@@ -68,4 +88,75 @@ class Todos(db.Model, SerializerMixin):
     created_at = db.Column(db.DateTime, default=datetime.now)
     user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'))
 
-    serialize_rules = ('-user.todos',)
\ No newline at end of file
+    serialize_rules = ('-user.todos',)
+
+    __table_args__ = (
+        db.Index('ix_todos_table_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+class DailySummary(db.Model, SerializerMixin):
+    __tablename__ = 'daily_summary'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    mood_rating = db.Column(db.Integer)
+    journal_count = db.Column(db.Integer, default=0, nullable=False)
+    todos_total = db.Column(db.Integer, default=0, nullable=False)
+    todos_completed = db.Column(db.Integer, default=0, nullable=False)
+    medications_due = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_summary_user_id_day'),
+    )
+
+class CollectionVersion(db.Model):
+    __tablename__ = 'collection_versions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), primary_key=True)
+    collection = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+class Reminder(db.Model):
+    __tablename__ = 'reminders'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), nullable=False)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications_table.id'), nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    dismissed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # one reminder per renewal, so the job can run again without duplicating them
+        db.UniqueConstraint('medication_id', 'due_date', name='uq_reminders_medication_id_due_date'),
+        db.Index('ix_reminders_user_id_dismissed_at_due_date', 'user_id', 'dismissed_at', 'due_date'),
+    )
+
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    collection = db.Column(db.String, nullable=False)
+    entity_id = db.Column(db.Integer)  # None for a whole-collection 'reset'
+    op = db.Column(db.String, nullable=False)
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), primary_key=True)
+    last_seq = db.Column(db.Integer, default=0, nullable=False)
+    compacted_seq = db.Column(db.Integer, default=0, nullable=False)
+
+class SyncClient(db.Model):
+    __tablename__ = 'sync_clients'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users_table.id'), nullable=False)
+    acked_seq = db.Column(db.Integer, nullable=False)
+    acked_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_sync_clients_user_id_acked_at', 'user_id', 'acked_at'),
+    )
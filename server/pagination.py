@@ -0,0 +1,118 @@
+import base64
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def _parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise PaginationError(f"'{name}' must be a date in YYYY-MM-DD format")
+
+
+def encode_cursor(sort_value, row_id):
+    # an empty sort value stands for NULL, e.g. a medication with no renew_date
+    raw = f"{sort_value.isoformat() if sort_value is not None else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        sort_value, row_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(sort_value) if sort_value else None), int(row_id)
+    except (ValueError, UnicodeError):
+        raise PaginationError('Invalid cursor')
+
+
+def encode_offset_cursor(offset):
+    # for orderings with no stable key to resume from, such as search rank
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode('utf-8')).decode('ascii')
+
+
+def decode_offset_cursor(cursor):
+    try:
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        if prefix != 'offset' or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except (ValueError, UnicodeError):
+        raise PaginationError('Invalid cursor')
+
+
+def parse_limit(args, default=DEFAULT_PAGE_SIZE):
+    try:
+        limit = int(args.get('limit', default))
+    except ValueError:
+        raise PaginationError("'limit' must be an integer")
+    if limit < 1:
+        raise PaginationError("'limit' must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def filter_date_range(query, sort_column, args):
+    # 'from' and 'to' are inclusive calendar days
+    if args.get('from'):
+        start = _parse_day(args['from'], 'from')
+        query = query.filter(sort_column >= datetime.combine(start, time.min))
+    if args.get('to'):
+        end = _parse_day(args['to'], 'to') + timedelta(days=1)
+        query = query.filter(sort_column < datetime.combine(end, time.min))
+    return query
+
+
+def paginate(query, sort_column, id_column, args):
+    """Filter `query` by the from/to request args and order it by (sort_column, id).
+
+    Pagination is opt-in: when neither `limit` nor `cursor` is given every
+    matching row is returned and `next_cursor` is None. Otherwise at most
+    `limit` rows after `cursor` are returned, along with the cursor for the
+    following page (None on the last page). Rows whose sort_column is NULL
+    come first, as SQLite sorts them, and are paged through by id.
+
+    Returns a tuple of (rows, next_cursor, paginated).
+    """
+    query = filter_date_range(query, sort_column, args)
+    query = query.order_by(sort_column, id_column)
+
+    paginated = 'limit' in args or 'cursor' in args
+    if not paginated:
+        return query.all(), None, False
+
+    limit = parse_limit(args)
+    if args.get('cursor'):
+        after_value, after_id = decode_cursor(args['cursor'])
+        if after_value is None:
+            query = query.filter(or_(
+                sort_column.is_not(None),
+                and_(sort_column.is_(None), id_column > after_id),
+            ))
+        else:
+            # NULLs sort first, so they were all on earlier pages
+            query = query.filter(or_(
+                sort_column > after_value,
+                and_(sort_column == after_value, id_column > after_id),
+            ))
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor, True
+
+
+def page_response(items, next_cursor, paginated):
+    # Unpaginated requests keep the original bare-list response shape
+    if paginated:
+        return {'items': items, 'next_cursor': next_cursor}
+    return items
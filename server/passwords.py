@@ -0,0 +1,62 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool's queue is full; callers should answer 503."""
+
+
+class PasswordHasher:
+    """Runs Flask-Bcrypt hashing on a bounded thread pool instead of the request thread.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without the cost of a process pool. At most PASSWORD_HASH_WORKERS hashes
+    run at once and PASSWORD_HASH_QUEUE_DEPTH more may wait; beyond that
+    submit() raises HasherBusy rather than letting logins pile up.
+    """
+
+    def __init__(self, bcrypt):
+        self.bcrypt = bcrypt
+        self.executor = None
+        self.slots = None
+        self.rounds = None
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        workers = app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH')
+        if queue_depth is None:
+            queue_depth = workers * 4
+        previous = self.executor
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.slots = threading.BoundedSemaphore(workers + queue_depth)
+        if previous is not None:
+            # hashes already queued on the old pool still finish; its threads exit once they have
+            previous.shutdown(wait=False)
+
+    def submit(self, fn, *args):
+        # held locally so a hash in flight across init_app releases the semaphore it took
+        executor, slots = self.executor, self.slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy('Too many concurrent password checks, please retry')
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self.submit(self.bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def check(self, hashed, password):
+        return self.submit(self.bcrypt.check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        # bcrypt hashes look like $2b$<cost>$<salt+digest>
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
@@ -0,0 +1,32 @@
+from sqlalchemy import event
+
+# Emitted by database.init_sqlite's begin listener, not by the endpoints themselves
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+class QueryCounter:
+    """Count the statements an engine executes while the block runs.
+
+        with QueryCounter(db.engine) as counter:
+            client.get('/api/journals')
+        assert counter.count <= 1, counter.statements
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(TRANSACTION_CONTROL):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
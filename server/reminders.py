@@ -0,0 +1,119 @@
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, exists, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Medications, Reminder
+from shards import data_engines
+
+
+def _due_batch(connection, start, end, after, batch_size):
+    # keyset over ix_medications_table_renew_date: each batch picks up after the last (renew_date, id)
+    query = (
+        select(Medications.id, Medications.user_id, Medications.renew_date)
+        .where(Medications.renew_date >= start, Medications.renew_date < end, Medications.user_id.is_not(None))
+        .order_by(Medications.renew_date, Medications.id)
+        .limit(batch_size)
+    )
+    if after is not None:
+        query = query.where(tuple_(Medications.renew_date, Medications.id) > after)
+    return connection.execute(query).all()
+
+
+def remove_stale(connection):
+    """Drop pending reminders whose medication was deleted or has moved to another renewal date."""
+    current = exists().where(
+        Medications.id == Reminder.medication_id,
+        Medications.user_id == Reminder.user_id,
+        Medications.renew_date == Reminder.due_date,
+    )
+    return connection.execute(delete(Reminder).where(Reminder.dismissed_at.is_(None), ~current)).rowcount
+
+
+def schedule_reminders(engine, days_ahead, batch_size, today=None):
+    """Create a reminder for every medication renewal due in the next `days_ahead` days.
+
+    Medications are read `batch_size` at a time across all users and each
+    batch is written in its own short transaction, so memory and lock time
+    stay bounded however many medications there are. Existing and
+    dismissed reminders are left alone. Returns per-run counts and timing.
+    """
+    started = time.perf_counter()
+    start = datetime.combine(today or date.today(), datetime.min.time())
+    end = start + timedelta(days=days_ahead + 1)
+    stats = {'due': 0, 'created': 0, 'removed': 0, 'batches': 0}
+    upsert = sqlite_insert(Reminder).on_conflict_do_nothing(index_elements=[Reminder.medication_id, Reminder.due_date])
+
+    with engine.begin() as connection:
+        stats['removed'] = remove_stale(connection)
+    after = None
+    while True:
+        with engine.begin() as connection:
+            rows = _due_batch(connection, start, end, after, batch_size)
+            if not rows:
+                break
+            result = connection.execute(upsert, [
+                {'user_id': user_id, 'medication_id': medication_id, 'due_date': renew_date, 'created_at': datetime.now()}
+                for medication_id, user_id, renew_date in rows
+            ])
+        stats['due'] += len(rows)
+        stats['created'] += result.rowcount
+        stats['batches'] += 1
+        after = (rows[-1].renew_date, rows[-1].id)
+    stats['ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return stats
+
+
+def pending_reminders(user_id):
+    """The user's reminders that haven't been dismissed, soonest first, with the medication's details."""
+    return db.session.execute(
+        select(Reminder.id, Reminder.medication_id, Medications.drug_name, Medications.dosage, Reminder.due_date)
+        # a medication deleted or moved to a new date since the last run no longer counts
+        .join(Medications, (Medications.id == Reminder.medication_id) & (Medications.renew_date == Reminder.due_date))
+        .where(Reminder.user_id == user_id, Reminder.dismissed_at.is_(None))
+        .order_by(Reminder.due_date, Reminder.id)
+    ).all()
+
+
+def init_reminders(app):
+    """Register the `flask reminders` commands that fill the reminders table."""
+    app.cli.add_command(reminders_cli)
+
+
+reminders_cli = AppGroup('reminders', help='Create medication renewal reminders.')
+
+
+def _options(command):
+    command = click.option('--days', type=int, help='Look this many days ahead (default REMINDER_DAYS_AHEAD).')(command)
+    return click.option('--batch-size', type=int, help='Medications per transaction (default REMINDER_BATCH_SIZE).')(command)
+
+
+def _run(days, batch_size):
+    config = current_app.config
+    for engine in data_engines():
+        stats = schedule_reminders(engine, config['REMINDER_DAYS_AHEAD'] if days is None else days,
+                                   batch_size or config['REMINDER_BATCH_SIZE'])
+        click.echo(f"{datetime.now().isoformat(timespec='seconds')} {engine.url.database} due={stats['due']} "
+                   f"created={stats['created']} removed={stats['removed']} batches={stats['batches']} in {stats['ms']} ms")
+
+
+@reminders_cli.command('run')
+@_options
+def run_command(days, batch_size):
+    """Create reminders for renewals due soon, once (e.g. from cron)."""
+    _run(days, batch_size)
+
+
+@reminders_cli.command('worker')
+@_options
+@click.option('--interval', type=int, help='Seconds between runs (default REMINDER_INTERVAL).')
+def worker_command(days, batch_size, interval):
+    """Create reminders every --interval seconds until interrupted."""
+    interval = interval or current_app.config['REMINDER_INTERVAL']
+    while True:
+        _run(days, batch_size)
+        time.sleep(interval)
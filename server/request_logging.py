@@ -0,0 +1,135 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('adhd_companion.requests')
+
+_listener = None
+
+RECORD_FIELDS = ('request_id', 'method', 'path', 'endpoint', 'status', 'rows',
+                 'db_queries', 'db_ms', 'serialize_ms', 'duration_ms')
+
+
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        fields = {'time': self.formatTime(record), 'level': record.levelname}
+        fields.update((name, getattr(record, name)) for name in RECORD_FIELDS if hasattr(record, name))
+        return json.dumps(fields)
+
+
+def timed_json_provider(provider_class):
+    """Subclass `provider_class` to record serialize time and row count on the current request."""
+
+    class TimedJSONProvider(provider_class):
+        def response(self, *args, **kwargs):
+            if not _tracking():
+                return super().response(*args, **kwargs)
+            start = time.perf_counter()
+            response = super().response(*args, **kwargs)
+            g.request_log['serialize_ms'] += (time.perf_counter() - start) * 1000
+            obj = args[0] if len(args) == 1 else (args or kwargs)
+            if isinstance(obj, list):
+                g.request_log['rows'] = len(obj)
+            elif isinstance(obj, dict) and isinstance(obj.get('items'), list):
+                g.request_log['rows'] = len(obj['items'])
+            return response
+
+    return TimedJSONProvider
+
+
+def _tracking():
+    return has_request_context() and 'request_log' in g
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _tracking():
+        conn.info.setdefault('request_log_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('request_log_query_start')
+    if starts and _tracking():
+        g.request_log['db_ms'] += (time.perf_counter() - starts.pop()) * 1000
+        g.request_log['db_queries'] += 1
+
+
+def _handle_error(context):
+    # the statement failed, so after_cursor_execute won't pop its start time
+    starts = context.connection.info.get('request_log_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    g.request_log = {
+        'request_id': request.headers.get('X-Request-ID') or uuid.uuid4().hex,
+        'start': time.perf_counter(),
+        'rows': None,
+        'db_queries': 0,
+        'db_ms': 0.0,
+        'serialize_ms': 0.0,
+    }
+
+
+def _finish_request(response):
+    if not _tracking():
+        return response
+    entry = g.pop('request_log')
+    response.headers['X-Request-ID'] = entry['request_id']
+    logger.info('request', extra={
+        'request_id': entry['request_id'],
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'rows': entry['rows'],
+        'db_queries': entry['db_queries'],
+        'db_ms': round(entry['db_ms'], 3),
+        'serialize_ms': round(entry['serialize_ms'], 3),
+        'duration_ms': round((time.perf_counter() - entry['start']) * 1000, 3),
+    })
+    return response
+
+
+def init_request_logging(app, level=None):
+    """Log one structured line per request through a background queue listener.
+
+    Logging is off unless the 'adhd_companion.requests' logger is enabled for
+    INFO, e.g. by setting REQUEST_LOG_LEVEL=INFO. Must be called after the
+    JSON provider is chosen and before any app.json settings are changed, as
+    it replaces app.json with a timed subclass of it.
+    """
+    global _listener
+    level = level or os.environ.get('REQUEST_LOG_LEVEL', 'WARNING')
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    # One listener per process, shared by every app instance
+    if _listener is None:
+        # The request thread only enqueues records; formatting and I/O happen on the listener thread
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(StructuredFormatter())
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    app.json = timed_json_provider(type(app.json))(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    return _listener
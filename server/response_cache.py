@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import current_app, make_response, request
+
+# bytes charged per entry on top of the key and body, for the tuple and dict slot
+ENTRY_OVERHEAD = 100
+# a single body may use at most this share of the cache, so one huge list can't flush everything else
+MAX_ENTRY_SHARE = 4
+
+
+class MemoryCache:
+    """In-process LRU of response bodies, bounded by their total size in bytes. Only shared within one worker."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (version, body)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, body):
+        size = len(key) + len(body) + ENTRY_OVERHEAD
+        if size > self.max_bytes // MAX_ENTRY_SHARE:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(key) + len(previous[1]) + ENTRY_OVERHEAD
+            self.entries[key] = (version, body)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted_key, (_, evicted_body) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted_key) + len(evicted_body) + ENTRY_OVERHEAD
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+
+class SqliteCache:
+    """Response bodies in their own SQLite file, shared by every worker on the host.
+
+    Bounded by total body size; past it the entries written longest ago go
+    first, since recording every hit would turn reads into writes. Hit,
+    miss and eviction counts are this process's own.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS response_cache '
+        '(key TEXT PRIMARY KEY, version INTEGER NOT NULL, body BLOB NOT NULL, stored REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS ix_response_cache_stored ON response_cache (stored)',
+        # running total, so a write doesn't have to sum the table to know whether to evict
+        'CREATE TABLE IF NOT EXISTS response_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO response_cache_size (id, bytes) VALUES (0, 0)',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_insert AFTER INSERT ON response_cache BEGIN '
+        'UPDATE response_cache_size SET bytes = bytes + length(new.key) + length(new.body); END',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_update AFTER UPDATE OF body ON response_cache BEGIN '
+        'UPDATE response_cache_size SET bytes = bytes + length(new.body) - length(old.body); END',
+        'CREATE TRIGGER IF NOT EXISTS response_cache_delete AFTER DELETE ON response_cache BEGIN '
+        'UPDATE response_cache_size SET bytes = bytes - length(old.key) - length(old.body); END',
+    )
+    EVICT_BATCH = 64
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key, version):
+        row = self._connection().execute(
+            'SELECT body FROM response_cache WHERE key = ? AND version = ?', (key, version)
+        ).fetchone()
+        self._count('hits' if row else 'misses')
+        return row[0] if row else None
+
+    def set(self, key, version, body):
+        if len(key) + len(body) > self.max_bytes // MAX_ENTRY_SHARE:
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT INTO response_cache (key, version, body, stored) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET version = excluded.version, body = excluded.body, stored = excluded.stored',
+                    (key, version, body, time.time()),
+                )
+                evicted = 0
+                while conn.execute('SELECT bytes FROM response_cache_size').fetchone()[0] > self.max_bytes:
+                    evicted += conn.execute(
+                        'DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache ORDER BY stored LIMIT ?)',
+                        (self.EVICT_BATCH,),
+                    ).rowcount
+        except sqlite3.OperationalError:
+            # another worker holds the write lock for longer than the timeout; serve uncached
+            return
+        if evicted:
+            self._count('evictions', evicted)
+
+    def stats(self):
+        conn = self._connection()
+        entries = conn.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+        size = conn.execute('SELECT bytes FROM response_cache_size').fetchone()[0]
+        return {'backend': 'sqlite', 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+def cache_key(user_id):
+    """(user, endpoint, query params) of the current request; parameter order doesn't matter."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f'{user_id}:{request.endpoint}:{query}'
+
+
+def cached_response(user_id, version, view, *args, **kwargs):
+    """The view's response, or its body from the cache if it was stored at the same collection version.
+
+    Every write to a collection bumps its version in the same transaction
+    (see etags.py), and the version is read in the same snapshot as the
+    view's query, so a body stored under a version is exactly what the view
+    would return for it: writes invalidate by making the old entry unreachable.
+    """
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return make_response(view(*args, **kwargs))
+    key = cache_key(user_id)
+    body = cache.get(key, version)
+    if body is not None:
+        return current_app.response_class(body, 200, mimetype='application/json')
+    response = make_response(view(*args, **kwargs))
+    if response.status_code == 200 and not response.is_streamed and response.mimetype == 'application/json':
+        cache.set(key, version, response.get_data())
+    return response
+
+
+def metrics_lines(cache):
+    stats = cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    metrics = (
+        ('response_cache_hits_total', 'counter', 'List responses served from the response cache.', stats['hits']),
+        ('response_cache_misses_total', 'counter', 'List responses the response cache had no current copy of.', stats['misses']),
+        ('response_cache_evictions_total', 'counter', 'Entries dropped to stay under RESPONSE_CACHE_MB.', stats['evictions']),
+        ('response_cache_hit_ratio', 'gauge', 'Hits over lookups since the worker started.', round(stats['hits'] / lookups, 4) if lookups else 0),
+        ('response_cache_entries', 'gauge', 'Cached responses.', stats['entries']),
+        ('response_cache_bytes', 'gauge', 'Size of the cached responses.', stats['bytes']),
+        ('response_cache_max_bytes', 'gauge', 'RESPONSE_CACHE_MB in bytes.', stats['max_bytes']),
+    )
+    lines = []
+    for name, kind, help_text, value in metrics:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name}{{backend="{stats["backend"]}"}} {value}']
+    return lines
+
+
+def init_response_cache(app):
+    """Cache the list endpoints' JSON per user in the RESPONSE_CACHE_BACKEND store ('memory', 'sqlite' or 'off').
+
+    Call after init_metrics, so the cache's counters are added to /metrics.
+    """
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    max_bytes = app.config.get('RESPONSE_CACHE_MB', 64) * 1024 * 1024
+    if backend == 'off':
+        return None
+    if backend == 'sqlite':
+        path = app.config.get('RESPONSE_CACHE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cache = SqliteCache(path, max_bytes)
+    elif backend == 'memory':
+        cache = MemoryCache(max_bytes)
+    else:
+        raise ValueError(f'Unknown RESPONSE_CACHE_BACKEND {backend!r}')
+
+    app.extensions['response_cache'] = cache
+    if 'metrics' in app.extensions:
+        app.extensions['metrics'].collectors.append(lambda: metrics_lines(cache))
+    return cache
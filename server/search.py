@@ -0,0 +1,201 @@
+import html
+import re
+from contextlib import contextmanager
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, event, text
+from sqlalchemy_serializer import SerializerMixin
+
+from models import db, Journal
+from shards import data_engines
+
+SEARCH_PAGE_SIZE = 20
+SNIPPET_TOKENS = 16
+
+# Each user's entries get a contiguous block of FTS rowids (user_id * USER_ROWID_SPAN
+# + journal id), so a search only walks that user's part of every doclist
+# instead of intersecting with a filter on journal_table afterwards. The
+# index keeps its own copy of the text; the triggers keep it in sync and
+# the same statements are in the migration that adds it.
+USER_ROWID_SPAN = 2 ** 32
+
+CREATE_INSERT_TRIGGER = (
+    "CREATE TRIGGER journal_fts_insert AFTER INSERT ON journal_table WHEN new.user_id IS NOT NULL BEGIN "
+    f"INSERT INTO journal_fts (rowid, journal_header, journal_text) VALUES (new.user_id * {USER_ROWID_SPAN} + new.id, new.journal_header, new.journal_text); "
+    "END"
+)
+CREATE_JOURNAL_FTS = (
+    "CREATE VIRTUAL TABLE journal_fts USING fts5(journal_header, journal_text, tokenize='porter unicode61', prefix='2 3')",
+    CREATE_INSERT_TRIGGER,
+    "CREATE TRIGGER journal_fts_delete AFTER DELETE ON journal_table BEGIN "
+    f"DELETE FROM journal_fts WHERE rowid = old.user_id * {USER_ROWID_SPAN} + old.id; "
+    "END",
+    "CREATE TRIGGER journal_fts_update AFTER UPDATE OF journal_header, journal_text, user_id ON journal_table BEGIN "
+    f"DELETE FROM journal_fts WHERE rowid = old.user_id * {USER_ROWID_SPAN} + old.id; "
+    f"INSERT INTO journal_fts (rowid, journal_header, journal_text) SELECT new.user_id * {USER_ROWID_SPAN} + new.id, new.journal_header, new.journal_text WHERE new.user_id IS NOT NULL; "
+    "END",
+)
+DROP_JOURNAL_FTS = 'DROP TABLE IF EXISTS journal_fts'
+
+# Bulk loads index their rows in one statement instead (see deferred_journal_index)
+INDEX_USERS_JOURNALS = text(f"""
+    INSERT INTO journal_fts (rowid, journal_header, journal_text)
+    SELECT user_id * {USER_ROWID_SPAN} + id, journal_header, journal_text FROM journal_table
+    WHERE user_id BETWEEN :first_user_id AND :last_user_id
+""")
+
+# Journals a bulk load left out of the index, e.g. because it was killed before indexing them
+INDEX_MISSING_JOURNALS = text(f"""
+    INSERT INTO journal_fts (rowid, journal_header, journal_text)
+    SELECT user_id * {USER_ROWID_SPAN} + id, journal_header, journal_text FROM journal_table
+    WHERE user_id IS NOT NULL AND user_id * {USER_ROWID_SPAN} + id NOT IN (SELECT rowid FROM journal_fts)
+""")
+HAS_INSERT_TRIGGER = text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'journal_fts_insert'")
+
+# journal_fts and the shadow tables FTS5 creates for it
+FTS_TABLE_PATTERN = re.compile(r'^journal_fts(_data|_idx|_content|_docsize|_config)?$')
+
+# Snippets are marked with control characters and only turned into <mark>
+# tags after the journal text has been HTML-escaped
+MARK_OPEN, MARK_CLOSE = '\x02', '\x03'
+
+# Ranking first and highlighting only the page keeps snippet() from running
+# on every match of a common word
+RANK_QUERY = text("""
+    SELECT rowid FROM journal_fts
+    WHERE journal_fts MATCH :query AND rowid BETWEEN :first_rowid AND :last_rowid
+    ORDER BY bm25(journal_fts, 5.0, 1.0), rowid
+    LIMIT :limit OFFSET :offset
+""")
+
+HIGHLIGHT_QUERY = text(f"""
+    SELECT journal_fts.rowid, journal_table.id, journal_table.created_at,
+           highlight(journal_fts, 0, :open, :close) AS header,
+           snippet(journal_fts, 1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet
+    FROM journal_fts JOIN journal_table ON journal_table.id = journal_fts.rowid - :first_rowid
+    WHERE journal_fts MATCH :query AND journal_fts.rowid IN :rowids
+""").bindparams(bindparam('rowids', expanding=True)).columns(
+    rowid=db.Integer, id=db.Integer, created_at=db.DateTime, header=db.String, snippet=db.String,
+)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep Alembic autogenerate from trying to drop the FTS tables, which aren't in the models."""
+    return not (type_ == 'table' and FTS_TABLE_PATTERN.match(name))
+
+
+def match_expression(q):
+    """Turn free text into an FTS5 query in which every word must match.
+
+    Words are quoted so FTS5 operators and punctuation in the input are
+    searched for literally instead of raising syntax errors. A trailing *
+    on a word keeps its prefix match; it is opt-in because prefixes longer
+    than the indexed 2 and 3 characters have to scan the term list.
+    """
+    words = re.findall(r'(\w+)(\*?)', q)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"{star}' for word, star in words)
+
+
+def _marked_html(value):
+    if value is None:
+        return None
+    return html.escape(value).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>')
+
+
+def _search_result(row):
+    return {
+        'id': row.id,
+        'created_at': row.created_at.strftime(SerializerMixin.datetime_format) if row.created_at else None,
+        'journal_header': _marked_html(row.header),
+        'snippet': _marked_html(row.snippet),
+    }
+
+
+def search_journals(user_id, q, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Best matches first, with the header and a text snippet as HTML with <mark>ed terms.
+
+    Ranks one extra row to tell whether there is a next page; returns
+    (items, has_more).
+    """
+    query = match_expression(q)
+    if query is None:
+        return [], False
+    params = {'query': query, 'first_rowid': user_id * USER_ROWID_SPAN, 'last_rowid': (user_id + 1) * USER_ROWID_SPAN - 1}
+    rowids = db.session.scalars(RANK_QUERY, dict(params, limit=limit + 1, offset=offset)).all()
+    page = rowids[:limit]
+    if not page:
+        return [], False
+    rows = {row.rowid: row for row in db.session.execute(
+        HIGHLIGHT_QUERY, dict(params, rowids=page, open=MARK_OPEN, close=MARK_CLOSE),
+    )}
+    return [_search_result(rows[rowid]) for rowid in page], len(rowids) > limit
+
+
+@contextmanager
+def deferred_journal_index(engine):
+    """Turn off the FTS insert trigger for a bulk load, which then calls index_user_journals() itself.
+
+    Indexing many rows with one INSERT ... SELECT is several times faster than
+    a trigger per row. Journals written by anyone else meanwhile are not
+    indexed, so only use this when nothing else is writing to the database.
+    If the process is killed before the trigger is back, `flask search
+    repair` restores it and indexes what was missed.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql('DROP TRIGGER IF EXISTS journal_fts_insert')
+    try:
+        yield
+    finally:
+        with engine.begin() as connection:
+            connection.exec_driver_sql(CREATE_INSERT_TRIGGER)
+
+
+def index_user_journals(connection, first_user_id, last_user_id):
+    """Add the journals of a range of users, written while the index was deferred, to journal_fts."""
+    connection.execute(INDEX_USERS_JOURNALS, {'first_user_id': first_user_id, 'last_user_id': last_user_id})
+
+
+def repair_journal_index(connection):
+    """Re-create the FTS insert trigger if it is missing and index every journal not in journal_fts.
+
+    Returns (whether the trigger was re-created, journals indexed).
+    """
+    restored = connection.execute(HAS_INSERT_TRIGGER).first() is None
+    if restored:
+        connection.exec_driver_sql(CREATE_INSERT_TRIGGER)
+    return restored, connection.execute(INDEX_MISSING_JOURNALS).rowcount
+
+
+def init_search(app):
+    """Create and drop the journal FTS index and triggers alongside journal_table (SQLite only), and register `flask search`."""
+    table = Journal.__table__
+    if not event.contains(table, 'after_create', _create_fts):
+        event.listen(table, 'after_create', _create_fts)
+        event.listen(table, 'after_drop', _drop_fts)
+    app.cli.add_command(search_cli)
+
+
+search_cli = AppGroup('search', help='Maintain the journal search index.')
+
+
+@search_cli.command('repair')
+def repair_command():
+    """Restore the index trigger and index any journals missing from journal_fts, e.g. after an interrupted seed."""
+    for engine in data_engines():
+        with engine.begin() as connection:
+            restored, indexed = repair_journal_index(connection)
+        click.echo(f"{engine.url.database}: {'re-created the insert trigger, ' if restored else ''}indexed {indexed} journals")
+
+
+def _create_fts(table, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in CREATE_JOURNAL_FTS:
+            connection.exec_driver_sql(statement)
+
+
+def _drop_fts(table, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(DROP_JOURNAL_FTS)
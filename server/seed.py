@@ -1,47 +1,239 @@
-#!/usr/bin/env python3
-
-from app import app
-from models import db, User, Mood, Journal
+"""Seed data: `seed_history` for one user, and `flask seed` for whole synthetic databases."""
+import multiprocessing
+import random
+import time
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from random import randint
-from faker import Faker
-from datetime import date, timedelta
 
-faker = Faker()
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+
+from daily_summary import rebuild
+from models import db, User, Mood, Journal, Todos, Medications
+from search import deferred_journal_index, index_user_journals
+from shards import data_engines, engine_for, shard_for
+
+
+@lru_cache(maxsize=None)
+def get_faker():
+    # Faker is slow to import, so only pay for it when actually seeding
+    from faker import Faker
+    return Faker()
+
+
+def seed_history(user_id, start_date, end_date):
+    """Give a user one mood, journal and todo per day (and a monthly medication renewal) between two dates."""
+    faker = get_faker()
+    rows = []
+    current_date = start_date
+    while current_date <= end_date:
+        created_at = datetime.combine(current_date, datetime.min.time())
+        rows.append(Mood(mood_rating=randint(1, 5), user_id=user_id, created_at=created_at))
+        rows.append(Journal(journal_header=faker.sentence(nb_words=4), journal_text=faker.paragraph(), user_id=user_id, created_at=created_at))
+        rows.append(Todos(task_text=faker.sentence(nb_words=5), completed=bool(randint(0, 1)), user_id=user_id, created_at=created_at))
+        if current_date.day == 1:
+            rows.append(Medications(drug_name=faker.word(), dosage=randint(5, 50), prescriber=faker.name(), renew_date=created_at, user_id=user_id))
+        current_date += timedelta(days=1)
+    db.session.add_all(rows)
+    db.session.commit()
+    return len(rows)
+
+
+TEXT_POOL_SIZE = 2000  # Faker strings generated per process, then sampled
+
+
+class TextPool:
+    """Faker output generated once from `seed` and then drawn from with a per-user RNG.
+
+    Calling Faker for every row would dominate the run time; sampling from
+    a few thousand pre-made strings keeps the text realistic and the output
+    deterministic for a given seed.
+    """
+
+    def __init__(self, seed):
+        faker = get_faker()
+        faker.seed_instance(seed)
+        self.headers = [faker.sentence(nb_words=4) for _ in range(TEXT_POOL_SIZE)]
+        self.paragraphs = [faker.paragraph(nb_sentences=5) for _ in range(TEXT_POOL_SIZE)]
+        self.tasks = [faker.sentence(nb_words=5) for _ in range(TEXT_POOL_SIZE)]
+        self.first_names = [faker.first_name() for _ in range(TEXT_POOL_SIZE)]
+        self.last_names = [faker.last_name() for _ in range(TEXT_POOL_SIZE)]
+        self.user_names = [faker.user_name() for _ in range(TEXT_POOL_SIZE)]
+        self.drugs = [faker.word().capitalize() for _ in range(TEXT_POOL_SIZE)]
+        self.prescribers = [f'Dr {faker.last_name()}' for _ in range(TEXT_POOL_SIZE)]
+
+
+def _per_day(rng, rate):
+    # whole part every day, plus one more with the fractional probability
+    return int(rate) + (rng.random() < rate % 1)
+
+
+def generate_user(user_id, options, pool):
+    """(model, row) pairs for one user's account and history, the same for a given seed and user id."""
+    rng = random.Random(options['seed'] * 1_000_003 + user_id)
+    end = options['end_date']
+    start = end - timedelta(days=365 * options['years'])
+    yield User, {
+        'id': user_id,
+        'username': f'{rng.choice(pool.user_names)}{user_id}',
+        'first_name': rng.choice(pool.first_names),
+        'last_name': rng.choice(pool.last_names),
+        '_hashed_password': options['password_hash'],
+        'created_at': datetime.combine(start, datetime.min.time()),
+    }
+    mood = rng.randint(2, 4)
+    for offset in range((end - start).days + 1):
+        day = datetime.combine(start + timedelta(days=offset), datetime.min.time())
+        if rng.random() < 0.9:
+            # a random walk, so ratings drift the way real moods do
+            mood = min(5, max(1, mood + rng.choice((-1, 0, 0, 1))))
+            yield Mood, {'user_id': user_id, 'mood_rating': mood, 'created_at': day}
+        for _ in range(_per_day(rng, options['journals_per_day'])):
+            yield Journal, {'user_id': user_id, 'journal_header': rng.choice(pool.headers),
+                            'journal_text': rng.choice(pool.paragraphs),
+                            'created_at': day + timedelta(seconds=rng.randrange(86400))}
+        for _ in range(_per_day(rng, options['todos_per_day'])):
+            yield Todos, {'user_id': user_id, 'task_text': rng.choice(pool.tasks), 'completed': rng.random() < 0.7,
+                          'created_at': day + timedelta(seconds=rng.randrange(86400))}
+    for _ in range(options['medications']):
+        renew = datetime.combine(end + timedelta(days=rng.randint(-30, 90)), datetime.min.time())
+        yield Medications, {'user_id': user_id, 'drug_name': rng.choice(pool.drugs), 'dosage': rng.choice((5, 10, 20, 25, 50)),
+                            'prescriber': rng.choice(pool.prescribers), 'renew_date': renew}
+
+
+def _flush(directory, engine, pending):
+    # users first, so every other row's user exists when it is written
+    if pending[User]:
+        with directory.begin() as connection:
+            connection.execute(insert(User), pending[User])
+            pending[User].clear()
+    with engine.begin() as connection:
+        for model in (Mood, Journal, Todos, Medications):
+            if pending[model]:
+                connection.execute(insert(model), pending[model])
+                pending[model].clear()
+
+
+def seed_users(directory, engine, user_ids, options, pool):
+    """Insert generated users in Core executemany chunks of options['chunk_size'] rows; returns the row count.
+
+    Accounts go to `directory` and everything else to `engine`, which are
+    different databases when sharding. Each chunk is its own transaction so
+    parallel workers take turns at the SQLite write lock. Must run inside
+    deferred_journal_index(); the users' journals are indexed and their
+    daily_summary rows rebuilt at the end.
+    """
+    pending = {model: [] for model in (User, Mood, Journal, Todos, Medications)}
+    rows = buffered = 0
+    for user_id in user_ids:
+        for model, row in generate_user(user_id, options, pool):
+            pending[model].append(row)
+            buffered += 1
+            if buffered >= options['chunk_size']:
+                _flush(directory, engine, pending)
+                rows, buffered = rows + buffered, 0
+    _flush(directory, engine, pending)
+    with engine.begin() as connection:
+        index_user_journals(connection, user_ids[0], user_ids[-1])
+    for user_id in user_ids:
+        with engine.begin() as connection:
+            rebuild(connection, user_id)
+    return rows + buffered
+
+
+_worker = {}
+
+
+def _start_worker(config, options):
+    from app import create_app
+
+    app = create_app(config)
+    app.app_context().push()
+    # BEGIN IMMEDIATE, so workers wait on busy_timeout for each other's writes instead of failing
+    g.write_transaction = True
+    _worker.update(options=options, pool=TextPool(options['seed']))
+
+
+def _seed_in_worker(user_ids):
+    return len(user_ids), seed_users(db.engine, engine_for(user_ids[0]), user_ids, _worker['options'], _worker['pool'])
 
-if __name__ == '__main__':
-    with app.app_context():
-        print("Seeding database...")
-        User.query.delete()
-        Mood.query.delete()
-        Journal.query.delete()
 
-        print("Creating User")
-        will = User(first_name="Will", last_name="Metzler", username="willmetzler", _hashed_password='123')
-        db.session.add(will)
+def _batches(first_id, users, batch_users, shard_count):
+    # each batch stays on one shard; taking them round-robin spreads parallel workers over the shards
+    ids = range(first_id, first_id + users)
+    if not shard_count:
+        return [ids[start:start + batch_users] for start in range(0, users, batch_users)]
+    by_shard = [[user_id for user_id in ids if shard_for(user_id, shard_count) == shard] for shard in range(shard_count)]
+    per_shard = [[group[start:start + batch_users] for start in range(0, len(group), batch_users)] for group in by_shard]
+    return [batches[n] for n in range(max(map(len, per_shard))) for batches in per_shard if n < len(batches)]
 
-        print("Creating Mood Ratings")
-        
-        def generate_random_mood_rating():
-            return randint(1, 5)
 
-        # Function to populate mood ratings for a given month and user ID
-        def populate_mood_ratings_for_month(start_date, end_date, user_id):
-            current_date = start_date
-            while current_date <= end_date:
-                mood_rating = generate_random_mood_rating()
-                new_mood = Mood(mood_rating=mood_rating, user_id=user_id, created_at=current_date)
-                db.session.add(new_mood)
-                current_date += timedelta(days=1)
+@click.command('seed')
+@click.option('--users', default=100, show_default=True, help='Users to create.')
+@click.option('--years', default=1, show_default=True, help='Years of history per user, up to --end-date.')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day of history, YYYY-MM-DD.  [default: today]')
+@click.option('--journals-per-day', default=1.0, show_default=True, help='Average journal entries per user per day.')
+@click.option('--todos-per-day', default=2.0, show_default=True, help='Average todos per user per day.')
+@click.option('--medications', default=2, show_default=True, help='Medications per user.')
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--workers', default=1, show_default=True, help='Processes generating and inserting user ranges in parallel.')
+@click.option('--batch-users', default=50, show_default=True, help='Users per unit of work (and progress line).')
+@click.option('--chunk-size', default=10_000, show_default=True, help='Rows per INSERT transaction.')
+@click.option('--password', default='password', show_default=True, help='Password every generated user can log in with.')
+@with_appcontext
+def seed_command(users, years, end_date, journals_per_day, todos_per_day, medications, seed, workers, batch_users, chunk_size, password):
+    """Fill the database with synthetic users and their history for load testing.
 
-        # Populate mood ratings for May
-        populate_mood_ratings_for_month(date(2024, 5, 1), date(2024, 5, 31), user_id=1)
+    New users get ids after the highest existing one, so running it again
+    adds to the database. Journal search indexing is paused while it runs,
+    so don't point it at a database the API is serving. If a run is
+    interrupted, `flask search repair` turns indexing back on and indexes
+    the journals it left out.
+    """
+    from extensions import password_hasher
 
-        # Populate mood ratings for June (up until today)
-        today = date.today()
-        populate_mood_ratings_for_month(date(2024, 6, 1), today, user_id=1)
+    first_id = (db.session.scalar(db.select(db.func.max(User.id))) or 0) + 1
+    db.session.rollback()
+    end_date = end_date.date() if end_date else date.today()
+    options = {
+        'years': years, 'end_date': end_date, 'journals_per_day': journals_per_day, 'todos_per_day': todos_per_day,
+        'medications': medications, 'seed': seed, 'chunk_size': chunk_size,
+        # one bcrypt hash shared by every user: hashing per user would take longer than the rest of the run
+        'password_hash': password_hasher.hash(password),
+    }
+    config = current_app.config
+    batches = _batches(first_id, users, batch_users, config['SHARD_COUNT'])
+    click.echo(f'Seeding users {first_id}-{first_id + users - 1} with {years} years of history to {end_date} using {workers} worker(s)')
 
-        # Commit changes to the database
-        db.session.commit()
+    started = time.perf_counter()
+    done = rows = 0
+    pool = None
+    with ExitStack() as stack:
+        for engine in data_engines():
+            stack.enter_context(deferred_journal_index(engine))
+        if workers > 1:
+            worker_config = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SHARD_COUNT', 'SHARD_DATABASE_URI')}
+            pool = multiprocessing.get_context('spawn').Pool(workers, _start_worker, (worker_config, options))
+            results = pool.imap_unordered(_seed_in_worker, batches)
+        else:
+            text_pool = TextPool(seed)
+            results = ((len(batch), seed_users(db.engine, engine_for(batch[0]), batch, options, text_pool)) for batch in batches)
+        try:
+            for batch_users_done, batch_rows in results:
+                done += batch_users_done
+                rows += batch_rows
+                elapsed = time.perf_counter() - started
+                click.echo(f'{done:>9,}/{users:,} users  {rows:>12,} rows  {elapsed:>7.1f} s  {rows / elapsed:>9,.0f} rows/s')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    click.echo(f'Seeded {users:,} users and {rows:,} rows in {time.perf_counter() - started:.1f} s')
 
 
-        print("Seeding complete!")
+def init_seed(app):
+    app.cli.add_command(seed_command)
@@ -0,0 +1,87 @@
+import logging
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy_serializer import SerializerMixin
+
+from models import User, Journal, Medications, Mood, Todos, DailySummary
+
+try:
+    import orjson
+except ImportError:  # optional, only needed for FAST_JSON
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class RowSerializer:
+    """Column-only serializer for one model, compiled once at import time.
+
+    Selects just the listed columns (no ORM instances, no relationship
+    loading) and turns each row into a dict with the same field names and
+    date formats as SerializerMixin.to_dict().
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self.columns = tuple(getattr(model, field) for field in self.fields)
+        self._converters = tuple(
+            (index, self._converter_for(column.type.python_type))
+            for index, column in enumerate(self.columns)
+            if issubclass(column.type.python_type, date)
+        )
+
+    @staticmethod
+    def _converter_for(python_type):
+        fmt = SerializerMixin.datetime_format if issubclass(python_type, datetime) else SerializerMixin.date_format
+
+        def convert(value):
+            return value.strftime(fmt) if value is not None else None
+        return convert
+
+    def select(self, query):
+        return query.with_entities(*self.columns)
+
+    def row(self, row):
+        if not self._converters:
+            return dict(zip(self.fields, row))
+        values = list(row)
+        for index, convert in self._converters:
+            values[index] = convert(values[index])
+        return dict(zip(self.fields, values))
+
+    def rows(self, rows):
+        return [self.row(row) for row in rows]
+
+    def instance(self, obj):
+        return self.row([getattr(obj, field) for field in self.fields])
+
+
+user_serializer = RowSerializer(User, ('id', 'username', 'first_name', 'last_name', 'created_at'))
+journal_serializer = RowSerializer(Journal, ('id', 'journal_header', 'journal_text', 'created_at', 'user_id'))
+medication_serializer = RowSerializer(Medications, ('id', 'drug_name', 'dosage', 'prescriber', 'renew_date', 'user_id'))
+todo_serializer = RowSerializer(Todos, ('id', 'task_text', 'completed', 'created_at', 'user_id'))
+mood_serializer = RowSerializer(Mood, ('id', 'mood_rating', 'created_at', 'user_id'))
+daily_summary_serializer = RowSerializer(DailySummary, ('day', 'mood_rating', 'journal_count', 'todos_total', 'todos_completed', 'medications_due'))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, producing the same output as the default provider."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+
+def init_json_provider(app, fast_json=False):
+    if not fast_json:
+        return
+    if orjson is None:
+        logger.warning('FAST_JSON is set but orjson is not installed; using the default JSON provider')
+        return
+    app.json = OrjsonProvider(app)
@@ -0,0 +1,284 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy import event
+from werkzeug.datastructures import CallbackDict
+
+from models import User
+
+PURGE_MIN_ENTRIES = 1024  # an unbounded MemoryStore first sweeps out expired entries at this size
+
+
+class MemoryStore:
+    """Thread-safe in-process store with a per-entry TTL. Only shared within one worker.
+
+    With a maxsize it is an LRU, for caches. Without one, entries only go
+    once they expire, for data that must not be dropped early such as sessions.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.next_purge = PURGE_MIN_ENTRIES
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            if self.maxsize is not None:
+                self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            if self.maxsize is None:
+                # entries nobody reads again never hit the check in get(), so sweep them out every time the store doubles
+                if len(self.entries) >= self.next_purge:
+                    self._purge_expired()
+                    self.next_purge = max(PURGE_MIN_ENTRIES, 2 * len(self.entries))
+                return
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (_, expires) in self.entries.items() if expires < now]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
+
+    def purge_expired(self):
+        with self.lock:
+            return self._purge_expired()
+
+    def stats(self):
+        return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries)}
+
+
+class SqliteStore:
+    """Key/value store in a table of its own SQLite file, shared by every worker on the host.
+
+    With a maxsize, the entries due to expire first are dropped past it;
+    without one, entries only go once they expire.
+    """
+
+    def __init__(self, path, table='session_store', maxsize=None):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.local = threading.local()
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_expires ON {table} (expires)')
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key):
+        row = self._connection().execute(
+            f'SELECT value FROM {self.table} WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        self._count('hits' if row else 'misses')
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        with self._connection() as conn:
+            conn.execute(f'INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)',
+                         (key, json.dumps(value), time.time() + ttl))
+            if self.maxsize is None:
+                return
+            evicted = conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY expires DESC LIMIT -1 OFFSET ?)', (self.maxsize,)
+            ).rowcount
+        if evicted:
+            self._count('evictions', evicted)
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def purge_expired(self):
+        with self._connection() as conn:
+            return conn.execute(f'DELETE FROM {self.table} WHERE expires <= ?', (time.time(),)).rowcount
+
+    def stats(self):
+        size = self._connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        return {'backend': 'sqlite', 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': size}
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the session to a fresh id, e.g. on login, so an id planted in the browser beforehand is worthless."""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a store; the cookie only carries a random session id."""
+
+    def __init__(self, store, ttl):
+        self.store = store
+        self.ttl = ttl
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(f'session:{sid}')
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.previous_sid is not None:
+            self.store.delete(f'session:{session.previous_sid}')
+        if not session:
+            if session.modified:
+                self.store.delete(f'session:{session.sid}')
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.modified:
+            self.store.set(f'session:{session.sid}', dict(session), self.ttl)
+        if session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def get_store():
+    return current_app.extensions['session_store']
+
+
+def get_profile_cache():
+    return current_app.extensions['profile_cache']
+
+
+def cache_profile(user_id, profile):
+    get_profile_cache().set(f'profile:{user_id}', profile, current_app.config.get('PROFILE_CACHE_TTL', 3600))
+
+
+def cached_profile(user_id):
+    return get_profile_cache().get(f'profile:{user_id}')
+
+
+def invalidate_profile(user_id):
+    get_profile_cache().delete(f'profile:{user_id}')
+
+
+def _invalidate_user(mapper, connection, user):
+    if has_app_context() and 'profile_cache' in current_app.extensions:
+        invalidate_profile(user.id)
+
+
+def cache_store(app, table, maxsize):
+    """A store of the SESSION_BACKEND kind for cached data, limited to `maxsize` entries; `table` names it in the sqlite file."""
+    backend = app.config.get('SESSION_BACKEND', 'memory')
+    if backend == 'sqlite':
+        path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SqliteStore(path, table=table, maxsize=maxsize)
+    if backend == 'memory':
+        return MemoryStore(maxsize)
+    raise ValueError(f'Unknown SESSION_BACKEND {backend!r}')
+
+
+def metrics_lines(stores):
+    """Exposition lines for GET /metrics from {label: store}, e.g. the session store and the profile cache."""
+    stats = {name: store.stats() for name, store in stores.items()}
+    metrics = (
+        ('store_hits_total', 'counter', 'Lookups that found a live entry.', 'hits'),
+        ('store_misses_total', 'counter', 'Lookups that found no entry, or an expired one.', 'misses'),
+        ('store_evictions_total', 'counter', 'Entries dropped to stay under the size limit.', 'evictions'),
+        ('store_entries', 'gauge', 'Entries held, expired ones not yet swept out included.', 'size'),
+    )
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        lines += [f'{metric}{{store="{name}",backend="{values["backend"]}"}} {values[field]}' for name, values in stats.items()]
+    return lines
+
+
+def init_sessions(app):
+    """Install the server-side session interface using the SESSION_BACKEND store ('memory' or 'sqlite').
+
+    Sessions only leave the store when they expire. Cached profiles are kept
+    in a second store of the same backend, limited to PROFILE_CACHE_SIZE
+    entries, so filling the cache can never log anyone out. Call after
+    init_metrics, so both stores' counters are added to /metrics.
+    """
+    backend = app.config.get('SESSION_BACKEND', 'memory')
+    if backend == 'sqlite':
+        path = app.config.get('SESSION_SQLITE_PATH') or os.path.join(app.instance_path, 'sessions.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        store = SqliteStore(path)
+    elif backend == 'memory':
+        store = MemoryStore()
+    else:
+        raise ValueError(f'Unknown SESSION_BACKEND {backend!r}')
+    profile_cache = cache_store(app, 'profile_cache', app.config.get('PROFILE_CACHE_SIZE', 10000))
+
+    app.extensions['session_store'] = store
+    app.extensions['profile_cache'] = profile_cache
+    if 'metrics' in app.extensions:
+        stores = {'session': store, 'profile': profile_cache}
+        app.extensions['metrics'].collectors.append(lambda: metrics_lines(stores))
+    app.session_interface = ServerSideSessionInterface(store, int(app.permanent_session_lifetime.total_seconds()))
+    if not event.contains(User, 'after_update', _invalidate_user):
+        event.listen(User, 'after_update', _invalidate_user)
+        event.listen(User, 'after_delete', _invalidate_user)
+    return store
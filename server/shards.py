@@ -0,0 +1,268 @@
+"""Optional sharding of per-user data across several SQLite files.
+
+With SHARD_COUNT set, users_table stays in the main database (the
+directory every login and signup goes through) and each user's rows in
+every other table live in one of SHARD_COUNT shard databases, picked by
+a stable hash of the user id. Each file has its own write lock, so
+writes by users on different shards no longer wait for each other.
+
+Every database gets the full schema from the same migrations; tables a
+database doesn't serve simply stay empty.
+"""
+import os
+from contextlib import ExitStack
+
+import click
+from flask import current_app, g, has_app_context, session
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Table, create_engine, delete, insert, inspect, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# tables kept in the main database whatever the shard count
+GLOBAL_TABLES = {'users_table'}
+# sync bookkeeping refers to row ids, which change when a user moves, so
+# it is dropped instead of copied and the user's clients start over
+DROPPED_ON_MOVE = {'change_log', 'sync_clients', 'sync_state'}
+MOVE_CHUNK_ROWS = 1000
+
+
+class ShardNotSelected(RuntimeError):
+    """A per-user table was queried with sharding on but no user to route to."""
+
+
+def shard_for(user_id, count):
+    """Shard index of a user: jump consistent hash, so going from n to n + 1 shards moves only 1/(n + 1) of the users."""
+    key, shard, next_shard = user_id, -1, 0
+    while next_shard < count:
+        shard = next_shard
+        key = (key * 2862933555777941757 + 1) % 2 ** 64
+        next_shard = int((shard + 1) * (2 ** 31 / ((key >> 33) + 1)))
+    return shard
+
+
+def bind_key(shard):
+    return f'shard-{shard}'
+
+
+def shard_uri(config, shard):
+    """SHARD_DATABASE_URI with {shard} filled in, or the main database's file name with -shard-N added."""
+    template = config.get('SHARD_DATABASE_URI')
+    if template:
+        return template.format(shard=shard)
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.database in (None, '', ':memory:'):
+        return url.render_as_string(hide_password=False)
+    root, ext = os.path.splitext(url.database)
+    return url.set(database=f'{root}-shard-{shard}{ext}').render_as_string(hide_password=False)
+
+
+class ShardedSession(Session):
+    """Routes per-user tables to the shard chosen with select_shard(); users_table to the main database.
+
+    Statements that name no table (text() queries, session.connection() in
+    the flush hooks) go to the selected shard as well, since everything
+    the app runs that way reads or writes one user's data.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None or not has_app_context() or not current_app.config.get('SHARD_COUNT'):
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        table = _table(mapper, clause)
+        if table is not None and table.name in GLOBAL_TABLES:
+            return engines[None]
+        shard = g.get('shard')
+        if shard is None:
+            if table is not None:
+                raise ShardNotSelected(f'No shard selected for {table.name}')
+            return engines[None]
+        return engines[bind_key(shard)]
+
+
+def _table(mapper, clause):
+    if mapper is not None:
+        return inspect(mapper).local_table
+    if isinstance(clause, UpdateBase):
+        clause = clause.table
+    return clause if isinstance(clause, Table) else None
+
+
+def select_shard(user_id):
+    """Route this app context's per-user queries to the user's shard. Does nothing unless sharding is on."""
+    count = current_app.config.get('SHARD_COUNT')
+    if count:
+        g.shard = shard_for(user_id, count) if user_id is not None else None
+
+
+def data_engines():
+    """The engines holding per-user rows: every shard, or just the main database without sharding."""
+    db = current_app.extensions['sqlalchemy']
+    count = current_app.config.get('SHARD_COUNT')
+    if not count:
+        return [db.engine]
+    return [db.engines[bind_key(shard)] for shard in range(count)]
+
+
+def engine_for(user_id):
+    """The engine holding one user's rows."""
+    db = current_app.extensions['sqlalchemy']
+    count = current_app.config.get('SHARD_COUNT')
+    return db.engines[bind_key(shard_for(user_id, count))] if count else db.engine
+
+
+def sharded_tables(metadata):
+    """Per-user tables in foreign key order, parents first."""
+    return [table for table in metadata.sorted_tables if table.name not in GLOBAL_TABLES]
+
+
+def _copy_rows(source, target, table, user_id, id_maps):
+    rows = [dict(row) for row in source.execute(select(table).where(table.c.user_id == user_id)).mappings()]
+    for column in table.columns:
+        # point references to other moved rows at their new ids
+        for key in column.foreign_keys:
+            moved = id_maps.get(key.column.table.name)
+            if moved is not None:
+                for row in rows:
+                    if row[column.name] is not None:
+                        row[column.name] = moved.get(row[column.name], row[column.name])
+    if table.name == 'collection_versions':
+        # a new version, so no ETag issued by the old shard can match
+        for row in rows:
+            row['version'] += 1
+
+    primary_key = list(table.primary_key.columns)
+    surrogate = len(primary_key) == 1 and primary_key[0].autoincrement in (True, 'auto') and not primary_key[0].foreign_keys
+    if not surrogate:
+        if rows:
+            target.execute(insert(table), rows)
+        return len(rows)
+    # the target shard numbers rows itself; ids from another shard may already be taken
+    column = primary_key[0]
+    id_map = id_maps[table.name] = {}
+    for start in range(0, len(rows), MOVE_CHUNK_ROWS):
+        chunk = rows[start:start + MOVE_CHUNK_ROWS]
+        new_ids = target.execute(
+            insert(table).returning(column, sort_by_parameter_order=True),
+            [{key: value for key, value in row.items() if key != column.name} for row in chunk],
+        ).scalars().all()
+        id_map.update(zip((row[column.name] for row in chunk), new_ids))
+    return len(rows)
+
+
+def move_user(source, target, user_id, tables):
+    """Copy one user's rows from source to target and delete them from source; returns the rows moved.
+
+    The target commits first, so an interrupted move leaves the rows in
+    both databases; running it again replaces the target's copy.
+    """
+    moved = 0
+    with source.begin() as source_connection, target.begin() as target_connection:
+        id_maps = {}
+        for table in reversed(tables):
+            target_connection.execute(delete(table).where(table.c.user_id == user_id))
+        for table in tables:
+            if table.name not in DROPPED_ON_MOVE:
+                moved += _copy_rows(source_connection, target_connection, table, user_id, id_maps)
+        for table in reversed(tables):
+            source_connection.execute(delete(table).where(table.c.user_id == user_id))
+    return moved
+
+
+def _users_with_rows(engine, tables):
+    with engine.connect() as connection:
+        return sorted(set().union(*(
+            connection.execute(select(table.c.user_id).where(table.c.user_id.is_not(None)).distinct()).scalars()
+            for table in tables
+        )))
+
+
+def _shard_engine(config, shard):
+    # resolved against the instance folder like the binds Flask-SQLAlchemy creates
+    url = make_url(shard_uri(config, shard))
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(current_app.instance_path, url.database))
+    return create_engine(url)
+
+
+def rebalance(previous_count=None, echo=click.echo):
+    """Move every user's rows to the database SHARD_COUNT assigns them, from the main database and all shards.
+
+    Shards beyond the current count (after lowering SHARD_COUNT) are only
+    read if `previous_count` says they exist. Returns (users, rows) moved.
+    """
+    db = current_app.extensions['sqlalchemy']
+    config = current_app.config
+    count = config.get('SHARD_COUNT') or 0
+    tables = sharded_tables(db.metadata)
+    users = rows = 0
+    with ExitStack() as stack:
+        sources = [db.engine] + [db.engines[bind_key(shard)] for shard in range(count)]
+        for shard in range(count, previous_count or 0):
+            engine = _shard_engine(config, shard)
+            stack.callback(engine.dispose)
+            sources.append(engine)
+        for source in sources:
+            source_users = source_rows = 0
+            for user_id in _users_with_rows(source, tables):
+                target = engine_for(user_id)
+                if target.url != source.url:
+                    source_rows += move_user(source, target, user_id, tables)
+                    source_users += 1
+            echo(f'{source.url.database}: moved {source_users} users ({source_rows} rows)')
+            users, rows = users + source_users, rows + source_rows
+    return users, rows
+
+
+def init_shards(app):
+    """Add a bind per shard when SHARD_COUNT is set, route each request to its user's shard and register `flask shards`.
+
+    Call before db.init_app(), which creates the engines from SQLALCHEMY_BINDS.
+    """
+    count = app.config.get('SHARD_COUNT')
+    if count:
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}),
+            **{bind_key(shard): shard_uri(app.config, shard) for shard in range(count)},
+        }
+        app.before_request(_select_request_shard)
+    app.cli.add_command(shards_cli)
+
+
+def _select_request_shard():
+    select_shard(session.get('user_id'))
+
+
+shards_cli = AppGroup('shards', help='Manage the SHARD_COUNT shard databases.')
+
+
+@shards_cli.command('upgrade')
+def upgrade_command():
+    """Run `db upgrade` on the main database and then on every shard."""
+    from flask_migrate import upgrade
+
+    upgrade()
+    for shard in range(current_app.config.get('SHARD_COUNT') or 0):
+        click.echo(f'Upgrading shard {shard}')
+        upgrade(x_arg=[f'shard={shard}'])
+
+
+@shards_cli.command('rebalance')
+@click.option('--previous-count', type=int, help='SHARD_COUNT before it was lowered, so the shards being retired are emptied too.')
+def rebalance_command(previous_count):
+    """Move users whose rows are not on the database SHARD_COUNT assigns them. Stop the API first."""
+    users, rows = rebalance(previous_count)
+    click.echo(f'Moved {users} users ({rows} rows)')
+
+
+@shards_cli.command('status')
+def status_command():
+    """Users with rows and row counts on each database."""
+    db = current_app.extensions['sqlalchemy']
+    tables = sharded_tables(db.metadata)
+    engines = [db.engine] + data_engines() if current_app.config.get('SHARD_COUNT') else [db.engine]
+    for engine in engines:
+        with engine.connect() as connection:
+            rows = sum(connection.execute(select(db.func.count()).select_from(table)).scalar() for table in tables)
+        click.echo(f'{engine.url.database}: {len(_users_with_rows(engine, tables))} users, {rows} rows')
@@ -0,0 +1,174 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import chain
+
+from sqlalchemy import delete, event, exists, inspect, insert, select, update
+from sqlalchemy.orm import Session
+
+from etags import COLLECTIONS
+from models import db, ChangeLog, SyncClient, SyncState
+from serializers import journal_serializer, medication_serializer, mood_serializer, todo_serializer
+
+SYNC_PAGE_SIZE = 1000  # change log entries per response
+SYNC_CLIENT_TTL = 30 * 24 * 3600  # seconds a client may go without syncing before it has to start over
+
+# collection -> serializer for the rows a sync sends
+SERIALIZERS = {serializer.model: serializer for serializer in (
+    journal_serializer, mood_serializer, todo_serializer, medication_serializer,
+)}
+MODELS = {collection: model for model, collection in COLLECTIONS.items()}
+
+
+def log_changes(connection, user_id, changes):
+    """Append (collection, entity_id, op) entries to the user's change log, numbered from their sequence.
+
+    Nothing is written unless the user has a sync client that has been
+    seen within SYNC_CLIENT_TTL seconds: a client that registers later starts
+    from a full fetch, so only changes someone can still ask for are kept.
+    The sequence is taken in the writing transaction, and SQLite allows
+    one writer at a time, so sequence order is commit order.
+    """
+    if not changes:
+        return
+    cutoff = datetime.now() - timedelta(seconds=SYNC_CLIENT_TTL)
+    live = exists().where(SyncClient.user_id == user_id, SyncClient.acked_at > cutoff)
+    last_seq = connection.execute(
+        update(SyncState)
+        .where(SyncState.user_id == user_id, live)
+        .values(last_seq=SyncState.last_seq + len(changes))
+        .returning(SyncState.last_seq)
+    ).scalar()
+    if last_seq is None:
+        return
+    first_seq = last_seq - len(changes) + 1
+    connection.execute(insert(ChangeLog), [
+        {'user_id': user_id, 'seq': first_seq + offset, 'collection': collection, 'entity_id': entity_id, 'op': op}
+        for offset, (collection, entity_id, op) in enumerate(changes)
+    ])
+
+
+def _changed_rows(session):
+    """(user_id -> [(collection, id, op)]) for the collection rows in the flush just written."""
+    changes = defaultdict(list)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        collection = COLLECTIONS.get(type(obj))
+        if collection is None:
+            continue
+        history = inspect(obj).attrs.user_id.history
+        if obj in session.new:
+            owners = {'create': (obj.user_id,)}
+        elif obj in session.deleted:
+            owners = {'delete': chain(history.unchanged, history.deleted)}
+        elif not session.is_modified(obj, include_collections=False):
+            continue
+        elif history.has_changes():
+            # a row moved to another user leaves one log and joins the other
+            owners = {'delete': history.deleted, 'create': history.added}
+        else:
+            owners = {'update': history.unchanged}
+        for op, user_ids in owners.items():
+            for user_id in user_ids:
+                if user_id is not None:
+                    changes[user_id].append((collection, obj.id, op))
+    return changes
+
+
+def _log_after_flush(session, flush_context):
+    for user_id, changes in _changed_rows(session).items():
+        log_changes(session.connection(), user_id, changes)
+
+
+def _serialize_current(user_id, collection, ids):
+    # rows that are gone, or now belong to someone else, are reported as deleted
+    model = MODELS[collection]
+    serializer = SERIALIZERS[model]
+    rows = db.session.execute(
+        select(*serializer.columns).where(model.user_id == user_id, model.id.in_(ids)).order_by(model.id)
+    ).all()
+    changed = serializer.rows(rows)
+    found = {row['id'] for row in changed}
+    return changed, sorted(set(ids) - found)
+
+
+def _changes_since(user_id, since, page_size):
+    entries = db.session.execute(
+        select(ChangeLog.seq, ChangeLog.collection, ChangeLog.entity_id, ChangeLog.op)
+        .where(ChangeLog.user_id == user_id, ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(page_size + 1)
+    ).all()
+    page = entries[:page_size]
+    refetch, latest = set(), {}
+    for entry in page:
+        if entry.op == 'reset':
+            refetch.add(entry.collection)
+        else:
+            # only the last operation on a row matters
+            latest[entry.collection, entry.entity_id] = entry.op
+
+    changes = {}
+    for collection in COLLECTIONS.values():
+        if collection in refetch:
+            continue
+        ids = [entity_id for (name, entity_id), op in latest.items() if name == collection and op != 'delete']
+        deleted = {entity_id for (name, entity_id), op in latest.items() if name == collection and op == 'delete'}
+        changed, missing = _serialize_current(user_id, collection, ids) if ids else ([], [])
+        if changed or deleted or missing:
+            changes[collection] = {'changed': changed, 'deleted': sorted(deleted.union(missing))}
+    return {
+        'seq': page[-1].seq if page else since,
+        'has_more': len(entries) > page_size,
+        'refetch': sorted(refetch),
+        'changes': changes,
+    }
+
+
+def compact(user_id, state, cutoff):
+    """Forget clients not seen since `cutoff` and drop log entries every remaining client has acknowledged."""
+    db.session.execute(delete(SyncClient).where(SyncClient.user_id == user_id, SyncClient.acked_at <= cutoff))
+    horizon = db.session.scalar(select(db.func.min(SyncClient.acked_seq)).where(SyncClient.user_id == user_id))
+    if horizon is not None and horizon > state.compacted_seq:
+        db.session.execute(delete(ChangeLog).where(ChangeLog.user_id == user_id, ChangeLog.seq <= horizon))
+        state.compacted_seq = horizon
+
+
+def sync_changes(user_id, client_id, since, page_size=SYNC_PAGE_SIZE):
+    """Changes to the user's collections after sequence number `since`, as seen by one sync client.
+
+    Calling with `since` acknowledges every change up to it for this client.
+    A client that is new, hasn't synced within SYNC_CLIENT_TTL seconds, or asks
+    for changes that have already been compacted away gets every collection
+    in 'refetch' and the current 'seq': it should reload the lists and pass
+    that seq next time. Returns (response, client_id).
+    """
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=SYNC_CLIENT_TTL)
+    state = db.session.get(SyncState, user_id)
+    if state is None:
+        state = SyncState(user_id=user_id, last_seq=0, compacted_seq=0)
+        db.session.add(state)
+    client = db.session.get(SyncClient, client_id) if client_id else None
+    if client is not None and client.user_id != user_id:
+        client = None
+    resume = (client is not None and client.acked_at > cutoff and since is not None
+              and state.compacted_seq <= since <= state.last_seq)
+
+    if resume:
+        response = _changes_since(user_id, since, page_size)
+        client.acked_seq = since
+    else:
+        response = {'seq': state.last_seq, 'has_more': False, 'refetch': sorted(COLLECTIONS.values()), 'changes': {}}
+        if client is None:
+            client = SyncClient(user_id=user_id)
+            db.session.add(client)
+        client.acked_seq = state.last_seq
+    client.acked_at = now
+    compact(user_id, state, cutoff)
+    db.session.commit()
+    return response, client.id
+
+
+def init_sync(app):
+    """Log every ORM write to a collection for /api/sync. Bulk statements call log_changes() themselves."""
+    if not event.contains(Session, 'after_flush', _log_after_flush):
+        event.listen(Session, 'after_flush', _log_after_flush)
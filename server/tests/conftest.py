@@ -0,0 +1,58 @@
+"""Fixtures for the invariant tests: a throwaway SQLite file per test, never app.db."""
+from datetime import date, timedelta
+
+import pytest
+
+from app import create_app
+from extensions import password_hasher
+from models import db, User
+from seed import seed_history
+
+# the views themselves, uncached; tests of the response cache build cached apps of their own
+BASE_CONFIG = {'SECRET_KEY': 'test', 'BCRYPT_LOG_ROUNDS': 4, 'RESPONSE_CACHE_BACKEND': 'off'}
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {**BASE_CONFIG, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'PROFILE_DIR': str(tmp_path / 'profiles')}
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def user_id(app):
+    with app.app_context():
+        user = User(username='test', first_name='Test', last_name='User', _hashed_password=password_hasher.hash('test'))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def history(app, user_id):
+    """A year of daily moods, journals and todos, and monthly medication renewals, for the user."""
+    with app.app_context():
+        seed_history(user_id, date.today() - timedelta(days=365), date.today())
+    return user_id
+
+
+@pytest.fixture
+def login(app):
+    def login(user_id, app=app):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client
+    return login
+
+
+@pytest.fixture
+def client(login, user_id):
+    return login(user_id)
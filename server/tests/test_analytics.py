@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import create_app
+
+DAYS = [(date.today() - timedelta(days=n)).isoformat() for n in range(4)]
+
+
+@pytest.mark.parametrize('method, url, body', [
+    ('POST', '/api/mood-ratings', {'mood': 2, 'created_at': DAYS[3]}),
+    ('POST', '/api/todos/batch', [{'op': 'create', 'task_text': 'Task', 'created_at': f'{DAYS[0]}T09:00:00Z'}]),
+])
+def test_workers_sharing_a_cache_never_serve_a_stale_result(config, user_id, client, login, tmp_path, method, url, body):
+    client.put('/api/mood-ratings/batch', json=[{'mood': mood, 'created_at': day} for mood, day in zip((5, 3, 1), DAYS)])
+    client.post('/api/todos/batch', json=[
+        {'op': 'create', 'task_text': 'Task', 'completed': completed, 'created_at': f'{day}T09:00:00Z'}
+        for completed, day in ((True, DAYS[0]), (True, DAYS[1]), (False, DAYS[1]), (False, DAYS[2]))
+    ])
+    # two workers with the analytics cache in one sqlite file: one writes, the other reads
+    shared = {**config, 'SESSION_BACKEND': 'sqlite', 'SESSION_SQLITE_PATH': str(tmp_path / 'sessions.db')}
+    writer, reader = login(user_id, create_app(shared)), login(user_id, create_app(shared))
+    before = reader.get('/api/mood-ratings/analytics').get_json()
+    assert writer.get('/api/mood-ratings/analytics').get_json() == before
+    assert writer.open(url, method=method, json=body).status_code < 400
+    after = reader.get('/api/mood-ratings/analytics').get_json()
+    assert after != before
+    # the same as a worker with an empty cache computes
+    assert after == client.get('/api/mood-ratings/analytics').get_json()
@@ -0,0 +1,51 @@
+import asyncio
+
+from asgi import WsgiToAsgi
+from models import db, Journal, Medications, Mood, Todos
+
+
+async def _get(asgi_app, path, cookie):
+    """GET path through the ASGI app; the status and the whole body."""
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'http_version': '1.1',
+             'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode('latin-1'))]}
+    requested = False
+    status, body = None, []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b''}
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        else:
+            body.append(message['body'])
+            # hand the loop to the other downloads between chunks, as a socket write would
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(asgi_app(scope, receive, send), 60)
+    return status, b''.join(body)
+
+
+def test_concurrent_streamed_exports_keep_their_request_context(app, history, login):
+    """Each chunk of /api/export may be pulled on a different pool thread, with other downloads in flight."""
+    client = login(history)
+    cookie = f"{app.config['SESSION_COOKIE_NAME']}={client.get_cookie(app.config['SESSION_COOKIE_NAME']).value}"
+    with app.app_context():
+        # one NDJSON line per journal, mood, todo and medication
+        lines = sum(db.session.scalar(db.select(db.func.count()).where(model.user_id == history))
+                    for model in (Journal, Mood, Todos, Medications))
+    asgi_app = WsgiToAsgi(app, 4)
+
+    async def downloads():
+        return await asyncio.gather(*(_get(asgi_app, '/api/export', cookie) for _ in range(8)))
+
+    try:
+        results = asyncio.run(downloads())
+    finally:
+        asgi_app.executor.shutdown()
+    assert [(status, body.count(b'\n')) for status, body in results] == [(200, lines)] * 8
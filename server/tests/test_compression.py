@@ -0,0 +1,20 @@
+import gzip
+
+
+def test_gzip_body_decodes_to_the_identity_body(history, client):
+    response = client.get('/api/journals', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == client.get('/api/journals').data
+
+
+def test_not_modified_is_not_compressed(history, client):
+    etag = client.get('/api/journals', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/api/journals', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_body_under_the_threshold_is_not_compressed(history, client):
+    response = client.get('/api/journals?limit=1', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < client.application.config['COMPRESS_MIN_SIZE']
+    assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,38 @@
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+from models import db, User
+
+
+def test_concurrent_reads_and_writes_all_succeed(app, login):
+    """Writers from several threads wait for each other instead of failing with 'database is locked'."""
+    with app.app_context():
+        users = [User(username=f'test{n}', first_name='Test', last_name='User') for n in range(4)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker(user_id):
+        client = login(user_id)
+        for n in range(20):
+            day = (date(2000, 1, 1) + timedelta(days=n)).isoformat()
+            for method, url, body in (
+                ('POST', '/api/todos', {'task_text': f'Task {n}'}),
+                ('POST', '/api/mood-ratings', {'mood': 3, 'created_at': day}),
+                ('POST', '/api/journal-entries', {'journal_text': 'Text', 'created_at': day}),
+                ('GET', '/api/todos?limit=20', None),
+                ('GET', '/api/journals?limit=20', None),
+            ):
+                response = client.open(url, method=method, json=body)
+                with lock:
+                    statuses[response.status_code] += 1
+
+    threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {status for status in statuses if status >= 400} == set(), statuses
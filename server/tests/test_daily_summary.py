@@ -0,0 +1,29 @@
+from datetime import date, timedelta
+
+from daily_summary import find_drift
+from models import db
+
+
+def test_rollup_stays_in_step_with_every_write_path(app, history, client):
+    last_week = [(date.today() - timedelta(days=n)).isoformat() for n in range(7)]
+    todo_ids = [client.post('/api/todos', json={'task_text': 'Task'}).get_json()['id'] for _ in range(5)]
+    client.put(f'/api/todos/{todo_ids[0]}', json={'completed': True})
+    client.put(f'/api/todos/{todo_ids[1]}', json={'created_at': f'{last_week[3]}T09:00:00Z'})
+    client.delete(f'/api/todos/{todo_ids[2]}')
+    client.post('/api/todos/batch', json=[
+        {'op': 'create', 'task_text': 'Batch', 'created_at': f'{last_week[5]}T09:00:00Z'},
+        {'op': 'update', 'id': todo_ids[3], 'completed': True, 'created_at': f'{last_week[6]}T09:00:00Z'},
+        {'op': 'delete', 'id': todo_ids[4]},
+    ])
+    client.put('/api/mood-ratings/batch', json=[{'mood': 1 + n % 5, 'created_at': day} for n, day in enumerate(last_week)])
+    client.post('/api/mood-ratings', json={'mood': 5, 'created_at': last_week[0]})
+    journal = client.post('/api/journals', json={'journal_header': 'Header', 'journal_text': 'Text'}).get_json()
+    client.delete(f"/api/journals/{journal['id']}")
+    client.post('/api/medications', json={'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr', 'renew_date': last_week[2]})
+    medication = client.post('/api/medications', json={'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr',
+                                                       'renew_date': last_week[1]}).get_json()
+    client.put(f"/api/medications/{medication['id']}", json={'renew_date': last_week[4]})
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert find_drift(connection) == []
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from models import db, Journal, Medications, Todos
+from query_counter import QueryCounter
+
+COLLECTIONS = ('/api/journals', '/api/mood-ratings', '/api/todos', '/api/medications')
+DAY = date.today().isoformat()
+# (method, url, body, the collections whose ETag it changes); {journal_id} and the like are
+# an existing row of the user's
+WRITES = [
+    ('POST', '/api/journals', {'journal_header': 'Header', 'journal_text': 'Text'}, {'/api/journals'}),
+    ('POST', '/api/journal-entries', {'journal_text': 'Text', 'created_at': DAY}, {'/api/journals'}),
+    ('PUT', '/api/journals/{journal_id}', {'journal_text': 'Edited'}, {'/api/journals'}),
+    ('DELETE', '/api/journals/{journal_id}', None, {'/api/journals'}),
+    ('POST', '/api/mood-ratings', {'mood': 2, 'created_at': '2030-01-01'}, {'/api/mood-ratings'}),
+    ('PUT', '/api/mood-ratings/batch', [{'mood': 4, 'created_at': '2030-01-02'}], {'/api/mood-ratings'}),
+    ('POST', '/api/todos', {'task_text': 'Task'}, {'/api/todos'}),
+    ('PUT', '/api/todos/{todo_id}', {'task_text': 'Edited'}, {'/api/todos'}),
+    ('POST', '/api/todos/batch', [{'op': 'create', 'task_text': 'Batch'}], {'/api/todos'}),
+    ('DELETE', '/api/todos/{todo_id}', None, {'/api/todos'}),
+    ('POST', '/api/medications', {'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr', 'renew_date': DAY}, {'/api/medications'}),
+    ('PUT', '/api/medications/{medication_id}', {'dosage': 20, 'renew_date': DAY}, {'/api/medications'}),
+    ('DELETE', '/api/medications/{medication_id}', None, {'/api/medications'}),
+]
+
+
+def etags(client):
+    return {url: client.get(url).headers.get('ETag') for url in COLLECTIONS}
+
+
+@pytest.mark.parametrize('url', COLLECTIONS)
+def test_not_modified_costs_one_query(app, history, client, url):
+    etag = client.get(url).headers['ETag']
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert counter.count <= 1, counter.statements
+
+
+@pytest.mark.parametrize('method, url, body, expected', WRITES, ids=[f'{m} {u}' for m, u, _, _ in WRITES])
+def test_write_changes_its_etags(app, history, client, method, url, body, expected):
+    with app.app_context():
+        ids = {
+            'journal_id': db.session.scalar(select(Journal.id).where(Journal.user_id == history)),
+            'todo_id': db.session.scalar(select(Todos.id).where(Todos.user_id == history)),
+            'medication_id': db.session.scalar(select(Medications.id).where(Medications.user_id == history)),
+        }
+    before = etags(client)
+    response = client.open(url.format(**ids), method=method, json=body)
+    assert response.status_code < 400, response.get_json()
+    after = etags(client)
+    assert {collection for collection in COLLECTIONS if before[collection] != after[collection]} == expected
@@ -0,0 +1,44 @@
+import logging
+import os
+import re
+
+from app import create_app
+
+METRIC_LINE = re.compile(r'^[a-z_]+(\{[^}]*\})? [0-9.e+-]+$')
+
+
+def test_exposition_parses_and_counts_requests(history, client):
+    for _ in range(3):
+        client.get('/api/journals')
+    exposition = client.get('/metrics').get_data(as_text=True)
+    samples = [line for line in exposition.splitlines() if not line.startswith('#')]
+    assert [line for line in samples if not METRIC_LINE.match(line)] == []
+    assert 'http_requests_total{method="GET",route="/api/journals",status="200"} 3' in samples
+    assert any(line.startswith('store_hits_total{store="session"') for line in samples)
+
+
+def test_slow_query_log_has_the_query_and_its_plan(app, history, client):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    slow = logging.getLogger('adhd_companion.slow_queries')
+    slow.addHandler(handler)
+    app.config['SLOW_QUERY_MS'] = 0
+    try:
+        client.get('/api/journals')
+    finally:
+        slow.removeHandler(handler)
+    messages = [record.getMessage() for record in records]
+    assert any('FROM journal_table' in message and 'USING INDEX' in message for message in messages)
+
+
+def test_one_profile_per_sampled_request(config, history, login, tmp_path):
+    client = login(history, create_app({**config, 'PROFILE_EVERY': 4}))
+    for _ in range(8):
+        client.get('/api/todos?limit=20')
+    assert len(os.listdir(tmp_path / 'profiles')) == 2
+
+
+def test_metrics_is_a_404_when_disabled(config, login, user_id):
+    client = login(user_id, create_app({**config, 'METRICS_ENABLED': False}))
+    assert client.get('/metrics').status_code == 404
@@ -0,0 +1,26 @@
+import pytest
+
+from models import db, Medications
+
+
+@pytest.mark.parametrize('endpoint, limit', [
+    ('/api/mood-ratings', 50),
+    ('/api/journals', 50),
+    ('/api/todos', 50),
+    # small pages, so one of them ends on an undated medication
+    ('/api/medications', 2),
+])
+def test_pages_hold_every_row_once_in_order(app, history, client, endpoint, limit):
+    with app.app_context():
+        # renew_date is optional, and a page can start or end on a NULL sort key
+        db.session.add_all([Medications(drug_name='Undated', dosage=5, prescriber='Dr', user_id=history) for _ in range(3)])
+        db.session.commit()
+    expected = client.get(endpoint).get_json()
+    seen, url = [], f'{endpoint}?limit={limit}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        seen += page['items']
+        url = page['next_cursor'] and f"{endpoint}?limit={limit}&cursor={page['next_cursor']}"
+    assert seen == expected
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db
+from query_counter import QueryCounter
+
+# Maximum statements per request, independent of how much history the user has
+QUERY_BUDGETS = [
+    ('POST', '/api/login', {'user': 'test', 'password': 'test'}, 1),
+    ('GET', '/api/get-session', None, 1),
+    ('GET', '/api/users', None, 1),
+    ('GET', '/api/users/{user_id}', None, 3),
+    # list endpoints look up the collection version for their ETag first
+    ('GET', '/api/mood-ratings', None, 2),
+    ('GET', '/api/journals', None, 2),
+    ('GET', '/api/todos', None, 2),
+    ('GET', '/api/medications', None, 2),
+    ('GET', '/api/days/{today}', None, 3),
+    ('GET', '/api/calendar', None, 1),
+    ('GET', '/api/journals/search?q=today', None, 2),
+    # the mood and todo versions the cached result is keyed on, then the series on a miss
+    ('GET', '/api/mood-ratings/analytics', None, 2),
+    ('GET', '/api/reminders', None, 1),
+    # writes also refresh the day's daily_summary row (DELETE + INSERT ... SELECT),
+    # bump the collection version and try to take a change log sequence number
+    ('POST', '/api/journals', {'journal_header': 'Header', 'journal_text': 'Text'}, 6),
+    ('POST', '/api/todos', {'task_text': 'Task'}, 6),
+    ('PUT', '/api/todos/1', {'completed': True}, 7),
+    ('POST', '/api/medications', {'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr', 'renew_date': '2030-01-01'}, 6),
+    ('POST', '/api/mood-ratings', {'mood': 4, 'created_at': '2030-01-01'}, 6),
+    ('GET', '/api/sync', None, 6),
+]
+
+
+@pytest.mark.parametrize('method, url, body, budget', QUERY_BUDGETS, ids=[f'{m} {u}' for m, u, _, _ in QUERY_BUDGETS])
+def test_query_budget(app, history, client, method, url, body, budget):
+    url = url.format(user_id=history, today=date.today().isoformat())
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.open(url, method=method, json=body)
+    assert response.status_code < 400, response.get_json()
+    assert counter.count <= budget, counter.statements
+
+
+def test_no_full_table_scans(app, history, client):
+    """EXPLAIN QUERY PLAN every statement the per-user endpoints issue."""
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # INSERT ... SELECT covers the daily_summary refresh
+        if 'SELECT' in statement.upper():
+            statements.setdefault(statement, parameters)
+
+    month_from = (date.today() - timedelta(days=30)).isoformat()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for endpoint in ('/api/mood-ratings', '/api/journals', '/api/todos', '/api/medications'):
+            client.get(endpoint)
+            client.get(f'{endpoint}?from={month_from}')
+            cursor = client.get(f'{endpoint}?limit=10').get_json()['next_cursor']
+            client.get(f'{endpoint}?limit=10&cursor={cursor}')
+        client.get(f'/api/days/{date.today().isoformat()}')
+        client.get('/api/calendar')
+        client.post('/api/mood-ratings', json={'mood': 3, 'created_at': date.today().isoformat()})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    full_scans = []
+    with app.app_context():
+        for statement, parameters in statements.items():
+            plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            details = [row[-1] for row in plan]
+            # scanning a subquery's rows (SCAN anon_1) is not a table scan
+            if any(d.startswith('SCAN') and 'INDEX' not in d and not d.startswith('SCAN anon_') for d in details):
+                full_scans.append(f"{' | '.join(details)}: {' '.join(statement.split())}")
+    assert not full_scans
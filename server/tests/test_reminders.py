@@ -0,0 +1,40 @@
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from models import db, User, Medications, Reminder
+from reminders import schedule_reminders
+
+
+def test_every_due_renewal_gets_one_reminder(app):
+    rng = random.Random(0)
+    today = datetime.combine(date.today(), datetime.min.time())
+    days_ahead = app.config['REMINDER_DAYS_AHEAD']
+    with app.app_context():
+        engine = db.engine
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'id': n, 'username': f'test{n}', 'first_name': 'Test', 'last_name': 'User'} for n in range(1, 21)])
+        conn.execute(insert(Medications), [
+            {'user_id': rng.randint(1, 20), 'drug_name': f'Drug {n}', 'dosage': 10, 'prescriber': 'Dr',
+             'renew_date': today + timedelta(days=rng.randint(-30, 30))}
+            for n in range(500)
+        ])
+        due = conn.scalar(select(db.func.count()).where(
+            Medications.renew_date >= today, Medications.renew_date < today + timedelta(days=days_ahead + 1)))
+
+    # batches smaller than the due set, and a rerun that finds nothing new
+    first = schedule_reminders(engine, days_ahead, 7)
+    rerun = schedule_reminders(engine, days_ahead, 7)
+    assert first['due'] == first['created'] == due
+    assert rerun['created'] == 0
+    with engine.connect() as conn:
+        assert conn.scalar(select(db.func.count()).select_from(Reminder)) == due
+
+
+def test_due_query_uses_the_renew_date_index(app):
+    with app.app_context():
+        plan = ' | '.join(row[3] for row in db.session.connection().exec_driver_sql(
+            'EXPLAIN QUERY PLAN SELECT id, user_id, renew_date FROM medications_table '
+            'WHERE renew_date >= ? AND renew_date < ? ORDER BY renew_date, id LIMIT 1000', (date.today(), date.today())))
+    assert 'USING INDEX ix_medications_table_renew_date' in plan
@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import create_app
+from models import db, Reminder, Todos
+from reminders import schedule_reminders
+from response_cache import MemoryCache
+from seed import seed_history
+
+COLLECTIONS = ('/api/journals', '/api/mood-ratings', '/api/todos', '/api/medications')
+CACHED_URLS = [url for collection in COLLECTIONS for url in (collection, f'{collection}?limit=50')]
+DAY = date.today().isoformat()
+# every write route; {journal_id} and the like are an existing row of the user's
+WRITES = [
+    ('POST', '/api/journals', {'journal_header': 'Header', 'journal_text': 'Text'}),
+    ('POST', '/api/journal-entries', {'journal_text': 'Text', 'created_at': DAY}),
+    ('PUT', '/api/journals/{journal_id}', {'journal_header': 'Updated', 'journal_text': 'Updated'}),
+    ('DELETE', '/api/journals/{journal_id}', None),
+    ('POST', '/api/mood-ratings', {'mood': 4}),
+    ('PUT', '/api/mood-ratings/batch', [{'mood': 3, 'created_at': '2030-01-01'}, {'mood': 4, 'created_at': '2030-01-02'}]),
+    ('POST', '/api/todos', {'task_text': 'Task'}),
+    ('PUT', '/api/todos/{todo_id}', {'completed': True}),
+    ('DELETE', '/api/todos/{todo_id}', None),
+    ('POST', '/api/todos/batch', [{'op': 'create', 'task_text': 'Batch'}, {'op': 'update', 'id': '{todo_id}', 'completed': True}]),
+    ('POST', '/api/medications', {'drug_name': 'Drug', 'dosage': 10, 'prescriber': 'Dr', 'renew_date': '2030-01-01'}),
+    ('PUT', '/api/medications/{medication_id}', {'dosage': 20, 'renew_date': '2030-02-01'}),
+    ('DELETE', '/api/medications/{medication_id}', None),
+    ('DELETE', '/api/reminders/{reminder_id}', None),
+    ('POST', '/api/import', b'{"type": "todo", "task_text": "Imported"}\n'),
+]
+
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        # a placeholder on its own becomes the (integer) id itself
+        return ids[value[1:-1]] if value[1:-1] in ids and value.startswith('{') else value.format(**ids)
+    if isinstance(value, list):
+        return [_fill(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, ids) for key, item in value.items()}
+    return value
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cached_clients(request, config, app, user_id, login, tmp_path):
+    """(writer, reader) clients of cached apps: one memory-cached app, or two workers sharing one cache file."""
+    if request.param == 'memory':
+        memory = create_app({**config, 'RESPONSE_CACHE_BACKEND': 'memory'})
+        return login(user_id, memory), login(user_id, memory)
+    shared = {**config, 'RESPONSE_CACHE_BACKEND': 'sqlite', 'RESPONSE_CACHE_PATH': str(tmp_path / 'cache.db')}
+    return login(user_id, create_app(shared)), login(user_id, create_app(shared))
+
+
+@pytest.fixture
+def ids(app, user_id, client):
+    with app.app_context():
+        seed_history(user_id, date.today() - timedelta(days=30), date.today())
+    journal_id = client.post('/api/journals', json={'journal_header': 'Row', 'journal_text': 'Row'}).get_json()['id']
+    medication_id = client.post('/api/medications', json={'drug_name': 'Due', 'dosage': 1, 'prescriber': 'Dr', 'renew_date': DAY}).get_json()['id']
+    with app.app_context():
+        schedule_reminders(db.engine, 0, 1000)
+        return {
+            'journal_id': journal_id,
+            'todo_id': db.session.scalar(select(Todos.id).where(Todos.user_id == user_id)),
+            'medication_id': medication_id,
+            'reminder_id': db.session.scalar(select(Reminder.id).where(Reminder.user_id == user_id)),
+        }
+
+
+def _stale(reader, reference):
+    return [url for url in CACHED_URLS if reader.get(url).data != reference.get(url).data]
+
+
+@pytest.mark.parametrize('method, url, body', WRITES, ids=[f'{m} {u}' for m, u, _ in WRITES])
+def test_no_stale_read_after_a_write(cached_clients, client, ids, method, url, body):
+    writer, reader = cached_clients
+    for cached_url in CACHED_URLS:
+        reader.get(cached_url)
+    if isinstance(body, bytes):
+        response = writer.open(url, method=method, data=body, content_type='application/x-ndjson')
+    else:
+        response = writer.open(_fill(url, ids), method=method, json=_fill(body, ids))
+    assert response.status_code < 400, response.get_json()
+    # the uncached app is the reference
+    assert _stale(reader, client) == []
+
+
+def test_no_stale_read_after_a_commit_outside_a_request(cached_clients, app, client, ids):
+    _, reader = cached_clients
+    for cached_url in CACHED_URLS:
+        reader.get(cached_url)
+    # like a CLI job
+    with app.app_context():
+        todo = db.session.get(Todos, ids['todo_id'])
+        todo.completed = not todo.completed
+        db.session.commit()
+    assert _stale(reader, client) == []
+
+
+def test_memory_cache_stays_under_its_byte_limit():
+    cache = MemoryCache(64 * 1024)
+    for n in range(200):
+        cache.set(f'{n}', 1, b'x' * 1024)
+    assert cache.bytes <= cache.max_bytes
+    assert cache.stats()['evictions'] > 0
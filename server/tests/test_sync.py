@@ -0,0 +1,25 @@
+from sqlalchemy import select
+
+from models import db, Journal, Todos
+
+
+def test_sync_returns_every_row_changed_since_the_last_sync(app, history, client):
+    with app.app_context():
+        journal_ids = db.session.scalars(select(Journal.id).where(Journal.user_id == history).limit(10)).all()
+        todo_ids = db.session.scalars(select(Todos.id).where(Todos.user_id == history).limit(10)).all()
+    since = client.get('/api/sync').get_json()['seq']  # registers the client; the change log starts here
+    edits = 10
+    for n in range(edits):
+        kind = n % 4
+        if kind == 0:
+            response = client.put(f'/api/journals/{journal_ids[n]}', json={'journal_text': f'Edited {n}'})
+        elif kind == 1:
+            response = client.put(f'/api/todos/{todo_ids[n]}', json={'task_text': f'Edited {n}'})
+        elif kind == 2:
+            response = client.delete(f'/api/todos/{todo_ids[n]}')
+        else:
+            response = client.post('/api/journals', json={'journal_header': f'New {n}', 'journal_text': 'Text'})
+        assert response.status_code in (200, 201), response.status_code
+
+    changes = client.get(f'/api/sync?since={since}').get_json()['changes']
+    assert sum(len(entry['changed']) + len(entry['deleted']) for entry in changes.values()) == edits
@@ -0,0 +1,90 @@
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from models import db, User, Journal, Medications, Mood, Todos
+from seed import seed_history
+import transfer
+from transfer import EXPORT_FORMATS
+
+
+@pytest.fixture
+def importer(app):
+    with app.app_context():
+        user = User(username='importer', first_name='Test', last_name='User')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _rows(app, user_id):
+    with app.app_context():
+        return sum(db.session.scalar(db.select(db.func.count()).where(model.user_id == user_id))
+                   for model in (Journal, Mood, Todos, Medications))
+
+
+def _traced(function):
+    """Run function() and return (its result, peak MB of Python allocations while it ran)."""
+    # collect every generation often, so uncollected garbage doesn't grow with the work done
+    thresholds = gc.get_threshold()
+    gc.collect()
+    gc.set_threshold(thresholds[0], 1, 1)
+    tracemalloc.start()
+    try:
+        return function(), tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+        gc.set_threshold(*thresholds)
+
+
+def _round_trip(app, login, exporter, importer, format, path):
+    """Export one user's history to a file and import it into another's; the import's JSON and the peak MB of each step."""
+    def export():
+        response = login(exporter).get(f'/api/export?format={format}', buffered=False)
+        with open(path, 'wb') as f:
+            for chunk in response.iter_encoded():
+                f.write(chunk)
+        response.close()
+        return response
+
+    def import_():
+        with open(path, 'rb') as f:
+            return login(importer).post(f'/api/import?format={format}', input_stream=f, content_length=os.path.getsize(path),
+                                        content_type=EXPORT_FORMATS[format])
+
+    exported, export_peak = _traced(export)
+    imported, import_peak = _traced(import_)
+    assert exported.status_code == 200
+    assert imported.status_code == 201, imported.get_json()
+    with app.app_context():
+        for model in (Journal, Mood, Todos, Medications):
+            db.session.execute(delete(model).where(model.user_id == importer))
+        db.session.commit()
+    return imported.get_json(), export_peak, import_peak
+
+
+@pytest.mark.parametrize('format', sorted(EXPORT_FORMATS))
+def test_export_imports_back_row_for_row(app, history, importer, login, tmp_path, format):
+    imported, _, _ = _round_trip(app, login, history, importer, format, tmp_path / f'export.{format}')
+    assert sum(imported['imported'].values()) == _rows(app, history)
+
+
+@pytest.mark.parametrize('format', sorted(EXPORT_FORMATS))
+def test_export_and_import_memory_is_flat_in_the_size_of_the_history(app, history, importer, login, tmp_path, monkeypatch, format):
+    # small batches and upload spool, so a year of history already spans several
+    monkeypatch.setattr(transfer, 'EXPORT_CHUNK_ROWS', 100)
+    monkeypatch.setattr(transfer, 'IMPORT_BATCH_SIZE', 100)
+    monkeypatch.setattr(sys.modules['api.transfer'], 'IMPORT_SPOOL_SIZE', 64 * 1024)
+    path = tmp_path / f'export.{format}'
+    _, *small = _round_trip(app, login, history, importer, format, path)
+    with app.app_context():
+        seed_history(history, date.today() - timedelta(days=365 * 5), date.today() - timedelta(days=366))
+    _, *large = _round_trip(app, login, history, importer, format, path)
+    # allow for noise, but a peak that grows with the history means something is buffering
+    for before, after in zip(small, large):
+        assert after <= before + 1, (small, large)
@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from batch import BatchError
+from daily_summary import refresh_days
+from etags import COLLECTIONS, bump_versions
+from models import db, Journal, Medications, Mood, Todos
+from serializers import RowSerializer
+from sync import log_changes
+
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_CHUNK_ROWS = 1000  # rows fetched per round trip and written per response chunk
+IMPORT_BATCH_SIZE = 1000  # rows per executemany INSERT
+MAX_IMPORT_ERRORS = 20  # stop reading the upload after this many bad records
+IMPORT_SPOOL_SIZE = 1024 * 1024  # raw upload bodies above this many bytes are buffered on disk
+
+# record type -> serializer for the exported fields, oldest first within each type.
+# Ids and user_id are left out so an export can be imported into any account.
+RECORDS = {
+    'journal': RowSerializer(Journal, ('journal_header', 'journal_text', 'created_at')),
+    'mood': RowSerializer(Mood, ('mood_rating', 'created_at')),
+    'todo': RowSerializer(Todos, ('task_text', 'completed', 'created_at')),
+    'medication': RowSerializer(Medications, ('drug_name', 'dosage', 'prescriber', 'renew_date')),
+}
+ORDER_BY = {'journal': Journal.created_at, 'mood': Mood.created_at, 'todo': Todos.created_at, 'medication': Medications.renew_date}
+
+# One CSV layout for every type; fields a type doesn't have are left empty
+CSV_FIELDS = ('type',) + tuple(dict.fromkeys(field for serializer in RECORDS.values() for field in serializer.fields))
+
+
+def _export_rows(user_id):
+    """(type, record) for every row the user owns, read EXPORT_CHUNK_ROWS at a time from a server-side cursor."""
+    for record_type, serializer in RECORDS.items():
+        model = serializer.model
+        result = db.session.execute(
+            select(*serializer.columns)
+            .where(model.user_id == user_id)
+            .order_by(ORDER_BY[record_type], model.id)
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
+        for partition in result.partitions():
+            yield record_type, [serializer.row(row) for row in partition]
+
+
+def export_ndjson(user_id):
+    """Yield the user's data as newline-delimited JSON, one chunk of lines per partition."""
+    dumps = current_app.json.dumps
+    for record_type, records in _export_rows(user_id):
+        yield ''.join(dumps({'type': record_type, **record}) + '\n' for record in records)
+
+
+def export_csv(user_id):
+    """Yield the user's data as CSV with a header row and a type column."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_FIELDS)
+    writer.writeheader()
+    for record_type, records in _export_rows(user_id):
+        writer.writerows(dict(record, type=record_type) for record in records)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _lines(stream):
+    # binary line iteration works for request.stream and spooled uploads alike;
+    # a UTF-8 sequence never contains b'\n', so decoding per line is safe
+    for line in stream:
+        yield line.decode('utf-8')
+
+
+def _ndjson_records(stream):
+    for line_number, line in enumerate(_lines(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+        else:
+            yield line_number, record
+
+
+def _csv_records(stream):
+    reader = csv.DictReader(_lines(stream))
+    for record in reader:
+        # empty CSV cells mean "no value"; JSON-only types are parsed by the validators
+        yield reader.line_num, {key: value for key, value in record.items() if key and value not in ('', None)}
+
+
+def _timestamp(record, field, required=True):
+    value = record.get(field)
+    if value is None:
+        if required:
+            raise ValueError(f"'{field}' is required")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' must be a timestamp string")
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _text(record, field):
+    value = record.get(field)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"'{field}' is required")
+    return value
+
+
+def _integer(record, field):
+    value = record.get(field)
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        value = int(value)
+    if type(value) is not int:
+        raise ValueError(f"'{field}' must be an integer")
+    return value
+
+
+def _boolean(record, field):
+    value = record.get(field, False)
+    if isinstance(value, str):
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"'{field}' must be true or false")
+        return value.lower() in ('true', '1')
+    return bool(value)
+
+
+def _validate_journal(record):
+    return {'journal_header': record.get('journal_header'), 'journal_text': record.get('journal_text'),
+            'created_at': _timestamp(record, 'created_at', required=False) or datetime.now()}
+
+
+def _validate_mood(record):
+    rating = _integer(record, 'mood_rating')
+    if rating not in range(1, 6):
+        raise ValueError('Invalid mood rating')
+    return {'mood_rating': rating, 'created_at': _timestamp(record, 'created_at')}
+
+
+def _validate_todo(record):
+    return {'task_text': _text(record, 'task_text'), 'completed': _boolean(record, 'completed'),
+            'created_at': _timestamp(record, 'created_at', required=False) or datetime.now()}
+
+
+def _validate_medication(record):
+    return {'drug_name': _text(record, 'drug_name'), 'dosage': _integer(record, 'dosage'),
+            'prescriber': _text(record, 'prescriber'), 'renew_date': _timestamp(record, 'renew_date', required=False)}
+
+
+VALIDATORS = {
+    'journal': _validate_journal,
+    'mood': _validate_mood,
+    'todo': _validate_todo,
+    'medication': _validate_medication,
+}
+
+
+def _insert_statement(model):
+    if model is not Mood:
+        return insert(model)
+    # one rating per day: a later record for the same day replaces the earlier one
+    upsert = sqlite_insert(Mood)
+    return upsert.on_conflict_do_update(
+        index_elements=[Mood.user_id, db.func.date(Mood.created_at)],
+        set_={'mood_rating': upsert.excluded.mood_rating},
+    )
+
+
+def _valid_records(stream, format):
+    """(record_type, values) for each record of an upload; raises BatchError at the end if any were invalid.
+
+    Stops reading after MAX_IMPORT_ERRORS bad records.
+    """
+    records = _ndjson_records(stream) if format == 'ndjson' else _csv_records(stream)
+    errors = []
+    for line_number, record in records:
+        try:
+            if not isinstance(record, dict):
+                raise ValueError('Expected a JSON object')
+            validate = VALIDATORS.get(record.get('type'))
+            if validate is None:
+                raise ValueError(f"'type' must be one of {', '.join(RECORDS)}")
+            values = validate(record)
+        except (ValueError, TypeError) as e:
+            errors.append({'line': line_number, 'error': str(e)})
+            if len(errors) >= MAX_IMPORT_ERRORS:
+                break
+            continue
+        if not errors:
+            yield record['type'], values
+    if errors:
+        raise BatchError(errors)
+
+
+def check_records(stream, format):
+    """Validate a whole upload without touching the database; raises BatchError with up to MAX_IMPORT_ERRORS {'line', 'error'} entries."""
+    for _ in _valid_records(stream, format):
+        pass
+
+
+def import_records(user_id, stream, format):
+    """Insert an upload that check_records() accepted for the user, in one transaction.
+
+    The stream must be seekable; it is read again from the start, so a
+    retried transaction imports the same records. Rows are written
+    IMPORT_BATCH_SIZE at a time, so memory does not grow with the size of
+    the upload. Returns the number of rows imported per collection.
+    """
+    stream.seek(0)
+    pending = {record_type: [] for record_type in RECORDS}
+    counts = dict.fromkeys(RECORDS, 0)
+    days = set()
+
+    def flush(record_type):
+        rows = pending[record_type]
+        db.session.execute(_insert_statement(RECORDS[record_type].model), rows)
+        counts[record_type] += len(rows)
+        rows.clear()
+
+    for record_type, values in _valid_records(stream, format):
+        day = values.get('created_at', values.get('renew_date'))
+        if day is not None:
+            days.add(day.date())
+        pending[record_type].append(dict(values, user_id=user_id))
+        if len(pending[record_type]) >= IMPORT_BATCH_SIZE:
+            flush(record_type)
+
+    for record_type, rows in pending.items():
+        if rows:
+            flush(record_type)
+
+    # executemany INSERTs skip the ORM flush hooks, as in batch.py; the days
+    # go in slices to stay under SQLite's bound parameter limit
+    days = sorted(days)
+    for start in range(0, len(days), IMPORT_BATCH_SIZE):
+        refresh_days(db.session.connection(), user_id, days[start:start + IMPORT_BATCH_SIZE])
+    bump_versions(db.session.connection(), {
+        (user_id, COLLECTIONS[RECORDS[record_type].model]) for record_type, count in counts.items() if count
+    })
+    # a client that syncs reloads an imported collection instead of receiving every row through the log
+    log_changes(db.session.connection(), user_id, [
+        (COLLECTIONS[RECORDS[record_type].model], None, 'reset') for record_type, count in counts.items() if count
+    ])
+    db.session.commit()
+    return {COLLECTIONS[RECORDS[record_type].model]: count for record_type, count in counts.items()}